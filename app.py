@@ -1,11 +1,72 @@
 import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
-from data import fetch_data
+from data import fetch_data, DataUnavailable
 from strategies import simple_moving_average_strategy, rsi_strategy
 from backtest import Backtester
+from benchmark import buy_and_hold
 from metrics import calculate_metrics
-from plots import plot_price_chart, plot_equity_curve
+from plots import plot_price_chart, plot_equity_curve, plot_equity_bands, plot_rolling_metrics, figure_payload_size, DEFAULT_MAX_POINTS
+from robustness import bootstrap_metrics, summarize
+from rolling import rolling_metrics
+from profiling import PipelineProfiler
+from cache import INDICATOR_CACHE
+from pipeline import Pipeline
+
+@st.cache_data
+def cached_buy_and_hold(ticker, start_date, end_date, initial_capital, transaction_cost, _data):
+    """
+    Buy & hold benchmark, cached per (ticker, range, capital, cost).
+    """
+    return buy_and_hold(_data, initial_capital, transaction_cost)
+
+def _signals(fetch, strategy_type, params):
+    params = dict(params)
+    if strategy_type == "Simple Moving Average (SMA)":
+        return simple_moving_average_strategy(fetch, params['short'], params['long'])
+    if strategy_type == "Relative Strength Index (RSI)":
+        return rsi_strategy(fetch, params['period'], params['buy'], params['sell'])
+    return None
+
+def register_stages(pipeline):
+    """
+    Declares the backtest pipeline: which stages each one depends on and
+    which sidebar inputs it reads. Capital/cost changes rerun the backtests
+    but reuse the data and signals; a new rolling window reruns only the
+    rolling analytics and their chart.
+    """
+    frame_rows = lambda pair: len(pair[0])
+    pipeline.add('fetch', lambda ticker, start_date, end_date: fetch_data(ticker, start_date, end_date),
+                 inputs=('ticker', 'start_date', 'end_date'), rows=len)
+    pipeline.add('signals', _signals, deps=('fetch',), inputs=('strategy_type', 'params'),
+                 rows=lambda signals: 0 if signals is None else len(signals))
+    pipeline.add('backtest', lambda fetch, signals, initial_capital, commission:
+                 Backtester(fetch, signals, initial_capital, commission).run_backtest(),
+                 deps=('fetch', 'signals'), inputs=('initial_capital', 'commission'), rows=frame_rows)
+    pipeline.add('benchmark', lambda fetch, ticker, start_date, end_date, initial_capital, commission:
+                 cached_buy_and_hold(ticker, start_date, end_date, initial_capital, commission, fetch),
+                 deps=('fetch',), inputs=('ticker', 'start_date', 'end_date', 'initial_capital', 'commission'),
+                 rows=frame_rows)
+    pipeline.add('metrics', lambda backtest, benchmark: (calculate_metrics(*backtest), calculate_metrics(*benchmark)),
+                 deps=('backtest', 'benchmark'))
+    # Bootstrap paths are cheap enough to run inline here
+    pipeline.add('robustness', lambda backtest, bootstrap_paths:
+                 bootstrap_metrics(backtest[0], bootstrap_paths, max_workers=1),
+                 deps=('backtest',), inputs=('bootstrap_paths',))
+    pipeline.add('rolling', lambda backtest, benchmark, rolling_window:
+                 (rolling_metrics(backtest[0], rolling_window, backtest[1]),
+                  rolling_metrics(benchmark[0], rolling_window, benchmark[1])),
+                 deps=('backtest', 'benchmark'), inputs=('rolling_window',), rows=lambda pair: 2 * len(pair[0]))
+    pipeline.add('plot_equity', lambda backtest, benchmark, max_points:
+                 plot_equity_curve(backtest[0], benchmark[0], max_points=max_points),
+                 deps=('backtest', 'benchmark'), inputs=('max_points',))
+    pipeline.add('plot_equity_bands', lambda backtest, benchmark, robustness, max_points:
+                 plot_equity_bands(backtest[0], robustness[1], benchmark[0], max_points=max_points),
+                 deps=('backtest', 'benchmark', 'robustness'), inputs=('max_points',))
+    pipeline.add('plot_rolling', lambda rolling, max_points: plot_rolling_metrics(*rolling, max_points=max_points),
+                 deps=('rolling',), inputs=('max_points',))
+    pipeline.add('plot_price', lambda fetch, backtest, max_points: plot_price_chart(fetch, backtest[1], max_points=max_points),
+                 deps=('fetch', 'backtest'), inputs=('max_points',))
 
 # Page Configuration
 st.set_page_config(
@@ -137,6 +198,21 @@ elif strategy_type == "Relative Strength Index (RSI)":
     rsi_sell = st.sidebar.slider("Sell Threshold (>)", 50, 90, 70)
     params = {'period': rsi_period, 'buy': rsi_buy, 'sell': rsi_sell}
 
+st.sidebar.markdown("---")
+downsample_charts = st.sidebar.checkbox("Downsample Charts", value=True,
+                                        help=f"Render at most {DEFAULT_MAX_POINTS} points per series (faster for long histories).")
+show_bands = st.sidebar.checkbox("Bootstrap Confidence Bands", value=False,
+                                 help="Block-bootstrap the strategy returns for metric intervals and equity bands.")
+bootstrap_paths = st.sidebar.number_input("Bootstrap Paths", value=1000, min_value=100, max_value=20000, step=100,
+                                          disabled=not show_bands)
+show_rolling = st.sidebar.checkbox("Rolling Analytics", value=False,
+                                   help="Rolling Sharpe, volatility, drawdown and win rate next to the equity curve.")
+rolling_window = st.sidebar.number_input("Rolling Window (bars)", value=63, min_value=2, max_value=2520, step=1,
+                                         disabled=not show_rolling)
+show_performance = st.sidebar.checkbox("Show Performance Panel", value=False)
+trace_memory = st.sidebar.checkbox("Trace Memory Allocations", value=False, disabled=not show_performance,
+                                   help="Measures allocations per stage with tracemalloc (slower).")
+
 run_button = st.sidebar.button("Run Backtest", type="primary")
 
 st.sidebar.markdown("---")
@@ -158,33 +234,46 @@ if run_button:
     if start_date >= end_date:
         st.error("Error: Start date must be before end date.")
     else:
-        with st.spinner(f"Fetching data for {ticker}..."):
-            df = fetch_data(ticker, start_date, end_date)
-            
+        profiler = PipelineProfiler(trace_memory=show_performance and trace_memory)
+        max_points = DEFAULT_MAX_POINTS if downsample_charts else None
+        pipeline = st.session_state.setdefault('pipeline', Pipeline())
+        register_stages(pipeline)
+        inputs = {
+            'ticker': ticker, 'start_date': start_date, 'end_date': end_date,
+            'strategy_type': strategy_type, 'params': tuple(sorted(params.items())),
+            'initial_capital': initial_capital, 'commission': commission,
+            'bootstrap_paths': int(bootstrap_paths), 'rolling_window': int(rolling_window),
+            'max_points': max_points,
+        }
+        # Failed downloads raise, so neither st.cache_data nor the pipeline keeps them
+        df = None
+        try:
+            with st.spinner(f"Fetching data for {ticker}..."):
+                df = pipeline.run(['fetch'], inputs, profiler)['fetch']
+        except DataUnavailable as e:
+            st.warning(str(e))
+        except Exception as e:
+            st.error(f"Error fetching data: {str(e)}")
+        fetch_status = pipeline.status
+
         if df is not None and not df.empty:
-            # 1. Calculate Signals
-            signals = None
-            if strategy_type == "Simple Moving Average (SMA)":
-                signals = simple_moving_average_strategy(df, params['short'], params['long'])
-            elif strategy_type == "Relative Strength Index (RSI)":
-                signals = rsi_strategy(df, params['period'], params['buy'], params['sell'])
-                
-            # 2. Run Strategy Backtest
-            bt_strat = Backtester(df, signals, initial_capital, commission)
-            portfolio_strat, trades_strat = bt_strat.run_backtest()
-            
-            # 3. Run Benchmark Backtest (Buy & Hold)
-            benchmark_signals = pd.DataFrame(index=df.index)
-            benchmark_signals['signal'] = 1.0 # Always Long
-            # Force a position change at start if needed, but Backtester handles signals.
-            # If signal is 1 and holdings 0 -> Buy. perfectly handles B&H.
+            targets = ['backtest', 'metrics', 'plot_price']
+            targets.append('plot_equity_bands' if show_bands else 'plot_equity')
+            if show_bands:
+                targets.append('robustness')
+            if show_rolling:
+                targets.append('plot_rolling')
+            results = pipeline.run(targets, inputs, profiler)
+            stage_status = {**pipeline.status, **fetch_status}
             
-            bt_bench = Backtester(df, benchmark_signals, initial_capital, commission)
-            portfolio_bench, trades_bench = bt_bench.run_backtest()
-            
-            # 4. Metrics
-            metrics_strat = calculate_metrics(portfolio_strat, trades_strat)
-            metrics_bench = calculate_metrics(portfolio_bench, trades_bench)
+            portfolio_strat, trades_strat = results['backtest']
+            metrics_strat, metrics_bench = results['metrics']
+            price_fig = results['plot_price']
+            equity_fig = results['plot_equity_bands' if show_bands else 'plot_equity']
+            if show_bands:
+                bootstrap, bands = results['robustness']
+            if show_rolling:
+                rolling_fig = results['plot_rolling']
             
             # 5. Display Layout
             
@@ -214,11 +303,21 @@ if run_button:
             
             with tab1:
                 st.subheader("Equity Curve vs Buy & Hold")
-                st.plotly_chart(plot_equity_curve(portfolio_strat, portfolio_bench), use_container_width=True)
+                if show_rolling:
+                    equity_col, rolling_col = st.columns([3, 2])
+                    equity_col.plotly_chart(equity_fig, use_container_width=True)
+                    rolling_col.plotly_chart(rolling_fig, use_container_width=True)
+                    st.caption(f"Rolling metrics over {int(rolling_window)} bars: drawdown from the window peak, "
+                               "win rate of trades closed in the window")
+                else:
+                    st.plotly_chart(equity_fig, use_container_width=True)
+                if show_bands:
+                    st.caption(f"Stationary block bootstrap, {int(bootstrap_paths)} paths (mean block 20 bars)")
+                    st.dataframe(summarize(bootstrap, metrics_strat), use_container_width=True)
                 
             with tab2:
                 st.subheader(f"{ticker} Price Action")
-                st.plotly_chart(plot_price_chart(df, trades_strat), use_container_width=True)
+                st.plotly_chart(price_fig, use_container_width=True)
                 
             # Trade Log
             with st.expander("View Strategy Trade Log (Simulated)"):
@@ -229,6 +328,22 @@ if run_button:
                     st.dataframe(trades_display, use_container_width=True)
                 else:
                     st.info("No trades executed with current strategy settings.")
+                    
+            # Performance Panel
+            if show_performance:
+                with st.expander("Performance", expanded=True):
+                    perf = profiler.to_frame()
+                    st.caption(f"Total pipeline time: {profiler.total_wall() * 1000:.1f} ms")
+                    reused = [name for name, status in stage_status.items() if status == 'reused']
+                    computed = [name for name, status in stage_status.items() if status == 'computed']
+                    st.caption(f"Reused from the previous run: {', '.join(reused) or 'none'}; "
+                               f"recomputed: {', '.join(computed) or 'none'}")
+                    st.dataframe(perf, use_container_width=True)
+                    st.caption(f"Figure payloads: equity {figure_payload_size(equity_fig) / 1024:.0f} KiB, "
+                               f"price {figure_payload_size(price_fig) / 1024:.0f} KiB")
+                    cache_stats = INDICATOR_CACHE.stats()
+                    st.caption(f"Indicator cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                               f"{cache_stats['evictions']} evictions, {cache_stats['bytes'] / 2**20:.1f} MiB held")
 
 else:
     st.markdown("""
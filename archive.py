@@ -0,0 +1,238 @@
+import os
+import pandas as pd
+import numpy as np
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Day, Tick
+
+# Rows parsed per chunk; bounds the memory used while reading an archive
+DEFAULT_CHUNK_ROWS = 1_000_000
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Lower-cased source column name -> standardized name
+_ALIASES = {
+    'open': 'Open', 'o': 'Open',
+    'high': 'High', 'h': 'High',
+    'low': 'Low', 'l': 'Low',
+    'close': 'Close', 'c': 'Close', 'adj close': 'Close',
+    'price': 'Price', 'last': 'Price', 'trade_price': 'Price',
+    'volume': 'Volume', 'v': 'Volume', 'vol': 'Volume', 'size': 'Volume', 'qty': 'Volume', 'quantity': 'Volume',
+}
+_TIME_COLUMNS = ('date', 'datetime', 'timestamp', 'time', 'ts')
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, time_column=None):
+    """
+    Reads a CSV or Parquet archive in bounded-memory chunks.
+
+    Bar files (Open/High/Low/Close/Volume) and tick files (Price/Size) are
+    both accepted; ticks become one-trade bars with Open = High = Low = Close.
+
+    Args:
+        path (str): .csv (optionally compressed) or .parquet file, sorted by time.
+        chunk_rows (int): Rows parsed per chunk.
+        time_column (str): Timestamp column; detected from common names if None.
+
+    Yields:
+        pd.DataFrame: OHLCV chunk indexed by a DatetimeIndex named 'Date'.
+    """
+    if path.endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield _normalize(batch.to_pandas(), time_column)
+    else:
+        for chunk in pd.read_csv(path, chunksize=chunk_rows):
+            yield _normalize(chunk, time_column)
+
+def _normalize(chunk, time_column):
+    chunk = chunk.rename(columns=lambda c: _ALIASES.get(str(c).strip().lower(), c))
+    if time_column is None:
+        time_column = next((c for c in chunk.columns if str(c).strip().lower() in _TIME_COLUMNS), None)
+    if time_column is not None:
+        index = pd.DatetimeIndex(pd.to_datetime(chunk[time_column]), name='Date')
+    elif isinstance(chunk.index, pd.DatetimeIndex):
+        index = chunk.index.rename('Date')
+    else:
+        raise ValueError("No timestamp column found; pass time_column.")
+
+    if 'Close' not in chunk.columns:
+        if 'Price' not in chunk.columns:
+            raise ValueError("Archive needs OHLC columns or a trade price column.")
+        for column in ('Open', 'High', 'Low', 'Close'):
+            chunk[column] = chunk['Price']
+    if 'Volume' not in chunk.columns:
+        chunk['Volume'] = 0.0
+
+    data = pd.DataFrame({column: chunk[column].to_numpy(dtype=np.float64) for column in OHLCV}, index=index)
+    return data
+
+def _fixed_length(freq):
+    """
+    Bucket length of a fixed-size frequency as a Timedelta, None for calendar ones (W, ME, ...).
+    """
+    offset = to_offset(freq)
+    if isinstance(offset, Tick):
+        return pd.Timedelta(offset)
+    # pandas 3 no longer treats Day as a Tick and ignores `origin` for it,
+    # so n days are bucketed as n * 24h
+    if isinstance(offset, Day):
+        return pd.Timedelta(days=offset.n)
+    return None
+
+def _aggregate(data, freq, origin=None):
+    options = {} if origin is None else {'origin': origin}
+    bars = data.resample(freq, **options).agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    # Buckets without any input bar (nights, weekends, halts) are dropped
+    return bars[bars['Close'].notna()]
+
+class BarResampler:
+    """
+    Resamples a time-sorted stream of chunks into coarser OHLCV bars.
+
+    The last bucket of a chunk may continue in the next one, so it is held
+    back and merged with the following chunk. Fixed-length buckets ('3h',
+    '2D', ...) are all anchored at midnight of the first bar, pandas'
+    default origin for the whole series, while calendar buckets ('W', 'ME')
+    need no origin; either way the result equals resampling the whole file
+    at once. Days are bucketed as 24 hours, so with a timezone-aware index
+    daily buckets shift by the DST offset.
+    """
+
+    def __init__(self, freq):
+        """
+        Args:
+            freq (str): Target bar size (pandas offset alias, e.g. '5min', 'h', 'D').
+        """
+        length = _fixed_length(freq)
+        self.freq = freq if length is None else length
+        self.fixed = length is not None
+        self.origin = None
+        self.pending = None
+
+    def update(self, chunk):
+        """
+        Returns:
+            pd.DataFrame: Bars completed by this chunk (possibly empty).
+        """
+        if chunk.empty:
+            return _aggregate(chunk, self.freq)
+        if self.fixed and self.origin is None:
+            self.origin = chunk.index[0].normalize()
+        bars = _aggregate(chunk, self.freq, self.origin)
+        if bars.empty:
+            return bars
+        if self.pending is not None:
+            if bars.index[0] == self.pending.index[0]:
+                head = bars.iloc[0]
+                pending = self.pending.iloc[0]
+                bars.iloc[0] = [pending['Open'], max(pending['High'], head['High']),
+                                min(pending['Low'], head['Low']), head['Close'],
+                                pending['Volume'] + head['Volume']]
+            else:
+                bars = pd.concat([self.pending, bars])
+        self.pending = bars.iloc[-1:]
+        return bars.iloc[:-1]
+
+    def flush(self):
+        """
+        Returns:
+            pd.DataFrame: The last, still open bar (empty if none).
+        """
+        pending, self.pending = self.pending, None
+        return pending if pending is not None else pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([], name='Date'))
+
+def load_bars(path, start=None, end=None, resample=None, dtype=np.float64, chunk_rows=DEFAULT_CHUNK_ROWS,
+              time_column=None, spill_dir=None):
+    """
+    Loads a large local archive into the OHLCV schema used by strategies and Backtester.
+
+    The file is read in chunks, filtered to [start, end), optionally
+    resampled and downcast chunk by chunk, so peak memory is bounded by
+    chunk_rows plus the (reduced) result. With spill_dir the result itself
+    stays on disk as memory-mapped columns.
+
+    Args:
+        path (str): CSV or Parquet archive, sorted by time.
+        start: First timestamp to keep (inclusive).
+        end: Timestamp to stop at (exclusive).
+        resample (str): Optional coarser bar size (e.g. '5min', 'h', 'D').
+        dtype: Column dtype of the result; np.float32 halves memory
+            (about 7 significant digits, plenty for prices but not for
+            cumulative volumes above ~16.7M).
+        chunk_rows (int): Rows parsed per chunk.
+        time_column (str): Timestamp column; detected if None.
+        spill_dir (str): Write the columns to raw files here and return
+            a DataFrame backed by read-only memory maps.
+
+    Returns:
+        pd.DataFrame: OHLCV data with a DatetimeIndex named 'Date'.
+    """
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    resampler = BarResampler(resample) if resample else None
+    sink = _SpillSink(spill_dir, dtype) if spill_dir else _MemorySink(dtype)
+
+    for chunk in iter_chunks(path, chunk_rows, time_column):
+        if start is not None:
+            chunk = chunk[chunk.index >= start]
+        if end is not None:
+            if len(chunk) and chunk.index[0] >= end:
+                break
+            chunk = chunk[chunk.index < end]
+        if chunk.empty:
+            continue
+        sink.append(resampler.update(chunk) if resampler else chunk)
+    if resampler:
+        sink.append(resampler.flush())
+    return sink.result()
+
+class _MemorySink:
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.parts = []
+
+    def append(self, bars):
+        if len(bars):
+            self.parts.append(bars.astype(self.dtype))
+
+    def result(self):
+        if not self.parts:
+            return pd.DataFrame({column: np.array([], dtype=self.dtype) for column in OHLCV},
+                                index=pd.DatetimeIndex([], name='Date'))
+        return pd.concat(self.parts)
+
+class _SpillSink:
+    def __init__(self, folder, dtype):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.unit = 'ns'
+        self.tz = None
+        self.files = {name: open(os.path.join(folder, f"{name}.bin"), 'wb') for name in ['index'] + OHLCV}
+
+    def append(self, bars):
+        if not len(bars):
+            return
+        index = bars.index
+        self.tz = index.tz
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        self.unit = bars.index.unit
+        index.as_unit('ns').asi8.tofile(self.files['index'])
+        for column in OHLCV:
+            bars[column].to_numpy(dtype=self.dtype).tofile(self.files[column])
+        self.rows += len(bars)
+
+    def result(self):
+        for f in self.files.values():
+            f.close()
+
+        def column(name, dtype):
+            if self.rows == 0:
+                return np.array([], dtype=dtype)
+            return np.memmap(os.path.join(self.folder, f"{name}.bin"), dtype=dtype, mode='r', shape=(self.rows,))
+
+        index = pd.DatetimeIndex(column('index', np.int64).view('datetime64[ns]'), name='Date').as_unit(self.unit)
+        if self.tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self.tz)
+        return pd.DataFrame({name: column(name, self.dtype) for name in OHLCV}, index=index, copy=False)
@@ -1,36 +1,193 @@
 import pandas as pd
 import numpy as np
 
+TRADE_TYPES = np.array(['Buy', 'Sell'])
+
+class TradeLog:
+    """
+    Growable structured array of executions.
+
+    Each trade is one fixed-size record (bar position, side and four
+    numbers) instead of a dict; capacity doubles when full. Dates are
+    stored as positions into the bar index, so the DataFrame built at the
+    end keeps the index's exact dtype (unit, timezone).
+    """
+
+    def __init__(self, capacity=64, dtype=np.float64):
+        """
+        Args:
+            capacity (int): Initial number of records.
+            dtype: Float type of the Price/Shares/Value/Commission fields.
+        """
+        self.records = np.empty(max(int(capacity), 1), dtype=[
+            ('bar', np.int64), ('side', np.int8), ('price', dtype),
+            ('shares', dtype), ('value', dtype), ('commission', dtype)])
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, bar, side, price, shares, value, commission):
+        """
+        Adds one execution; side is 0 for Buy, 1 for Sell.
+        """
+        if self.size == len(self.records):
+            grown = np.empty(2 * len(self.records), dtype=self.records.dtype)
+            grown[:self.size] = self.records
+            self.records = grown
+        self.records[self.size] = (bar, side, price, shares, value, commission)
+        self.size += 1
+
+    def to_frame(self, index):
+        """
+        Args:
+            index (pd.Index): Bar index the stored positions refer to.
+
+        Returns:
+            pd.DataFrame: 'Date', 'Type', 'Price', 'Shares', 'Value' and
+                'Commission' (an empty frame without columns if there are no trades).
+        """
+        if self.size == 0:
+            return pd.DataFrame()
+        records = self.records[:self.size]
+        return pd.DataFrame({
+            'Date': index[records['bar']],
+            'Type': TRADE_TYPES[records['side']],
+            'Price': records['price'],
+            'Shares': records['shares'],
+            'Value': records['value'],
+            'Commission': records['commission'],
+        })
+
 class Backtester:
-    def __init__(self, data, signals, initial_capital=10000.0, transaction_cost=0.001):
+    ENGINES = ('vectorized', 'loop')
+    DTYPES = (np.float64, np.float32)
+    # Bars per block when broadcasting equity, bounds the size of temporaries
+    BLOCK_BARS = 1 << 20
+
+    def __init__(self, data=None, signals=None, initial_capital=10000.0, transaction_cost=0.001, engine='vectorized',
+                 dtype=np.float64):
         """
         Initializes the Backtester.
         
         Args:
-            data (pd.DataFrame): Historical price data.
+            data (pd.DataFrame): Historical price data (None for streaming via step()).
             signals (pd.DataFrame): Dataframe with 'signal' column (1=Long, 0=Cash).
             initial_capital (float): Starting capital.
             transaction_cost (float): Cost per trade (e.g., 0.001 for 0.1%).
+            engine (str): 'vectorized' (array based, default) or 'loop' (bar-by-bar reference).
+            dtype: np.float64 (default) or np.float32 for the equity curve and
+                trade log. Fills are still computed in float64; float32 only
+                rounds what is stored (~7 significant digits, i.e. about
+                $0.001 on $10,000), so returns and metrics differ from float64
+                runs around the 6th-7th digit while using half the memory.
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'. Expected one of {self.ENGINES}.")
+        if np.dtype(dtype) not in self.DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Expected float64 or float32.")
         self.data = data
         self.signals = signals
         self.initial_capital = initial_capital
         self.transaction_cost = transaction_cost
-        self.portfolio = pd.DataFrame(index=data.index)
-        self.trades = []
+        self.engine = engine
+        self.dtype = np.dtype(dtype)
+        self.portfolio = pd.DataFrame(index=data.index if data is not None else None)
+        self.trades = TradeLog(dtype=self.dtype)
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the streaming state to all cash.
+        """
+        self.cash = self.initial_capital
+        self.holdings = 0
+
+    def step(self, date, price, signal):
+        """
+        Processes one bar in constant time and memory.
+        
+        Args:
+            date: Bar timestamp.
+            price (float): Closing price.
+            signal (float): 1=Long, 0/NaN=Cash, anything else keeps the position.
+            
+        Returns:
+            value (float): Portfolio value after the bar.
+            trade (dict): Trade executed on this bar, or None.
+        """
+        trade = None
+        fill = self._fill(price, signal)
+        if fill is not None:
+            side, shares, value, commission = fill
+            trade = {
+                'Date': date,
+                'Type': 'Buy' if side == 0 else 'Sell',
+                'Price': price,
+                'Shares': shares,
+                'Value': value,
+                'Commission': commission
+            }
+        
+        # Calculate total portfolio value for the day
+        return self.cash + (self.holdings * price), trade
+
+    def _fill(self, price, signal):
+        """
+        Applies the bar's signal to cash/holdings.
+        
+        Returns:
+            (side, shares, value, commission) of the execution (side 0=Buy,
+            1=Sell), or None if the position is unchanged.
+        """
+        # Logic:
+        # If Signal 1 (Long) and we are in Cash -> BUY
+        if signal == 1 and self.holdings == 0:
+            amount_to_invest = self.cash
+            commission = amount_to_invest * self.transaction_cost
+            self.holdings = (amount_to_invest - commission) / price
+            self.cash = 0
+            return 0, self.holdings, amount_to_invest, commission
+            
+        # If Signal 0 (Cash) and we have Holdings -> SELL
+        elif (signal == 0 or np.isnan(signal)) and self.holdings > 0:
+            revenue = self.holdings * price
+            commission = revenue * self.transaction_cost
+            self.cash = revenue - commission
+            shares = self.holdings
+            self.holdings = 0
+            return 1, shares, revenue, commission
+        
+        return None
+
+    def stream(self, bars, strategy):
+        """
+        Runs a streaming strategy bar by bar, yielding results as they happen.
+        
+        Args:
+            bars (iterable): (date, close) pairs.
+            strategy: Object whose update(close) returns the bar's signal
+                (e.g. strategies.SMACrossoverStream).
+                
+        Yields:
+            (date, value, trade): Portfolio value after the bar and the trade or None.
+        """
+        for date, price in bars:
+            value, trade = self.step(date, price, strategy.update(price))
+            yield date, value, trade
         
     def run_backtest(self):
         """
-        Executes the backtest iterative loop.
+        Executes the backtest.
+        
+        Both engines produce bit-for-bit identical results. The vectorized engine
+        falls back to the loop when prices are not all finite and positive, or
+        when capital/costs are outside the range it models (capital <= 0, cost >= 1).
         
         Returns:
             portfolio (pd.DataFrame): Contains 'total' value daily.
             trades (pd.DataFrame): List of executed trades.
         """
-        cash = self.initial_capital
-        holdings = 0
-        portfolio_value = []
-        
         # Ensure alignment
         prices = self.data['Close']
         signal_series = self.signals['signal']
@@ -40,50 +197,85 @@ class Backtester:
         prices = prices.loc[common_index]
         signal_series = signal_series.loc[common_index]
         
-        # Iterate day by day
-        for date, price in prices.items():
-            signal = signal_series.loc[date]
-            
-            # Logic:
-            # If Signal 1 (Long) and we are in Cash -> BUY
-            if signal == 1 and holdings == 0:
-                amount_to_invest = cash
-                commission = amount_to_invest * self.transaction_cost
-                holdings = (amount_to_invest - commission) / price
-                cash = 0
-                
-                self.trades.append({
-                    'Date': date,
-                    'Type': 'Buy',
-                    'Price': price,
-                    'Shares': holdings,
-                    'Value': amount_to_invest,
-                    'Commission': commission
-                })
-                
-            # If Signal 0 (Cash) and we have Holdings -> SELL
-            elif (signal == 0 or np.isnan(signal)) and holdings > 0:
-                revenue = holdings * price
-                commission = revenue * self.transaction_cost
-                cash = revenue - commission
-                
-                self.trades.append({
-                    'Date': date,
-                    'Type': 'Sell',
-                    'Price': price,
-                    'Shares': holdings,
-                    'Value': revenue,
-                    'Commission': commission
-                })
-                
-                holdings = 0
-            
-            # Calculate total portfolio value for the day
-            current_val = cash + (holdings * price)
-            portfolio_value.append(current_val)
+        self.trades = TradeLog(dtype=self.dtype)
+        if self.engine == 'vectorized' and self._can_vectorize(prices):
+            portfolio_value = self._run_vectorized(prices, signal_series)
+        else:
+            portfolio_value = self._run_loop(prices, signal_series)
             
         self.portfolio = pd.DataFrame(index=prices.index)
         self.portfolio['total'] = portfolio_value
         self.portfolio['returns'] = self.portfolio['total'].pct_change()
         
-        return self.portfolio, pd.DataFrame(self.trades)
+        return self.portfolio, self.trades.to_frame(prices.index)
+
+    def _can_vectorize(self, prices):
+        if not (self.initial_capital > 0 and 0 <= self.transaction_cost < 1):
+            return False
+        price_arr = prices.to_numpy(dtype=float)
+        return bool(np.all(np.isfinite(price_arr)) and np.all(price_arr > 0))
+
+    def _run_loop(self, prices, signal_series):
+        """
+        Reference engine: iterates day by day over the aligned series.
+        """
+        self.reset()
+        portfolio_value = np.empty(len(prices), dtype=self.dtype)
+        
+        # Iterate day by day
+        for i, (date, price) in enumerate(prices.items()):
+            fill = self._fill(price, signal_series.loc[date])
+            if fill is not None:
+                side, shares, value, commission = fill
+                self.trades.append(i, side, price, shares, value, commission)
+            portfolio_value[i] = self.cash + (self.holdings * price)
+            
+        return portfolio_value
+
+    def _run_vectorized(self, prices, signal_series):
+        """
+        Array engine: derives the position path from the signal array, fills
+        only at position transitions, then broadcasts cash/holdings across bars.
+        """
+        price_arr = prices.to_numpy(dtype=float)
+        # float32 signals are compared as they are (0 and 1 are exact), anything else as float64
+        signal_arr = signal_series.to_numpy()
+        if signal_arr.dtype not in self.DTYPES:
+            signal_arr = signal_arr.astype(float)
+        n = len(price_arr)
+        
+        # Desired state per bar: 1 -> Long, 0/NaN -> Cash, any other value (-1) keeps the previous state.
+        target = np.full(n, -1, dtype=np.int8)
+        target[(signal_arr == 0) | np.isnan(signal_arr)] = 0
+        target[signal_arr == 1] = 1
+        last_set = np.where(target >= 0, np.arange(n), -1)
+        np.maximum.accumulate(last_set, out=last_set)
+        long = (last_set >= 0) & (target[np.maximum(last_set, 0)] == 1)
+        
+        # Bars where the position flips; they alternate Buy, Sell, Buy, ...
+        transitions = np.flatnonzero(np.diff(long.astype(np.int8), prepend=np.int8(0)))
+        
+        # Cash/holdings after each transition (slot 0 is the initial state).
+        # Fills reuse the step() logic, so results are bit-for-bit equal to the loop.
+        self.reset()
+        cash_after = np.empty(len(transitions) + 1)
+        holdings_after = np.empty(len(transitions) + 1)
+        cash_after[0] = self.cash
+        holdings_after[0] = self.holdings
+        for k, i in enumerate(transitions):
+            side, shares, value, commission = self._fill(price_arr[i], 1.0 if k % 2 == 0 else 0.0)
+            self.trades.append(i, side, price_arr[i], shares, value, commission)
+            cash_after[k + 1] = self.cash
+            holdings_after[k + 1] = self.holdings
+            
+        # Index of the state in effect at each bar, then value = cash + holdings * price,
+        # written block by block into the output buffer to bound the float64 temporaries
+        is_transition = np.zeros(n, dtype=np.int32)
+        is_transition[transitions] = 1
+        state = np.cumsum(is_transition, dtype=np.int32)
+        portfolio_value = np.empty(n, dtype=self.dtype)
+        for lo in range(0, n, self.BLOCK_BARS):
+            hi = min(lo + self.BLOCK_BARS, n)
+            block = state[lo:hi]
+            portfolio_value[lo:hi] = cash_after[block] + holdings_after[block] * price_arr[lo:hi]
+        return portfolio_value
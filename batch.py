@@ -0,0 +1,320 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from functools import partial
+import pandas as pd
+from data import load_data
+from strategies import STRATEGIES
+from backtest import Backtester
+from metrics import calculate_metrics
+from cache import fingerprint
+from shared import publish_frame, attach_frame, detach
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    config_hash TEXT NOT NULL,
+    data_hash TEXT,
+    ticker TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    initial_capital REAL NOT NULL,
+    transaction_cost REAL NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    bars INTEGER,
+    metrics TEXT,
+    finished_at TEXT NOT NULL
+)
+"""
+
+def expand_jobs(spec):
+    """
+    Expands a job spec into one job per ticker x date range x strategy x parameter combination.
+
+    Spec format (JSON):
+        {
+          "tickers": ["AAPL", "MSFT"],
+          "date_ranges": [["2020-01-01", "2024-01-01"]],
+          "strategies": {
+            "sma": {"short_window": [10, 20], "long_window": [50, 100]},
+            "rsi": {"period": [14], "buy_threshold": [30], "sell_threshold": [70]}
+          },
+          "initial_capital": 10000.0,
+          "transaction_cost": 0.001
+        }
+    Scalars in a parameter grid are treated as single-value lists.
+
+    Returns:
+        list: Job dicts with ticker, strategy, params, start_date, end_date,
+            initial_capital and transaction_cost.
+    """
+    jobs = []
+    for strategy in spec['strategies']:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {sorted(STRATEGIES)}.")
+    for ticker in spec['tickers']:
+        for start_date, end_date in spec['date_ranges']:
+            for strategy, grid in spec['strategies'].items():
+                names = sorted(grid)
+                values = [grid[name] if isinstance(grid[name], list) else [grid[name]] for name in names]
+                for combo in itertools.product(*values):
+                    jobs.append({
+                        'ticker': ticker.upper(),
+                        'strategy': strategy,
+                        'params': dict(zip(names, combo)),
+                        'start_date': str(start_date),
+                        'end_date': str(end_date),
+                        'initial_capital': float(spec.get('initial_capital', 10000.0)),
+                        'transaction_cost': float(spec.get('transaction_cost', 0.001)),
+                    })
+    return jobs
+
+def config_hash(job):
+    """
+    Stable hash of a job configuration.
+    """
+    return hashlib.sha256(json.dumps(job, sort_keys=True).encode()).hexdigest()[:32]
+
+def data_hash(data):
+    """
+    Content hash of an OHLCV frame (all columns and the index).
+    """
+    return hashlib.sha256("".join(fingerprint(data[column]) for column in data.columns).encode()).hexdigest()[:32]
+
+def result_key(config, data):
+    return hashlib.sha256(f"{config}:{data}".encode()).hexdigest()[:32]
+
+class ResultStore:
+    """
+    SQLite table of finished jobs keyed by hash(configuration, input data).
+
+    Only the coordinating process writes; every finished chunk of jobs is
+    committed immediately, so an interrupted batch keeps all completed work.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def completed(self):
+        """
+        Returns:
+            dict: config_hash -> set of data_hash for jobs that finished without error.
+        """
+        done = {}
+        for config, data in self.conn.execute("SELECT config_hash, data_hash FROM results WHERE status = 'ok'"):
+            done.setdefault(config, set()).add(data)
+        return done
+
+    def save(self, rows):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results VALUES (:key, :config_hash, :data_hash, :ticker, :strategy, :params, "
+            ":start_date, :end_date, :initial_capital, :transaction_cost, :status, :error, :bars, :metrics, :finished_at)",
+            rows)
+        self.conn.commit()
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: One row per stored job, with the metrics expanded into columns.
+        """
+        results = pd.read_sql_query("SELECT * FROM results ORDER BY ticker, strategy, start_date, params", self.conn)
+        metrics = pd.DataFrame([json.loads(m) if isinstance(m, str) else {} for m in results.pop('metrics')], index=results.index)
+        return pd.concat([results, metrics], axis=1)
+
+    def close(self):
+        self.conn.close()
+
+def run_jobs(ticker, start_date, end_date, jobs, done, loader=load_data):
+    """
+    Runs a chunk of jobs sharing one ticker and date range; the data is loaded once.
+
+    Args:
+        ticker (str): Ticker symbol.
+        start_date (str): Start date.
+        end_date (str): End date.
+        jobs (list): Jobs (see expand_jobs) of this ticker and range.
+        done (dict): config_hash -> data hashes already completed; matching jobs are skipped.
+        loader (callable): loader(ticker, start, end) -> DataFrame.
+
+    Returns:
+        (list, int): Result rows for the jobs that ran, and the number skipped.
+    """
+    return _run_loaded(*_load(ticker, start_date, end_date, loader), jobs, done)
+
+def _load(ticker, start_date, end_date, loader):
+    try:
+        df = loader(ticker, start_date, end_date)
+        error = None if df is not None and not df.empty else 'No data'
+    except Exception as e:
+        df, error = None, f"{type(e).__name__}: {e}"
+    return (df if error is None else None), error
+
+def _run_shared(handle, error, jobs, done):
+    # Chunks of one ticker and range read the frame the coordinator published
+    if handle is None:
+        return _run_loaded(None, error, jobs, done)
+    df, _ = attach_frame(handle)
+    try:
+        return _run_loaded(df, error, jobs, done)
+    finally:
+        del df
+        detach(handle)
+
+def _run_loaded(df, error, jobs, done):
+    data_key = data_hash(df) if error is None else None
+
+    rows = []
+    skipped = 0
+    for job in jobs:
+        config = config_hash(job)
+        if data_key is not None and data_key in done.get(config, ()):
+            skipped += 1
+            continue
+        row = {**job, 'key': result_key(config, data_key), 'config_hash': config, 'data_hash': data_key,
+               'params': json.dumps(job['params'], sort_keys=True),
+               'status': 'error', 'error': error, 'bars': 0, 'metrics': None}
+        if error is None:
+            try:
+                signals = STRATEGIES[job['strategy']](df, **job['params'])
+                portfolio, trades = Backtester(df, signals, job['initial_capital'], job['transaction_cost']).run_backtest()
+                metrics = calculate_metrics(portfolio, trades)
+                row.update(status='ok', bars=len(df),
+                           metrics=json.dumps({k: float(v) for k, v in metrics.items()}))
+            except Exception as e:
+                row['error'] = f"{type(e).__name__}: {e}"
+        row['finished_at'] = datetime.now(timezone.utc).isoformat()
+        rows.append(row)
+    return rows, skipped
+
+def run_batch(spec, db_path, max_workers=None, loader=load_data, log=print, chunk_size=64):
+    """
+    Runs a job spec concurrently, persisting results to SQLite.
+
+    Each ticker and date range is split into chunks of `chunk_size` jobs,
+    and each chunk is committed as soon as it finishes, so an interrupted
+    batch loses at most the chunks in flight, even with a single ticker or
+    one large grid. A range split into several chunks is loaded once by a
+    worker and published to shared memory for its chunks, so the loader
+    (and the data store behind it) never runs twice for it. Jobs whose (configuration, input data) hashes already
+    succeeded are skipped, so rerunning a spec only does new or failed work.
+    New data for a ticker changes its data hash, so its jobs run again.
+
+    Args:
+        spec (dict): Job spec, see expand_jobs.
+        db_path (str): SQLite result database.
+        max_workers (int): Worker processes (default: CPU count); 1 runs inline.
+        loader (callable): loader(ticker, start, end) -> DataFrame; must be picklable.
+        log (callable): Progress output.
+        chunk_size (int): Jobs per task and per commit.
+
+    Returns:
+        dict: Counts of 'jobs', 'ran', 'skipped' and 'failed'.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    jobs = expand_jobs(spec)
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job['ticker'], job['start_date'], job['end_date']), []).append(job)
+    chunks = {group: [group_jobs[i:i + chunk_size] for i in range(0, len(group_jobs), chunk_size)]
+              for group, group_jobs in groups.items()}
+
+    store = ResultStore(db_path)
+    completed = store.completed()
+    summary = {'jobs': len(jobs), 'ran': 0, 'skipped': 0, 'failed': 0}
+
+    def pending(chunk):
+        # Only the completed hashes of this chunk's configurations travel with the task
+        configs = (config_hash(job) for job in chunk)
+        return {config: completed[config] for config in configs if config in completed}
+
+    def record(group, rows, skipped):
+        store.save(rows)
+        failed = sum(row['status'] != 'ok' for row in rows)
+        summary['ran'] += len(rows)
+        summary['skipped'] += skipped
+        summary['failed'] += failed
+        ticker, lo, hi = group
+        log(f"{ticker} {lo}..{hi}: {len(rows)} ran, {skipped} skipped, {failed} failed")
+
+    segments = {}
+    try:
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers == 1 or sum(map(len, chunks.values())) <= 1:
+            for group, group_chunks in chunks.items():
+                df, error = _load(*group, loader)
+                for chunk in group_chunks:
+                    record(group, *_run_loaded(df, error, chunk, pending(chunk)))
+        else:
+            with ProcessPoolExecutor(max_workers=min(max_workers, sum(map(len, chunks.values())))) as pool:
+                # A single chunk loads its own data; larger groups are loaded once, then fanned out
+                futures = {}
+                for group, group_chunks in chunks.items():
+                    if len(group_chunks) == 1:
+                        futures[pool.submit(run_jobs, *group, group_chunks[0], pending(group_chunks[0]), loader)] = ('run', group)
+                    else:
+                        futures[pool.submit(_load, *group, loader)] = ('load', group)
+                remaining = {}
+                while futures:
+                    finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        kind, group = futures.pop(future)
+                        if kind == 'load':
+                            df, error = future.result()
+                            handle = None
+                            if df is not None:
+                                segments[group] = publish_frame(df)
+                                handle = segments[group].handle
+                            del df
+                            remaining[group] = len(chunks[group])
+                            for chunk in chunks[group]:
+                                futures[pool.submit(_run_shared, handle, error, chunk, pending(chunk))] = ('run', group)
+                            continue
+                        record(group, *future.result())
+                        if group in remaining:
+                            remaining[group] -= 1
+                            if remaining[group] == 0 and group in segments:
+                                segments.pop(group).close()
+    finally:
+        for segment in segments.values():
+            segment.close()
+        store.close()
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a backtest job spec headlessly with resumable results.")
+    parser.add_argument("spec", help="Job spec JSON file (see batch.expand_jobs).")
+    parser.add_argument("--db", default="batch_results.sqlite", help="SQLite result store.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64, help="Jobs per task and per commit.")
+    parser.add_argument("--offline", action="store_true", help="Serve stored market data only.")
+    parser.add_argument("--export", help="Write all stored results to this .csv or .parquet file.")
+    args = parser.parse_args()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    loader = partial(load_data, offline=True) if args.offline else load_data
+    summary = run_batch(spec, args.db, args.workers, loader, chunk_size=args.chunk_size)
+    print(f"\n{summary['jobs']} jobs: {summary['ran']} ran, {summary['skipped']} skipped, {summary['failed']} failed")
+
+    if args.export:
+        store = ResultStore(args.db)
+        results = store.to_frame()
+        store.close()
+        if args.export.endswith(".parquet"):
+            results.to_parquet(args.export)
+        else:
+            results.to_csv(args.export, index=False)
+        print(f"Results written to {args.export}")
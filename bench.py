@@ -0,0 +1,147 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from data import generate_synthetic_data
+from strategies import simple_moving_average_strategy, rsi_strategy
+from backtest import Backtester
+from metrics import calculate_metrics
+from plots import plot_price_chart, plot_equity_curve
+from cache import INDICATOR_CACHE
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+STAGES = ['sma_signals', 'rsi_signals', 'backtest', 'backtest_f32', 'metrics', 'plot_price', 'plot_equity']
+
+def _stage_functions(df):
+    """
+    Builds the benchmarked stage callables; later stages reuse earlier outputs.
+    """
+    signals = simple_moving_average_strategy(df, 20, 50)
+    signals_f32 = signals.astype(np.float32)
+    portfolio, trades = Backtester(df, signals).run_backtest()
+    return {
+        'sma_signals': lambda: simple_moving_average_strategy(df, 20, 50),
+        'rsi_signals': lambda: rsi_strategy(df, 14, 30, 70),
+        'backtest': lambda: Backtester(df, signals).run_backtest(),
+        'backtest_f32': lambda: Backtester(df, signals_f32, dtype=np.float32).run_backtest(),
+        'metrics': lambda: calculate_metrics(portfolio, trades),
+        'plot_price': lambda: plot_price_chart(df, trades),
+        'plot_equity': lambda: plot_equity_curve(portfolio, portfolio),
+    }
+
+def measure(fn, repeat=3):
+    """
+    Times fn (best of repeat) and measures its peak traced allocation in a separate run.
+
+    Returns:
+        (float, int): Seconds and peak bytes.
+    """
+    timings = []
+    for _ in range(repeat):
+        INDICATOR_CACHE.clear()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    INDICATOR_CACHE.clear()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, repeat=3, seed=0, log=print):
+    """
+    Runs every stage at every size on synthetic GBM data.
+
+    Returns:
+        list: One dict per (stage, size) with seconds, bars_per_second and peak_bytes.
+    """
+    results = []
+    for n_bars in sizes:
+        df = generate_synthetic_data(n_bars, seed=seed)
+        functions = _stage_functions(df)
+        for stage in stages:
+            seconds, peak = measure(functions[stage], repeat)
+            row = {
+                'stage': stage,
+                'bars': n_bars,
+                'seconds': seconds,
+                'bars_per_second': n_bars / seconds if seconds > 0 else float('inf'),
+                'peak_bytes': peak,
+            }
+            results.append(row)
+            log(f"{stage:>12} {n_bars:>10,} bars  {seconds * 1000:10.2f} ms  "
+                f"{row['bars_per_second']:14,.0f} bars/s  {peak / 2**20:9.1f} MiB")
+    return results
+
+def compare_to_baseline(results, baseline, time_tolerance=0.25, memory_tolerance=0.25):
+    """
+    Flags stages that got slower or use more memory than the baseline allows.
+
+    Args:
+        results (list): Output of run_benchmarks.
+        baseline (list): Previously recorded results.
+        time_tolerance (float): Allowed relative slowdown (0.25 = 25%).
+        memory_tolerance (float): Allowed relative peak-memory growth.
+
+    Returns:
+        list: Regression descriptions (empty if none).
+    """
+    reference = {(row['stage'], row['bars']): row for row in baseline}
+    regressions = []
+    for row in results:
+        base = reference.get((row['stage'], row['bars']))
+        if base is None:
+            continue
+        if row['seconds'] > base['seconds'] * (1 + time_tolerance):
+            regressions.append(f"{row['stage']} @ {row['bars']:,} bars: {row['seconds']:.4f}s vs baseline {base['seconds']:.4f}s")
+        if row['peak_bytes'] > base['peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(f"{row['stage']} @ {row['bars']:,} bars: peak {row['peak_bytes']:,} B vs baseline {base['peak_bytes']:,} B")
+    return regressions
+
+def _environment():
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Bar counts to benchmark (e.g. 1000 10000 ... 10000000).")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is kept).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results.")
+    parser.add_argument("--baseline", help="Baseline results file to compare against.")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeat, args.seed)
+    with open(args.output, "w") as f:
+        json.dump({'environment': _environment(), 'results': results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare_to_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
@@ -0,0 +1,78 @@
+import pandas as pd
+from backtest import Backtester
+
+def buy_and_hold(data, initial_capital=10000.0, transaction_cost=0.001):
+    """
+    Closed-form buy & hold benchmark.
+
+    Buys with all capital at the first close (same commission model as
+    Backtester) and marks the position to market; identical to running
+    Backtester with an always-long signal, without the per-bar pass.
+
+    Args:
+        data (pd.DataFrame): Historical price data with a 'Close' column.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade (e.g., 0.001 for 0.1%).
+
+    Returns:
+        portfolio (pd.DataFrame): Contains 'total' value daily.
+        trades (pd.DataFrame): The single Buy trade.
+    """
+    prices = data['Close']
+    portfolio = pd.DataFrame(index=prices.index)
+    if prices.empty:
+        portfolio['total'] = []
+        portfolio['returns'] = []
+        return portfolio, pd.DataFrame()
+
+    # One fill through the Backtester arithmetic, then value = cash + holdings * price
+    bt = Backtester(initial_capital=initial_capital, transaction_cost=transaction_cost)
+    _, trade = bt.step(prices.index[0], prices.iloc[0], 1.0)
+    portfolio['total'] = bt.cash + bt.holdings * prices.to_numpy(dtype=float)
+    portfolio['returns'] = portfolio['total'].pct_change()
+    return portfolio, pd.DataFrame([trade])
+
+def static_weights(prices, weights, initial_capital=10000.0, transaction_cost=0.001):
+    """
+    Buy & hold basket with fixed initial weights (no rebalancing).
+
+    Args:
+        prices (pd.DataFrame): Aligned closing prices, one column per asset.
+        weights (dict or pd.Series): Asset -> weight; weights should sum to at most 1,
+            the remainder stays in cash.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+
+    Returns:
+        portfolio (pd.DataFrame): Contains 'total' value daily.
+        trades (pd.DataFrame): One Buy per asset, with an 'Asset' column.
+    """
+    weights = pd.Series(weights, dtype=float).reindex(prices.columns).fillna(0.0)
+    first = prices.iloc[0]
+    allocation = initial_capital * weights
+    commission = allocation * transaction_cost
+    shares = (allocation - commission) / first
+    cash = initial_capital - allocation.sum()
+
+    portfolio = pd.DataFrame(index=prices.index)
+    portfolio['total'] = cash + prices.to_numpy(dtype=float) @ shares.to_numpy()
+    portfolio['returns'] = portfolio['total'].pct_change()
+
+    bought = weights > 0
+    trades = pd.DataFrame({
+        'Date': prices.index[0],
+        'Asset': prices.columns[bought],
+        'Type': 'Buy',
+        'Price': first[bought].to_numpy(),
+        'Shares': shares[bought].to_numpy(),
+        'Value': allocation[bought].to_numpy(),
+        'Commission': commission[bought].to_numpy(),
+    })
+    return portfolio, trades
+
+def equal_weight(prices, initial_capital=10000.0, transaction_cost=0.001):
+    """
+    Equal-weight buy & hold basket over all columns of prices.
+    """
+    n_assets = prices.shape[1]
+    return static_weights(prices, {asset: 1.0 / n_assets for asset in prices.columns}, initial_capital, transaction_cost)
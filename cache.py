@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+class IndicatorCache:
+    """
+    Memory-bounded LRU cache for indicator series.
+
+    graph.Plan keys entries on (input fingerprints, node structure); values
+    are the computed arrays. Cached values are shared, so callers must treat
+    them as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes (int): Upper bound on the total size of cached values.
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key (tuple): Hashable cache key.
+            compute (callable): Zero-argument function producing the value.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = _nbytes(value)
+        with self._lock:
+            if size > self.max_bytes or key in self._entries:
+                return value
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, entries and bytes currently held.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+            }
+
+    def clear(self):
+        """
+        Drops all entries and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+def fingerprint(series):
+    """
+    Content hash of a price series (values and index).
+
+    Args:
+        series (pd.Series): Input series.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    values = np.ascontiguousarray(series.to_numpy())
+    digest.update(str(values.dtype).encode())
+    digest.update(values.data)
+    if isinstance(series.index, pd.DatetimeIndex):
+        digest.update(np.ascontiguousarray(series.index.asi8).data)
+    else:
+        digest.update(pd.util.hash_pandas_object(series.index, index=False).to_numpy().data)
+    return digest.hexdigest()
+
+def _nbytes(value):
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True, deep=False)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return 0
+
+# Process-wide cache shared by strategies, Streamlit reruns and sweeps
+INDICATOR_CACHE = IndicatorCache(int(os.environ.get("BACKTESTER_INDICATOR_CACHE_MB", "256")) * 1024 * 1024)
@@ -0,0 +1,158 @@
+import os
+import pickle
+import pandas as pd
+from backtest import Backtester
+from metrics import RunningMetrics
+from strategies import STREAM_STRATEGIES
+
+CHECKPOINT_VERSION = 2
+
+class IncrementalBacktest:
+    """
+    Resumable backtest: streaming strategy + Backtester state + running metrics.
+
+    update() only processes bars dated after the last processed bar and
+    extends the stored portfolio and trades, so a checkpointed run that is
+    fed appended data ends in the same state as a full rerun. If the close
+    of the last processed bar has changed (a revised or adjusted history),
+    the run is rebuilt from the new data instead.
+    """
+
+    def __init__(self, strategy, params, initial_capital=10000.0, transaction_cost=0.001):
+        """
+        Args:
+            strategy (str): Key of strategies.STREAM_STRATEGIES (e.g. 'sma', 'rsi').
+            params (dict): Keyword arguments for the strategy.
+            initial_capital (float): Starting capital.
+            transaction_cost (float): Cost per trade.
+        """
+        self.strategy_name = strategy
+        self.params = dict(params)
+        self.strategy = STREAM_STRATEGIES[strategy](**params)
+        self.backtester = Backtester(initial_capital=initial_capital, transaction_cost=transaction_cost)
+        self.metrics = RunningMetrics()
+        self.portfolio = pd.DataFrame(columns=['total', 'returns'], dtype=float)
+        self.trades = pd.DataFrame()
+        self.last_date = None
+        self.last_close = None
+
+    def update(self, data):
+        """
+        Processes the bars of data that come after the last processed bar.
+
+        Args:
+            data (pd.DataFrame): Price data with a 'Close' column (full or tail history).
+
+        Raises:
+            ValueError: If the history was revised and data does not reach back
+                to the first processed bar, so the run cannot be rebuilt.
+
+        Returns:
+            portfolio (pd.DataFrame): Extended 'total'/'returns' frame.
+            trades (pd.DataFrame): Extended trade log.
+        """
+        prices = data['Close']
+        if self.last_date is not None and self.last_date in prices.index and prices.loc[self.last_date] != self.last_close:
+            if prices.index[0] > self.portfolio.index[0]:
+                raise ValueError(f"Close on {self.last_date} changed from {self.last_close} to {prices.loc[self.last_date]}; "
+                                 f"pass the full history from {self.portfolio.index[0]} to rebuild the run.")
+            self.__init__(self.strategy_name, self.params, self.backtester.initial_capital, self.backtester.transaction_cost)
+        if self.last_date is not None:
+            prices = prices[prices.index > self.last_date]
+        if prices.empty:
+            return self.portfolio, self.trades
+
+        values = []
+        new_trades = []
+        for date, value, trade in self.backtester.stream(prices.items(), self.strategy):
+            self.metrics.update(date, value, trade)
+            values.append(value)
+            if trade is not None:
+                new_trades.append(trade)
+
+        # pct_change across the boundary, so returns equal a full rerun
+        previous = self.portfolio['total'].iloc[-1] if not self.portfolio.empty else float('nan')
+        totals = pd.Series(values, index=prices.index)
+        returns = totals / totals.shift(1, fill_value=previous) - 1
+        chunk = pd.DataFrame({'total': totals, 'returns': returns})
+        self.portfolio = chunk if self.portfolio.empty else pd.concat([self.portfolio, chunk])
+        if new_trades:
+            self.trades = pd.concat([self.trades, pd.DataFrame(new_trades)], ignore_index=True) if not self.trades.empty else pd.DataFrame(new_trades)
+
+        self.last_date = prices.index[-1]
+        self.last_close = prices.iloc[-1]
+        return self.portfolio, self.trades
+
+    def result(self):
+        """
+        Returns:
+            dict: Metrics of the whole run so far (same keys as calculate_metrics).
+        """
+        return self.metrics.result()
+
+    def save(self, path):
+        """
+        Writes the checkpoint atomically.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': CHECKPOINT_VERSION, 'state': self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a checkpoint written by save().
+        """
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {payload.get('version')} in {path}.")
+        return payload['state']
+
+def resume_backtest(path, data, strategy, params, initial_capital=10000.0, transaction_cost=0.001):
+    """
+    Loads the checkpoint at path (or starts a new run), processes the appended
+    bars of data and saves the checkpoint again.
+
+    Raises:
+        ValueError: If the checkpoint was created with a different configuration.
+
+    Returns:
+        IncrementalBacktest: The updated run.
+    """
+    if os.path.exists(path):
+        run = IncrementalBacktest.load(path)
+        config = (run.strategy_name, run.params, run.backtester.initial_capital, run.backtester.transaction_cost)
+        if config != (strategy, dict(params), initial_capital, transaction_cost):
+            raise ValueError(f"Checkpoint {path} was created with a different configuration: {config}.")
+    else:
+        run = IncrementalBacktest(strategy, params, initial_capital, transaction_cost)
+    run.update(data)
+    run.save(path)
+    return run
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import date, timedelta
+    from data import load_data
+
+    parser = argparse.ArgumentParser(description="Extend a checkpointed backtest with newly available bars.")
+    parser.add_argument("ticker")
+    parser.add_argument("--checkpoint", required=True, help="Checkpoint file (created on first run).")
+    parser.add_argument("--strategy", default="sma", choices=sorted(STREAM_STRATEGIES))
+    parser.add_argument("--params", default='{"short_window": 20, "long_window": 50}', help="Strategy parameters as JSON.")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 2)))
+    parser.add_argument("--end", default=str(date.today() + timedelta(days=1)))
+    parser.add_argument("--capital", type=float, default=10000.0)
+    parser.add_argument("--cost", type=float, default=0.001)
+    args = parser.parse_args()
+
+    df = load_data(args.ticker.upper(), args.start, args.end)
+    if df is None:
+        raise SystemExit(f"No data for {args.ticker}.")
+    run = resume_backtest(args.checkpoint, df, args.strategy, json.loads(args.params), args.capital, args.cost)
+    print(f"Processed through {run.last_date}: {len(run.portfolio)} bars, {len(run.trades)} trades.")
+    for k, v in run.result().items():
+        print(f"{k}: {v}")
@@ -1,42 +1,145 @@
+import os
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import streamlit as st
+from store import DataStore
+
+# Persistent store location and offline switch (no network access at all)
+DATA_DIR = os.environ.get("BACKTESTER_DATA_DIR", ".market_data")
+OFFLINE = os.environ.get("BACKTESTER_OFFLINE", "0") == "1"
+
+class DataUnavailable(Exception):
+    """
+    Raised by fetch_data when there are no bars for the request. Raising
+    (rather than returning None) keeps the miss out of Streamlit's cache,
+    so the next run downloads again.
+    """
+
+def download_data(ticker, start_date, end_date):
+    """
+    Downloads historical data from yfinance.
+
+    Args:
+        ticker (str): Ticker symbol (e.g., 'AAPL', 'BTC-USD').
+        start_date (date): Start date.
+        end_date (date): End date (exclusive).
+
+    Returns:
+        pd.DataFrame: DataFrame with standardized OHLCV columns (may be empty).
+    """
+    data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
+
+    # Handle MultiIndex columns (common in new yfinance versions)
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+
+    # Ensure we have standardized column names
+    data = data.rename(columns={
+        "Open": "Open",
+        "High": "High",
+        "Low": "Low",
+        "Close": "Close",
+        "Volume": "Volume"
+    })
+
+    return data
+
+def parse_tickers(items):
+    """
+    Expands command-line ticker arguments: symbols, or @file with one symbol per line.
+
+    Returns:
+        list: Upper-cased ticker symbols in order.
+    """
+    tickers = []
+    for item in items:
+        if item.startswith("@"):
+            with open(item[1:]) as f:
+                tickers.extend(line.strip().upper() for line in f if line.strip())
+        else:
+            tickers.append(item.upper())
+    return tickers
+
+def get_store(offline=None, provider=download_data):
+    """
+    Returns the persistent DataStore used by the app.
+
+    Args:
+        offline (bool): Serve stored data only; defaults to BACKTESTER_OFFLINE.
+        provider (callable): Download function, replaceable for tests.
+    """
+    return DataStore(DATA_DIR, provider=provider, offline=OFFLINE if offline is None else offline)
+
+def load_data(ticker, start_date, end_date, offline=None):
+    """
+    Loads historical data through the persistent store, without any UI calls.
+
+    Only date ranges that were never fetched before are downloaded.
+
+    Returns:
+        pd.DataFrame: DataFrame with historical data, or None if empty.
+
+    Raises:
+        Exception: Whatever the provider raises on download errors.
+    """
+    data = get_store(offline).load(ticker, start_date, end_date)
+    if data is None or data.empty:
+        return None
+    return data
 
 @st.cache_data
-def fetch_data(ticker, start_date, end_date):
+def fetch_data(ticker, start_date, end_date, offline=None):
     """
     Fetches historical data from yfinance.
-    
+
     Args:
         ticker (str): Ticker symbol (e.g., 'AAPL', 'BTC-USD').
         start_date (datetime): Start date.
         end_date (datetime): End date.
-        
+        offline (bool): Serve stored data only; defaults to BACKTESTER_OFFLINE.
+
     Returns:
-        pd.DataFrame: DataFrame with historical data, or None if empty/error.
-    """
-    try:
-        data = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
-        
-        if data.empty:
-            st.warning(f"No data found for {ticker}. Please check the symbol and dates.")
-            return None
-            
-        # Handle MultiIndex columns (common in new yfinance versions)
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
-            
-        # Ensure we have standardized column names
-        data = data.rename(columns={
-            "Open": "Open",
-            "High": "High",
-            "Low": "Low",
-            "Close": "Close",
-            "Volume": "Volume"
-        })
-        
-        return data
-
-    except Exception as e:
-        st.error(f"Error fetching data: {str(e)}")
-        return None
+        pd.DataFrame: DataFrame with historical data.
+
+    Raises:
+        DataUnavailable: No data for the ticker and dates.
+        Exception: Whatever the provider raises on download errors.
+    """
+    data = load_data(ticker, start_date, end_date, offline)
+    if data is None:
+        raise DataUnavailable(f"No data found for {ticker}. Please check the symbol and dates.")
+    return data
+
+def generate_synthetic_data(n_bars, seed=0, start="2000-01-03", freq="min", bars_per_year=252 * 390, s0=100.0, mu=0.05, sigma=0.2):
+    """
+    Generates offline OHLCV data from a geometric Brownian motion.
+
+    Args:
+        n_bars (int): Number of bars.
+        seed (int): Random seed.
+        start (str): First timestamp.
+        freq (str): Bar frequency (pandas offset alias).
+        bars_per_year (int): Bars per trading year, scales drift and volatility.
+        s0 (float): Initial price.
+        mu (float): Annual drift.
+        sigma (float): Annual volatility.
+
+    Returns:
+        pd.DataFrame: Same schema as fetch_data (Open, High, Low, Close, Volume).
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n_bars, freq=freq, name="Date")
+    dt = 1.0 / bars_per_year
+
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal(n_bars)
+    close = s0 * np.exp(np.cumsum(log_returns))
+    open_ = np.empty(n_bars)
+    open_[0] = s0
+    open_[1:] = close[:-1]
+    wiggle = sigma * np.sqrt(dt) * np.abs(rng.standard_normal((2, n_bars)))
+    high = np.maximum(open_, close) * (1 + wiggle[0])
+    low = np.minimum(open_, close) * (1 - wiggle[1])
+    volume = rng.lognormal(mean=12, sigma=0.5, size=n_bars).round()
+
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
@@ -0,0 +1,529 @@
+import itertools
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.connection import Listener, Client, AuthenticationError, wait
+import numpy as np
+import pandas as pd
+from backtest import Backtester
+from metrics import calculate_metrics, METRIC_NAMES
+from strategies import STRATEGIES
+from sweep import SWEEPS, evaluate_grid
+
+# Strategy -> (grid argument, configuration column) pairs; columns are the strategy keyword arguments
+GRID_COLUMNS = {
+    'sma': [('short_windows', 'short_window'), ('long_windows', 'long_window')],
+    'rsi': [('periods', 'period'), ('buy_thresholds', 'buy_threshold'), ('sell_thresholds', 'sell_threshold')],
+}
+
+# 'vectorized' scores a task as one sweep.evaluate_grid matrix, 'backtest'
+# runs the strategy function and Backtester per configuration
+ENGINES = ('vectorized', 'backtest')
+
+def make_grid(strategy, grid):
+    """
+    Configurations of a sweep, in the same order as sweep.sma_indicators / rsi_indicators.
+
+    Args:
+        strategy (str): Key of GRID_COLUMNS ('sma', 'rsi').
+        grid (dict): Grid arguments, e.g. {'short_windows': [10, 20], 'long_windows': [50, 100]}.
+
+    Returns:
+        pd.DataFrame: One row per configuration.
+    """
+    if strategy not in GRID_COLUMNS:
+        raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {sorted(GRID_COLUMNS)}.")
+    arguments = [argument for argument, _ in GRID_COLUMNS[strategy]]
+    missing = set(arguments) - set(grid)
+    if missing:
+        raise ValueError(f"Grid for '{strategy}' is missing {sorted(missing)}.")
+    return pd.DataFrame(list(itertools.product(*(grid[argument] for argument in arguments))),
+                        columns=[column for _, column in GRID_COLUMNS[strategy]])
+
+def evaluate_task(df, strategy, engine, params, initial_capital=10000.0, transaction_cost=0.001):
+    """
+    Scores one task: a block of configurations on one price series.
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        strategy (str): Key of GRID_COLUMNS.
+        engine (str): One of ENGINES.
+        params (np.ndarray): (configs x parameters) in GRID_COLUMNS order.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+
+    Returns:
+        np.ndarray: (configs x METRIC_NAMES) float64 metric rows.
+    """
+    configs = pd.DataFrame(params, columns=[column for _, column in GRID_COLUMNS[strategy]])
+    if engine == 'vectorized':
+        # Tasks are contiguous slices of the product grid, so the product of
+        # their distinct values is barely larger than the slice itself
+        indicator_builder, signal_fn = SWEEPS[strategy]
+        _, indicators = indicator_builder(df, *(np.unique(configs[column]) for column in configs.columns))
+        metrics = evaluate_grid(df, configs, partial(signal_fn, *indicators), initial_capital, transaction_cost)
+        return metrics[METRIC_NAMES].to_numpy(dtype=float)
+    if engine != 'backtest':
+        raise ValueError(f"Unknown engine '{engine}'. Expected one of {ENGINES}.")
+
+    rows = np.empty((len(configs), len(METRIC_NAMES)))
+    for i, config in enumerate(configs.to_dict('records')):
+        signals = STRATEGIES[strategy](df, **config)
+        portfolio, trades = Backtester(df, signals, initial_capital, transaction_cost).run_backtest()
+        metrics = calculate_metrics(portfolio, trades)
+        rows[i] = [metrics[name] for name in METRIC_NAMES]
+    return rows
+
+def _client_address(address):
+    # A coordinator bound to all interfaces is reached locally through loopback
+    host, port = address
+    return ('127.0.0.1' if host in ('', '0.0.0.0') else host, port)
+
+class Coordinator:
+    """
+    Hands sweep tasks to workers over TCP and collects their metric rows.
+
+    Workers on any host connect with multiprocessing.connection (messages
+    are pickled and the handshake is authenticated with `authkey`), ask for
+    work, and get one task at a time together with the price series it
+    needs, unless they report holding it already. A task is leased to its
+    worker; heartbeats extend the lease, and a task whose worker
+    disconnects, reports an error or goes quiet past `lease_timeout` is
+    queued again at the front. The first result per task wins, so a late
+    answer from a worker that was given up on is dropped, and the results
+    come back in task order whichever worker computed them.
+    """
+
+    def __init__(self, tasks, frames, address=('127.0.0.1', 0), authkey=None, lease_timeout=30.0,
+                 max_attempts=3, log=print):
+        """
+        Args:
+            tasks (list): Task specs (dicts with 'key', 'strategy', 'engine',
+                'params', 'initial_capital', 'transaction_cost').
+            frames (dict): Data key -> price DataFrame shipped to workers.
+            address (tuple): (host, port) to listen on; port 0 picks a free one.
+            authkey (bytes): Shared secret of the cluster (default: random,
+                for workers started by this process).
+            lease_timeout (float): Seconds without a heartbeat before a task is reassigned.
+            max_attempts (int): Assignments per task before the sweep fails.
+            log (callable): Receives one line per reassignment or worker error.
+        """
+        self.tasks = list(tasks)
+        self.frames = frames
+        self.authkey = authkey if authkey is not None else os.urandom(32)
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.log = log
+        self.listener = Listener(address, family='AF_INET', authkey=self.authkey)
+        self.stats = {'tasks': len(self.tasks), 'workers': 0, 'reassigned': 0, 'duplicates': 0}
+        self._workers = {}
+
+        self._incoming = deque()
+        self._closing = False
+        self._accepter = threading.Thread(target=self._accept, daemon=True)
+        self._accepter.start()
+
+    @property
+    def address(self):
+        return self.listener.address
+
+    def _accept(self):
+        while not self._closing:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError):
+                continue
+            except OSError:
+                break
+            if self._closing:
+                conn.close()
+                break
+            self._incoming.append(conn)
+
+    def serve(self, timeout=None, poll_interval=0.2):
+        """
+        Runs until every task has a result.
+
+        Args:
+            timeout (float): Overall limit in seconds (default: none; workers may join at any time).
+            poll_interval (float): Seconds between lease checks while no message arrives.
+
+        Returns:
+            list: Metric rows (np.ndarray) per task, in task order.
+
+        Raises:
+            RuntimeError: A task failed or was lost max_attempts times.
+            TimeoutError: The sweep did not finish within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._workers = {}
+        self._idle = deque()
+        self._pending = deque(range(len(self.tasks)))
+        self._leases = {}
+        self._attempts = [0] * len(self.tasks)
+        self._results = {}
+
+        while len(self._results) < len(self.tasks):
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Sweep incomplete after {timeout}s: "
+                                   f"{len(self._results)}/{len(self.tasks)} tasks done.")
+            while self._incoming:
+                self._workers[self._incoming.popleft()] = {'name': None, 'task': None, 'frames': set()}
+                self.stats['workers'] += 1
+
+            if self._workers:
+                ready = wait(list(self._workers), timeout=poll_interval)
+            else:
+                time.sleep(poll_interval)
+                ready = []
+            for conn in ready:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._drop(conn)
+                    continue
+                self._handle(conn, message)
+
+            now = time.monotonic()
+            for task_id, (conn, expires) in list(self._leases.items()):
+                if now > expires:
+                    del self._leases[task_id]
+                    self._retry(task_id, f"lease expired on {self._workers.get(conn, {}).get('name')}")
+            self._dispatch()
+        return [self._results[task_id] for task_id in range(len(self.tasks))]
+
+    def _handle(self, conn, message):
+        worker = self._workers[conn]
+        kind = message[0]
+        if kind == 'ready':
+            _, worker['name'], frames = message
+            worker['frames'] = set(frames)
+            worker['task'] = None
+            self._idle.append(conn)
+        elif kind == 'heartbeat':
+            lease = self._leases.get(message[1])
+            if lease is not None and lease[0] is conn:
+                self._leases[message[1]] = (conn, time.monotonic() + self.lease_timeout)
+        elif kind == 'result':
+            _, task_id, rows, _ = message
+            if self._leases.get(task_id, (None,))[0] is conn:
+                del self._leases[task_id]
+            if task_id in self._results:
+                self.stats['duplicates'] += 1
+            else:
+                self._results[task_id] = rows
+        elif kind == 'error':
+            _, task_id, error = message
+            if self._leases.get(task_id, (None,))[0] is conn:
+                del self._leases[task_id]
+                self._retry(task_id, f"{worker['name']}: {error}")
+
+    def _drop(self, conn):
+        worker = self._workers.pop(conn)
+        if conn in self._idle:
+            self._idle.remove(conn)
+        task_id = worker['task']
+        if task_id is not None and self._leases.get(task_id, (None,))[0] is conn:
+            del self._leases[task_id]
+            self._retry(task_id, f"{worker['name']} disconnected")
+        conn.close()
+
+    def _retry(self, task_id, reason):
+        if task_id in self._results:
+            return
+        if self._attempts[task_id] >= self.max_attempts:
+            raise RuntimeError(f"Task {task_id} failed {self._attempts[task_id]} times; last: {reason}")
+        self.stats['reassigned'] += 1
+        self.log(f"Reassigning task {task_id}: {reason}")
+        self._pending.appendleft(task_id)
+
+    def _dispatch(self):
+        while self._idle and self._pending:
+            task_id = self._pending.popleft()
+            if task_id in self._results or task_id in self._leases:
+                continue
+            conn = self._idle.popleft()
+            worker = self._workers[conn]
+            spec = self.tasks[task_id]
+            frames = {} if spec['key'] in worker['frames'] else {spec['key']: self.frames[spec['key']]}
+            try:
+                conn.send(('task', task_id, spec, frames))
+            except OSError:
+                self._pending.appendleft(task_id)
+                self._drop(conn)
+                continue
+            self._attempts[task_id] += 1
+            self._leases[task_id] = (conn, time.monotonic() + self.lease_timeout)
+            worker['task'] = task_id
+
+    def close(self):
+        """
+        Tells connected workers to stop and closes the listener (idempotent).
+        """
+        if self._closing:
+            return
+        self._closing = True
+        for conn in list(self._workers):
+            try:
+                conn.send(('stop',))
+            except OSError:
+                pass
+            conn.close()
+        # accept() does not return when its socket is closed from another thread; wake it up
+        try:
+            socket.create_connection(_client_address(self.address), timeout=1.0).close()
+        except OSError:
+            pass
+        self._accepter.join(timeout=1.0)
+        self.listener.close()
+        while self._incoming:
+            self._incoming.popleft().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _connect(address, authkey, connect_timeout):
+    deadline = time.monotonic() + connect_timeout
+    delay = 0.05
+    while True:
+        try:
+            return Client(_client_address(address), family='AF_INET', authkey=authkey)
+        except ConnectionRefusedError:
+            if time.monotonic() + delay > deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+def _heartbeat(send, task_id, interval, stop):
+    while not stop.wait(interval):
+        try:
+            send(('heartbeat', task_id))
+        except OSError:
+            return
+
+def run_worker(address, authkey, heartbeat_interval=5.0, name=None, max_frames=4, connect_timeout=30.0):
+    """
+    Pulls and evaluates tasks from a Coordinator until it says stop or goes away.
+
+    A background thread sends a heartbeat every `heartbeat_interval`
+    seconds while a task runs; keep it well below the coordinator's
+    lease_timeout. The most recently used `max_frames` price series are
+    kept, so consecutive tasks on one ticker transfer its data once.
+
+    Args:
+        address (tuple): Coordinator (host, port).
+        authkey (bytes): Shared secret of the cluster.
+        heartbeat_interval (float): Seconds between heartbeats.
+        name (str): Worker name in coordinator logs (default: host:pid).
+        max_frames (int): Price series cached by this worker.
+        connect_timeout (float): Seconds to keep retrying while the coordinator is not up yet.
+
+    Returns:
+        int: Number of tasks completed.
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    conn = _connect(address, authkey, connect_timeout)
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    frames = OrderedDict()
+    completed = 0
+    try:
+        while True:
+            send(('ready', name, tuple(frames)))
+            message = conn.recv()
+            if message[0] == 'stop':
+                break
+            _, task_id, spec, new_frames = message
+            frames.update(new_frames)
+            frames.move_to_end(spec['key'])
+            while len(frames) > max(max_frames, 1):
+                frames.popitem(last=False)
+
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(send, task_id, heartbeat_interval, stop), daemon=True)
+            beat.start()
+            started = time.perf_counter()
+            try:
+                rows = evaluate_task(frames[spec['key']], spec['strategy'], spec['engine'], spec['params'],
+                                     spec['initial_capital'], spec['transaction_cost'])
+                reply = ('result', task_id, rows, time.perf_counter() - started)
+            except Exception as e:
+                reply = ('error', task_id, f"{type(e).__name__}: {e}")
+            finally:
+                stop.set()
+                beat.join()
+            send(reply)
+            completed += reply[0] == 'result'
+    except (EOFError, OSError):
+        # Coordinator finished or went away
+        pass
+    finally:
+        conn.close()
+    return completed
+
+def start_local_workers(address, authkey, n_workers, heartbeat_interval=5.0, mp_context=None):
+    """
+    Starts worker processes on this machine (each acts like a separate node).
+
+    Returns:
+        list: The started multiprocessing.Process objects.
+    """
+    ctx = mp_context or get_context()
+    workers = []
+    for i in range(n_workers):
+        process = ctx.Process(target=run_worker, args=(address, authkey, heartbeat_interval),
+                              kwargs={'name': f"local-{i}"}, daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+def distributed_sweep(data, strategy, grid, engine='vectorized', initial_capital=10000.0, transaction_cost=0.001,
+                      task_size=256, address=('127.0.0.1', 0), authkey=None, local_workers=0,
+                      lease_timeout=30.0, heartbeat_interval=5.0, max_attempts=3, timeout=None, log=print):
+    """
+    Runs a parameter sweep over one or many price series on distributed workers.
+
+    The grid is split into tasks of `task_size` configurations per series
+    and served by a Coordinator; workers started elsewhere with run_worker
+    (or `python distributed.py worker`) and `local_workers` processes on
+    this machine pull them. Each worker returns compact float64 metric rows
+    only. Rows are merged by task and configuration order, so the result
+    does not depend on which worker ran what, on retries or on timing, and
+    with engine='vectorized' it equals sweep.evaluate_grid on the full grid.
+
+    Args:
+        data (pd.DataFrame or dict): Price data with a 'Close' column, or ticker -> DataFrame.
+        strategy (str): Key of GRID_COLUMNS ('sma', 'rsi').
+        grid (dict): Grid arguments, e.g. {'periods': [14], 'buy_thresholds': [30], 'sell_thresholds': [70]}.
+        engine (str): One of ENGINES.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        task_size (int): Configurations per task.
+        address (tuple): (host, port) for the coordinator; use ('0.0.0.0', port) for remote workers.
+        authkey (bytes): Shared secret (default: random, local workers only).
+        local_workers (int): Worker processes to start on this machine.
+        lease_timeout (float): Seconds without a heartbeat before a task is reassigned.
+        heartbeat_interval (float): Heartbeat period of the local workers.
+        max_attempts (int): Assignments per task before the sweep fails.
+        timeout (float): Overall limit in seconds.
+        log (callable): Receives reassignment messages.
+
+    Returns:
+        pd.DataFrame: Parameter and metric columns per configuration; for a
+            dict of series, indexed by (ticker, configuration).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Expected one of {ENGINES}.")
+    task_size = int(task_size)
+    if task_size < 1:
+        raise ValueError("task_size must be at least 1.")
+    single = isinstance(data, pd.DataFrame)
+    series = {None: data} if single else data
+    configs = make_grid(strategy, grid)
+    params = configs.to_numpy()
+
+    frames = {}
+    tasks = []
+    for key, df in series.items():
+        if 'Close' not in df.columns:
+            raise ValueError(f"Price data for {key or 'the sweep'} has no 'Close' column.")
+        frames[key] = df[['Close']]
+        for lo in range(0, len(configs), task_size):
+            tasks.append({'key': key, 'strategy': strategy, 'engine': engine,
+                          'params': params[lo:lo + task_size], 'initial_capital': initial_capital,
+                          'transaction_cost': transaction_cost})
+
+    with Coordinator(tasks, frames, address, authkey, lease_timeout, max_attempts, log) as coordinator:
+        workers = start_local_workers(coordinator.address, coordinator.authkey, local_workers, heartbeat_interval)
+        try:
+            rows = coordinator.serve(timeout)
+        finally:
+            coordinator.close()
+            for process in workers:
+                process.join(timeout=5.0)
+                if process.is_alive():
+                    process.terminate()
+
+    results = {}
+    position = 0
+    for key in series:
+        n_tasks = -(-len(configs) // task_size)
+        block = rows[position:position + n_tasks]
+        position += n_tasks
+        metrics = pd.DataFrame(np.vstack(block) if block else np.empty((0, len(METRIC_NAMES))),
+                               columns=METRIC_NAMES, index=configs.index)
+        metrics['Number of Trades'] = metrics['Number of Trades'].astype(np.int64)
+        results[key] = configs.join(metrics)
+    if single:
+        return results[None]
+    return pd.concat(results, names=['Ticker', None])
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import date, timedelta
+
+    parser = argparse.ArgumentParser(description="Distributed parameter sweeps: one coordinator, workers on any host.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = commands.add_parser("coordinator", help="Split a sweep into tasks and serve them.")
+    coordinator.add_argument("tickers", nargs="+", help="Ticker symbols, or @file with one symbol per line.")
+    coordinator.add_argument("--strategy", default="sma", choices=sorted(GRID_COLUMNS))
+    coordinator.add_argument("--grid", required=True,
+                             help='Grid as JSON, e.g. \'{"short_windows": [10, 20], "long_windows": [50, 100]}\'.')
+    coordinator.add_argument("--engine", default="vectorized", choices=ENGINES)
+    coordinator.add_argument("--start", default=str(date.today() - timedelta(days=365 * 2)))
+    coordinator.add_argument("--end", default=str(date.today()))
+    coordinator.add_argument("--capital", type=float, default=10000.0)
+    coordinator.add_argument("--cost", type=float, default=0.001)
+    coordinator.add_argument("--bind", default="0.0.0.0:6000", help="host:port to listen on.")
+    coordinator.add_argument("--task-size", type=int, default=256)
+    coordinator.add_argument("--local-workers", type=int, default=0)
+    coordinator.add_argument("--lease-timeout", type=float, default=30.0)
+    coordinator.add_argument("--output", help="Write the result table to this CSV file.")
+
+    worker = commands.add_parser("worker", help="Pull tasks from a coordinator.")
+    worker.add_argument("address", help="Coordinator host:port.")
+    worker.add_argument("--heartbeat", type=float, default=5.0, help="Seconds between heartbeats.")
+    worker.add_argument("--name", help="Worker name in coordinator logs.")
+    args = parser.parse_args()
+
+    # Messages are pickled, so only hosts that know the key may connect
+    key = os.environ.get("BACKTESTER_CLUSTER_KEY")
+    host, port = args.address.rsplit(":", 1) if args.command == "worker" else args.bind.rsplit(":", 1)
+
+    if args.command == "worker":
+        if not key:
+            parser.error("Set BACKTESTER_CLUSTER_KEY to the coordinator's key.")
+        completed = run_worker((host, int(port)), key.encode(), args.heartbeat, args.name)
+        print(f"{completed} tasks completed.")
+    else:
+        from data import load_data, parse_tickers
+        if not key:
+            key = os.urandom(16).hex()
+            print(f"Workers must set BACKTESTER_CLUSTER_KEY={key}")
+        tickers = parse_tickers(args.tickers)
+        data = {}
+        for ticker in tickers:
+            df = load_data(ticker, args.start, args.end)
+            if df is None:
+                print(f"{ticker}: no data, skipped")
+            else:
+                data[ticker] = df
+        results = distributed_sweep(data, args.strategy, json.loads(args.grid), args.engine, args.capital, args.cost,
+                                    args.task_size, (host, int(port)), key.encode(), args.local_workers,
+                                    args.lease_timeout)
+        if args.output:
+            results.to_csv(args.output)
+        print(results.to_string())
@@ -0,0 +1,254 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+import pandas as pd
+from data import download_data
+from store import DataStore, NoData
+
+class _EmptyAnswer(Exception):
+    """
+    An empty answer to a single-ticker request. yfinance also answers that
+    way on network errors and rate limits, so it is retried like a failure.
+    """
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: at most `rate` requests per second on average,
+    with bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Bucket size (default: max(1, rate)).
+            clock (callable): Monotonic time source, replaceable for tests.
+            sleep (callable): Sleep function, replaceable for tests.
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until `tokens` tokens are available, then takes them.
+        """
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+
+def download_batch(tickers, start_date, end_date):
+    """
+    Downloads several tickers in one yfinance request.
+
+    Returns:
+        dict: Ticker -> OHLCV DataFrame; symbols without data are left out.
+    """
+    data = yf.download(list(tickers), start=start_date, end=end_date, progress=False,
+                       auto_adjust=True, group_by='ticker', threads=False)
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    available = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+    for ticker in tickers:
+        if ticker in available:
+            frame = data[ticker].dropna(how='all')
+            frame.columns.name = None
+            if not frame.empty:
+                frames[ticker] = frame
+    return frames
+
+class Fetcher:
+    """
+    Concurrent market data fetcher with bounded connections, rate limiting and retries.
+
+    Requests run on a thread pool of `max_workers` connections; every request
+    (single or batched) takes one token from a shared TokenBucket. Failed
+    requests, and empty answers to single-ticker requests, are retried with capped exponential backoff and jitter. Nothing
+    is reported to the UI: failures come back as structured per-ticker errors.
+    """
+
+    def __init__(self, provider=download_data, batch_provider=None, max_workers=8, rate=5.0, burst=None,
+                 retries=3, backoff=0.5, max_backoff=30.0, batch_size=50, sleep=time.sleep):
+        """
+        Args:
+            provider (callable): provider(ticker, start, end) -> DataFrame.
+            batch_provider (callable): batch_provider(tickers, start, end) -> {ticker: DataFrame}
+                for multi-symbol requests (e.g. download_batch); None fetches one ticker per request.
+            max_workers (int): Concurrent requests.
+            rate (float): Requests per second across all workers.
+            burst (float): Token bucket capacity.
+            retries (int): Retries after the first failed attempt.
+            backoff (float): First retry delay in seconds, doubled per attempt.
+            max_backoff (float): Upper bound on a single retry delay.
+            batch_size (int): Tickers per multi-symbol request.
+            sleep (callable): Sleep function, replaceable for tests.
+        """
+        self.provider = provider
+        self.batch_provider = batch_provider
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.sleep = sleep
+
+    def _call(self, fn, *args, retry_empty=False):
+        """
+        Calls fn under the rate limit, retrying on exceptions.
+
+        Args:
+            retry_empty (bool): Also retry None or empty DataFrame results;
+                if every attempt is empty the error type is 'NoData'.
+
+        Returns:
+            (object, dict): The result (None on failure) and the error record (None on success).
+        """
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                result = fn(*args)
+                if retry_empty and (result is None or result.empty):
+                    raise _EmptyAnswer(f"No data for {args[0]}")
+                return result, None
+            except NoData:
+                # A confirmed absence is an answer, not a failure to retry
+                raise
+            except Exception as e:
+                kind = 'NoData' if isinstance(e, _EmptyAnswer) else type(e).__name__
+                error = {'type': kind, 'message': str(e), 'attempts': attempt + 1}
+                if attempt < self.retries:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                    self.sleep(delay * (0.5 + random.random() / 2))
+        return None, error
+
+    def _fetch_one(self, ticker, start_date, end_date):
+        try:
+            data, error = self._call(self.provider, ticker, start_date, end_date, retry_empty=True)
+        except NoData:
+            return ticker, pd.DataFrame(), None
+        return ticker, data, error
+
+    def _fetch_group(self, tickers, start_date, end_date):
+        try:
+            frames, error = self._call(self.batch_provider, tickers, start_date, end_date)
+        except NoData:
+            frames, error = {}, None
+        results = []
+        for ticker in tickers:
+            frame = (frames or {}).get(ticker)
+            if frame is not None and not frame.empty:
+                results.append((ticker, frame, None))
+            elif error is not None:
+                results.append((ticker, None, error))
+            else:
+                # Symbols missing from a batched answer get one single-ticker attempt cycle
+                results.append(self._fetch_one(ticker, start_date, end_date))
+        return results
+
+    def fetch(self, tickers, start_date, end_date):
+        """
+        Fetches every ticker for [start_date, end_date).
+
+        Returns:
+            (dict, dict): Ticker -> DataFrame for successes (empty when the
+                provider raised store.NoData to confirm there are no bars), and
+                ticker -> {'type', 'message', 'attempts'} for failures,
+                including 'NoData' when every attempt came back empty.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            if self.batch_provider is not None:
+                groups = [tickers[i:i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+                futures = [pool.submit(self._fetch_group, group, start_date, end_date) for group in groups]
+                outcomes = [outcome for future in futures for outcome in future.result()]
+            else:
+                futures = [pool.submit(self._fetch_one, ticker, start_date, end_date) for ticker in tickers]
+                outcomes = [future.result() for future in futures]
+
+        data = {ticker: frame for ticker, frame, error in outcomes if error is None}
+        errors = {ticker: error for ticker, _, error in outcomes if error is not None}
+        return data, errors
+
+    def fill_store(self, store, tickers, start_date, end_date):
+        """
+        Concurrently downloads whatever the store is missing for each ticker.
+
+        Tickers with the same missing range share batched requests. Ranges
+        that fail, or come back empty without the provider confirming it
+        (store.NoData), stay missing, so a later call retries them.
+
+        Args:
+            store (DataStore): Target store.
+            tickers (list): Ticker symbols.
+            start_date (date): Start date.
+            end_date (date): End date (exclusive).
+
+        Returns:
+            dict: Ticker -> error record for the tickers that could not be filled.
+        """
+        wanted = {}
+        for ticker in dict.fromkeys(tickers):
+            for lo, hi in store.missing_ranges(ticker, start_date, end_date):
+                wanted.setdefault((lo, hi), []).append(ticker)
+
+        fetched = {}
+        errors = {}
+        for (lo, hi), group in wanted.items():
+            data, failed = self.fetch(group, lo, hi)
+            for ticker in group:
+                if ticker in failed:
+                    errors[ticker] = failed[ticker]
+                else:
+                    fetched[(ticker, lo, hi)] = data[ticker]
+
+        def prefetched_provider(ticker, lo, hi):
+            frame = fetched.get((ticker, lo, hi))
+            if frame is not None and frame.empty:
+                raise NoData(f"No bars for {ticker} in [{lo}, {hi})")
+            return frame
+
+        # Merge through DataStore.fill, serving the already downloaded frames;
+        # ranges that failed are not served, so they stay missing
+        prefetched = DataStore(store.root, provider=prefetched_provider)
+        for ticker in dict.fromkeys(ticker for ticker, _, _ in fetched):
+            prefetched.fill(ticker, start_date, end_date)
+        return errors
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date, timedelta
+    from data import get_store, parse_tickers
+
+    parser = argparse.ArgumentParser(description="Concurrently download market data into the local store.")
+    parser.add_argument("tickers", nargs="+", help="Ticker symbols, or @file with one symbol per line.")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 2)))
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent connections.")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second.")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=50, help="Tickers per request (1 disables batching).")
+    args = parser.parse_args()
+
+    tickers = parse_tickers(args.tickers)
+
+    fetcher = Fetcher(batch_provider=download_batch if args.batch_size > 1 else None, max_workers=args.workers,
+                      rate=args.rate, retries=args.retries, batch_size=args.batch_size)
+    errors = fetcher.fill_store(get_store(offline=False), tickers, date.fromisoformat(args.start), date.fromisoformat(args.end))
+    print(f"{len(tickers) - len(errors)} of {len(tickers)} tickers stored.")
+    if errors:
+        print(pd.DataFrame.from_dict(errors, orient='index').to_string())
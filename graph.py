@@ -0,0 +1,308 @@
+import numpy as np
+import pandas as pd
+from cache import INDICATOR_CACHE, fingerprint
+
+# Operations whose results go through the indicator cache across runs
+CACHED_OPS = {'rolling_mean', 'ewm_mean'}
+
+class Node:
+    """
+    Vectorized expression over price columns.
+
+    Nodes are immutable and built with the factory functions below and
+    Python operators (+, -, *, /, <, <=, >, >=, &, |, ~, unary -). Two
+    nodes with the same operation, parameters and inputs share a key, so
+    structurally equal subexpressions are evaluated once per Plan. `==` is
+    identity; use `.key` to compare structure.
+    """
+
+    __slots__ = ('op', 'params', 'inputs', 'key')
+
+    def __init__(self, op, params=(), inputs=()):
+        """
+        Args:
+            op (str): Operation name (a key of OPS).
+            params (tuple): Hashable parameters of the operation.
+            inputs (tuple): Input nodes.
+        """
+        self.op = op
+        self.params = tuple(params)
+        self.inputs = tuple(_node(x) for x in inputs)
+        self.key = (op, self.params, tuple(x.key for x in self.inputs))
+
+    def __repr__(self):
+        args = [repr(x) for x in self.inputs] + [repr(p) for p in self.params]
+        return f"{self.op}({', '.join(args)})"
+
+    def __add__(self, other):
+        return Node('add', (), (self, other))
+
+    def __radd__(self, other):
+        return Node('add', (), (other, self))
+
+    def __sub__(self, other):
+        return Node('sub', (), (self, other))
+
+    def __rsub__(self, other):
+        return Node('sub', (), (other, self))
+
+    def __mul__(self, other):
+        return Node('mul', (), (self, other))
+
+    def __rmul__(self, other):
+        return Node('mul', (), (other, self))
+
+    def __truediv__(self, other):
+        return Node('div', (), (self, other))
+
+    def __rtruediv__(self, other):
+        return Node('div', (), (other, self))
+
+    def __neg__(self):
+        return Node('neg', (), (self,))
+
+    def __lt__(self, other):
+        return Node('lt', (), (self, other))
+
+    def __le__(self, other):
+        return Node('le', (), (self, other))
+
+    def __gt__(self, other):
+        return Node('gt', (), (self, other))
+
+    def __ge__(self, other):
+        return Node('ge', (), (self, other))
+
+    def __and__(self, other):
+        return Node('and', (), (self, other))
+
+    def __or__(self, other):
+        return Node('or', (), (self, other))
+
+    def __invert__(self):
+        return Node('not', (), (self,))
+
+    __hash__ = object.__hash__
+
+def _node(value):
+    return value if isinstance(value, Node) else Node('const', (float(value),))
+
+def Column(name='Close'):
+    """
+    A column of the input DataFrame as float64.
+    """
+    return Node('column', (name,))
+
+def SMA(source, window, min_periods=None):
+    """
+    Rolling mean, as pd.Series.rolling(window, min_periods).mean().
+    """
+    return Node('rolling_mean', (int(window), None if min_periods is None else int(min_periods)), (source,))
+
+def EWM(source, alpha, min_periods=0):
+    """
+    Exponential mean, as pd.Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().
+    """
+    return Node('ewm_mean', (float(alpha), int(min_periods)), (source,))
+
+def Diff(source):
+    """
+    Bar-to-bar change (NaN on the first bar).
+    """
+    return Node('diff', (), (source,))
+
+def Where(condition, if_true, if_false):
+    """
+    Element-wise choice between two expressions.
+    """
+    return Node('where', (), (condition, if_true, if_false))
+
+def Hold(enter, exit):
+    """
+    Position state: 1 from a bar where `enter` holds, 0 from a bar where
+    `exit` holds (exit wins when both do), unchanged otherwise; 0 before the
+    first event.
+    """
+    return Node('hold', (), (enter, exit))
+
+def RSI(source, period=14, method='simple'):
+    """
+    Relative Strength Index as a subgraph: 100 - 100 / (1 + average gain / average loss).
+
+    The price change and the gain/loss legs are ordinary nodes, so several
+    RSI periods over the same source share them.
+    """
+    if method not in ('simple', 'wilder'):
+        raise ValueError(f"Unknown RSI method '{method}'. Expected one of ('simple', 'wilder').")
+    delta = Diff(source)
+    up = Where(delta > 0, delta, 0)
+    down = -Where(delta < 0, delta, 0)
+    if method == 'wilder':
+        gain = EWM(up, 1.0 / period, min_periods=period)
+        loss = EWM(down, 1.0 / period, min_periods=period)
+    else:
+        gain = SMA(up, period)
+        loss = SMA(down, period)
+    return 100 - (100 / (1 + gain / loss))
+
+def _rolling_mean(x, window, min_periods):
+    return pd.Series(x).rolling(window=window, min_periods=min_periods).mean().to_numpy()
+
+def _ewm_mean(x, alpha, min_periods):
+    return pd.Series(x).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+def _diff(x):
+    out = np.empty(len(x))
+    out[:1] = np.nan
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    return out
+
+def _hold(enter, exit):
+    state = np.full(len(enter), np.nan)
+    state[np.broadcast_to(enter, state.shape)] = 1.0
+    state[np.broadcast_to(exit, state.shape)] = 0.0
+    return pd.Series(state).ffill().fillna(0.0).to_numpy()
+
+# op -> function(*input arrays, *params)
+OPS = {
+    'rolling_mean': _rolling_mean,
+    'ewm_mean': _ewm_mean,
+    'diff': _diff,
+    'where': np.where,
+    'hold': _hold,
+    'add': np.add,
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'div': np.true_divide,
+    'neg': np.negative,
+    'lt': np.less,
+    'le': np.less_equal,
+    'gt': np.greater,
+    'ge': np.greater_equal,
+    'and': np.logical_and,
+    'or': np.logical_or,
+    'not': np.logical_not,
+}
+
+class Plan:
+    """
+    Evaluation plan for a set of named output expressions.
+
+    Building the plan merges structurally equal nodes across all outputs
+    (common subexpression elimination) and orders them topologically. Each
+    run evaluates every distinct node once as a NumPy array and drops an
+    intermediate as soon as its last consumer has been evaluated.
+    """
+
+    def __init__(self, outputs):
+        """
+        Args:
+            outputs (dict): Name -> Node (or a number).
+        """
+        self.outputs = {name: _node(node) for name, node in outputs.items()}
+        self.order = []
+        self.canonical = {}
+        for node in self.outputs.values():
+            self._visit(node)
+        # Consumers of each node within the plan, plus one hold per named output
+        self.consumers = {key: 0 for key in self.canonical}
+        for node in self.order:
+            for x in node.inputs:
+                self.consumers[x.key] += 1
+        for node in self.outputs.values():
+            self.consumers[node.key] += 1
+        self.columns = sorted({node.params[0] for node in self.order if node.op == 'column'})
+        self.stats = {}
+
+    def _visit(self, root):
+        # Iterative post-order, so deep expressions do not hit the recursion limit
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.key in self.canonical:
+                continue
+            if expanded:
+                self.canonical[node.key] = node
+                self.order.append(node)
+            else:
+                stack.append((node, True))
+                stack.extend((x, False) for x in reversed(node.inputs) if x.key not in self.canonical)
+
+    def run(self, df, cache=INDICATOR_CACHE):
+        """
+        Evaluates the plan on a DataFrame.
+
+        Args:
+            df (pd.DataFrame): Input with the referenced columns.
+            cache (IndicatorCache): Cache for rolling/exponential means (None disables it).
+
+        Returns:
+            dict: Output name -> np.ndarray (constants are broadcast to len(df)).
+                Cached arrays are shared; treat them as read-only.
+        """
+        n = len(df)
+        source = None
+        if cache is not None and self.columns:
+            source = tuple(fingerprint(df[name]) for name in self.columns)
+
+        values = {}
+        remaining = dict(self.consumers)
+        live_bytes = peak_bytes = freed = 0
+        with np.errstate(all='ignore'):
+            for node in self.order:
+                if node.op == 'const':
+                    value = np.float64(node.params[0])
+                elif node.op == 'column':
+                    value = df[node.params[0]].to_numpy(dtype=float)
+                else:
+                    args = [values[x.key] for x in node.inputs]
+                    compute = lambda: OPS[node.op](*args, *node.params)
+                    if source is not None and node.op in CACHED_OPS:
+                        value = cache.get_or_compute(('graph', source, node.key), compute)
+                    else:
+                        value = compute()
+                values[node.key] = value
+                live_bytes += np.asarray(value).nbytes
+                peak_bytes = max(peak_bytes, live_bytes)
+
+                for x in node.inputs:
+                    remaining[x.key] -= 1
+                    if remaining[x.key] == 0:
+                        live_bytes -= np.asarray(values.pop(x.key)).nbytes
+                        freed += 1
+
+        self.stats = {'nodes': len(self.order), 'freed': freed, 'peak_bytes': peak_bytes}
+        return {name: np.broadcast_to(values[node.key], (n,)) if np.ndim(values[node.key]) == 0 else values[node.key]
+                for name, node in self.outputs.items()}
+
+def run_strategies(df, strategies, dtype=None, cache=INDICATOR_CACHE):
+    """
+    Evaluates several declared strategies in one plan.
+
+    Subexpressions shared between strategies (e.g. the same SMA or the
+    price change feeding every RSI period) are computed once.
+
+    Args:
+        df (pd.DataFrame): Price data.
+        strategies (dict): Label -> {column: Node}; each must have a 'signal'
+            column. A 'positions' column (signal.diff()) is appended.
+        dtype: Optional dtype of the returned columns (e.g. np.float32).
+        cache (IndicatorCache): Cache for rolling/exponential means (None disables it).
+
+    Returns:
+        dict: Label -> signals DataFrame indexed like df.
+    """
+    outputs = {}
+    for label, columns in strategies.items():
+        if 'signal' not in columns:
+            raise ValueError(f"Strategy '{label}' has no 'signal' expression.")
+        for column, node in columns.items():
+            outputs[(label, column)] = node
+        outputs[(label, 'positions')] = Diff(columns['signal'])
+
+    values = Plan(outputs).run(df, cache)
+    frames = {}
+    for label, columns in strategies.items():
+        signals = pd.DataFrame({column: values[(label, column)] for column in [*columns, 'positions']}, index=df.index)
+        frames[label] = signals.astype(dtype) if dtype is not None else signals
+    return frames
@@ -0,0 +1,183 @@
+import math
+from collections import deque
+
+class RollingMean:
+    """
+    Incremental rolling mean with O(1) updates and O(window) memory.
+
+    Replicates pandas' rolling().mean() arithmetic (compensated add/remove
+    sums, sign and constant-run guards), so streamed values are bit-for-bit
+    equal to the batch series.
+    """
+
+    def __init__(self, window, min_periods=None):
+        """
+        Args:
+            window (int): Window length.
+            min_periods (int): Minimum observations for a value (default: window).
+        """
+        self.window = window
+        self.min_periods = max(window if min_periods is None else min_periods, 1)
+        self.buffer = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same_value_run = 0
+        self.prev_value = None
+        self.value = math.nan
+
+    def update(self, x):
+        """
+        Adds one observation and returns the current mean (NaN until min_periods).
+        """
+        x = float(x)
+        if self.prev_value is None:
+            self.prev_value = x
+        self.buffer.append(x)
+        if len(self.buffer) > self.window:
+            self._remove(self.buffer.popleft())
+        self._add(x)
+
+        if self.nobs >= self.min_periods:
+            result = self.sum_x / self.nobs
+            if self.same_value_run >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+        else:
+            result = math.nan
+        self.value = result
+        return result
+
+    def _add(self, x):
+        if math.isnan(x):
+            return
+        self.nobs += 1
+        y = x - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_ct += 1
+        if x == self.prev_value:
+            self.same_value_run += 1
+        else:
+            self.same_value_run = 1
+        self.prev_value = x
+
+    def _remove(self, x):
+        if math.isnan(x):
+            return
+        self.nobs -= 1
+        y = -x - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, x) < 0:
+            self.neg_ct -= 1
+
+class ExponentialMean:
+    """
+    Incremental exponential mean matching pandas ewm(alpha=..., adjust=False).mean()
+    bit-for-bit on NaN-free input.
+    """
+
+    def __init__(self, alpha, min_periods=0):
+        """
+        Args:
+            alpha (float): Smoothing factor in (0, 1].
+            min_periods (int): Minimum observations for a value.
+        """
+        # pandas converts alpha to a center of mass and back
+        com = (1.0 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.old_wt = 1.0
+        self.min_periods = min_periods
+        self.nobs = 0
+        self.weighted = None
+        self.value = math.nan
+
+    def update(self, x):
+        """
+        Adds one observation and returns the current mean (NaN until min_periods).
+        """
+        x = float(x)
+        is_observation = not math.isnan(x)
+        self.nobs += is_observation
+        if self.weighted is None:
+            self.weighted = x
+        elif not math.isnan(self.weighted):
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = x
+        self.value = self.weighted if self.nobs >= max(self.min_periods, 1) else math.nan
+        return self.value
+
+class RSI:
+    """
+    Incremental RSI with O(1) updates.
+
+    'simple' averages gains/losses with a rolling mean (as rsi_strategy does);
+    'wilder' uses Wilder smoothing, an exponential mean with alpha = 1/period.
+    """
+
+    METHODS = ('simple', 'wilder')
+
+    def __init__(self, period=14, method='simple'):
+        """
+        Args:
+            period (int): Lookback period.
+            method (str): 'simple' or 'wilder'.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown RSI method '{method}'. Expected one of {self.METHODS}.")
+        self.period = period
+        self.method = method
+        if method == 'simple':
+            self.avg_gain = RollingMean(period)
+            self.avg_loss = RollingMean(period)
+        else:
+            self.avg_gain = ExponentialMean(1.0 / period, min_periods=period)
+            self.avg_loss = ExponentialMean(1.0 / period, min_periods=period)
+        self.prev_close = None
+        self.value = math.nan
+
+    def update(self, close):
+        """
+        Adds one closing price and returns the current RSI (NaN during warm-up).
+        """
+        close = float(close)
+        delta = math.nan if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+
+        # Same construction as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0)
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+
+        self.value = rsi_from_averages(avg_gain, avg_loss)
+        return self.value
+
+def rsi_from_averages(avg_gain, avg_loss):
+    """
+    RSI = 100 - 100 / (1 + gain / loss), with IEEE semantics for zero losses.
+    """
+    if math.isnan(avg_gain) or math.isnan(avg_loss):
+        return math.nan
+    if avg_loss == 0:
+        if avg_gain == 0:
+            return math.nan
+        rs = math.copysign(math.inf, avg_gain) * math.copysign(1.0, avg_loss)
+    else:
+        rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
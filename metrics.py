@@ -1,3 +1,4 @@
+from collections import deque
 import pandas as pd
 import numpy as np
 
@@ -82,3 +83,219 @@ def calculate_metrics(portfolio, trades=None):
         metrics['Win Rate'] = 0.0
         
     return metrics
+
+METRIC_NAMES = ['Total Return', 'CAGR', 'Volatility', 'Sharpe Ratio', 'Max Drawdown', 'Number of Trades', 'Win Rate']
+
+def calculate_metrics_batch(equity, index=None, trades=None, rf=0.02):
+    """
+    Calculates calculate_metrics for many equity curves at once.
+    
+    Reductions follow the pandas algorithms (NaN-as-zero sums along each
+    contiguous column), so every value is identical to calling
+    calculate_metrics on the corresponding single portfolio.
+    
+    Args:
+        equity (np.ndarray or pd.DataFrame): (bars x strategies) portfolio values.
+        index (pd.DatetimeIndex): Bar dates (taken from equity if it is a DataFrame).
+        trades (pd.DataFrame): Compact trade table with 'column' (strategy position),
+            'Type' ('Buy'/'Sell'), 'Value' and 'Commission', in execution order.
+        rf (float): Annual risk-free rate.
+    
+    Returns:
+        pd.DataFrame: One row per strategy, one column per metric.
+    """
+    labels = None
+    if isinstance(equity, pd.DataFrame):
+        labels = equity.columns
+        index = equity.index if index is None else index
+        equity = equity.to_numpy(dtype=float)
+    equity = np.asfortranarray(np.asarray(equity, dtype=float))
+    if equity.ndim == 1:
+        equity = equity[:, None]
+    n_bars, n_cols = equity.shape
+    metrics = {}
+    
+    start_val = equity[0]
+    end_val = equity[-1]
+    metrics['Total Return'] = (end_val / start_val) - 1
+    
+    days = (index[-1] - index[0]).days
+    if days > 0:
+        # Scalar pow per column; the SIMD array pow can differ in the last bit
+        metrics['CAGR'] = np.array([ratio ** (365.0/days) for ratio in (end_val / start_val).tolist()]) - 1
+    else:
+        metrics['CAGR'] = np.zeros(n_cols)
+    
+    # Returns with the leading NaN stored as 0, as pandas' nan-reductions do
+    returns = np.zeros_like(equity, order='F')
+    returns[1:] = equity[1:] / equity[:-1] - 1
+    count = n_bars - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = returns.sum(axis=0) / count if count > 0 else np.full(n_cols, np.nan)
+        squared = (mean - returns) ** 2
+        squared[0] = 0.0
+        std = np.sqrt(squared.sum(axis=0) / (count - 1)) if count > 1 else np.full(n_cols, np.nan)
+        
+        volatility = std * np.sqrt(252)
+        metrics['Volatility'] = volatility
+        
+        excess = returns - rf/252
+        excess[0] = 0.0
+        excess_mean = excess.sum(axis=0) / count if count > 0 else np.full(n_cols, np.nan)
+        metrics['Sharpe Ratio'] = np.where(volatility > 0, excess_mean / std * np.sqrt(252), 0.0)
+    
+    if n_bars > 1:
+        cumulative = np.cumprod(1 + returns[1:], axis=0)
+        peak = np.maximum.accumulate(cumulative, axis=0)
+        metrics['Max Drawdown'] = ((cumulative - peak) / peak).min(axis=0)
+    else:
+        metrics['Max Drawdown'] = np.full(n_cols, np.nan)
+    
+    n_trades = np.zeros(n_cols, dtype=np.int64)
+    win_rate = np.zeros(n_cols)
+    if trades is not None and not trades.empty:
+        column = trades['column'].to_numpy(dtype=np.int64)
+        n_trades = np.bincount(column, minlength=n_cols)
+        
+        # Pair the i-th Buy with the i-th Sell of each strategy
+        is_buy = (trades['Type'] == 'Buy').to_numpy()
+        rank = trades.groupby([column, is_buy]).cumcount().to_numpy()
+        buys = pd.DataFrame({'column': column[is_buy], 'rank': rank[is_buy],
+                             'cost': trades['Value'].to_numpy()[is_buy] + trades['Commission'].to_numpy()[is_buy]})
+        sells = pd.DataFrame({'column': column[~is_buy], 'rank': rank[~is_buy],
+                              'proceeds': trades['Value'].to_numpy()[~is_buy] - trades['Commission'].to_numpy()[~is_buy]})
+        cycles = buys.merge(sells, on=['column', 'rank'])
+        n_cycles = np.bincount(cycles['column'].to_numpy(), minlength=n_cols)
+        wins = np.bincount(cycles['column'].to_numpy(), weights=(cycles['proceeds'] - cycles['cost']).to_numpy() > 0, minlength=n_cols)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(n_cycles > 0, wins / n_cycles, 0.0)
+    metrics['Number of Trades'] = n_trades
+    metrics['Win Rate'] = win_rate
+    
+    return pd.DataFrame(metrics, index=labels, columns=METRIC_NAMES)
+
+def compact_trades(trade_frames):
+    """
+    Stacks per-strategy Backtester trade logs into the compact table used by
+    calculate_metrics_batch.
+    
+    Args:
+        trade_frames (list): Trade DataFrames, one per equity column.
+    
+    Returns:
+        pd.DataFrame: 'column', 'Type', 'Value', 'Commission'.
+    """
+    parts = [pd.DataFrame({'column': position, 'Type': frame['Type'].to_numpy(),
+                           'Value': frame['Value'].to_numpy(), 'Commission': frame['Commission'].to_numpy()})
+             for position, frame in enumerate(trade_frames) if frame is not None and not frame.empty]
+    if not parts:
+        return pd.DataFrame(columns=['column', 'Type', 'Value', 'Commission'])
+    return pd.concat(parts, ignore_index=True)
+
+class RunningMetrics:
+    """
+    Incremental counterpart of calculate_metrics.
+    
+    Keeps running moments (Welford) for volatility/Sharpe, the running peak
+    for drawdown and open trade legs for the win rate, so metrics can be
+    extended bar by bar and checkpointed. Results equal calculate_metrics
+    up to floating-point round-off in the volatility and Sharpe moments.
+    """
+    def __init__(self, rf=0.02):
+        self.rf = rf
+        self.start_val = None
+        self.start_date = None
+        self.end_val = None
+        self.end_date = None
+        # Welford moments of daily returns
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self.m2 = 0.0
+        # Drawdown on the compounded returns
+        self.cumulative = 1.0
+        self.peak = None
+        self.max_drawdown = np.nan
+        # Trade legs waiting for their counterpart (Buy i pairs with Sell i)
+        self.n_buys = 0
+        self.n_sells = 0
+        self.wins = 0
+        self.open_buys = deque()
+        self.open_sells = deque()
+        
+    def update(self, date, value, trade=None):
+        """
+        Adds one bar.
+        
+        Args:
+            date: Bar timestamp.
+            value (float): Portfolio value after the bar.
+            trade (dict): Trade executed on the bar (Backtester format), or None.
+        """
+        if self.start_val is None:
+            self.start_val = value
+            self.start_date = date
+        else:
+            r = value / self.end_val - 1
+            self.n_returns += 1
+            delta = r - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self.m2 += delta * (r - self.mean_return)
+            
+            self.cumulative *= 1 + r
+            self.peak = self.cumulative if self.peak is None else max(self.peak, self.cumulative)
+            drawdown = (self.cumulative - self.peak) / self.peak
+            if np.isnan(self.max_drawdown) or drawdown < self.max_drawdown:
+                self.max_drawdown = drawdown
+        self.end_val = value
+        self.end_date = date
+        
+        if trade is not None:
+            if trade['Type'] == 'Buy':
+                self.n_buys += 1
+                cost = trade['Value'] + trade['Commission']
+                if self.open_sells:
+                    self._close(cost, self.open_sells.popleft())
+                else:
+                    self.open_buys.append(cost)
+            else:
+                self.n_sells += 1
+                proceeds = trade['Value'] - trade['Commission']
+                if self.open_buys:
+                    self._close(self.open_buys.popleft(), proceeds)
+                else:
+                    self.open_sells.append(proceeds)
+                    
+    def _close(self, cost, proceeds):
+        if proceeds - cost > 0:
+            self.wins += 1
+            
+    def result(self):
+        """
+        Returns:
+            dict: Same keys as calculate_metrics.
+        """
+        metrics = {}
+        metrics['Total Return'] = (self.end_val / self.start_val) - 1
+        
+        days = (self.end_date - self.start_date).days
+        if days > 0:
+            cagr = (self.end_val / self.start_val) ** (365.0/days) - 1
+        else:
+            cagr = 0.0
+        metrics['CAGR'] = cagr
+        
+        std = np.sqrt(self.m2 / (self.n_returns - 1)) if self.n_returns > 1 else np.nan
+        volatility = std * np.sqrt(252)
+        metrics['Volatility'] = volatility
+        
+        if volatility > 0:
+            sharpe_ratio = (self.mean_return - self.rf/252) / std * np.sqrt(252)
+        else:
+            sharpe_ratio = 0.0
+        metrics['Sharpe Ratio'] = sharpe_ratio
+        metrics['Max Drawdown'] = self.max_drawdown
+        
+        metrics['Number of Trades'] = self.n_buys + self.n_sells
+        n = min(self.n_buys, self.n_sells)
+        metrics['Win Rate'] = self.wins / n if n > 0 else 0.0
+        return metrics
@@ -0,0 +1,519 @@
+import heapq
+import itertools
+import math
+import numpy as np
+import pandas as pd
+from backtest import TradeLog
+
+BUY, SELL = 'buy', 'sell'
+KINDS = ('market', 'limit', 'stop')
+# Bars scanned per vectorized look-ahead step, doubled up to the maximum while nothing triggers
+MIN_SCAN_BARS = 64
+MAX_SCAN_BARS = 1 << 16
+
+class Order:
+    """
+    A market, limit or stop order.
+
+    quantity=None means all-in: a buy commits all cash, a sell closes the
+    whole long position. status is 'open', 'filled', 'cancelled' or
+    'rejected'; filled accumulates executed shares.
+    """
+
+    __slots__ = ('id', 'side', 'kind', 'price', 'quantity', 'filled', 'active_from', 'status', 'tag', 'oco', 'bracket')
+
+    def __init__(self, id, side, kind, price=None, quantity=None, active_from=0, tag=None):
+        if side not in (BUY, SELL):
+            raise ValueError(f"Unknown side '{side}'. Expected '{BUY}' or '{SELL}'.")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown order kind '{kind}'. Expected one of {KINDS}.")
+        if kind != 'market' and (price is None or not price > 0):
+            raise ValueError(f"{kind.capitalize()} orders need a positive price.")
+        if quantity is not None and not quantity > 0:
+            raise ValueError("Quantity must be positive (or None for all-in).")
+        self.id = id
+        self.side = side
+        self.kind = kind
+        self.price = price
+        self.quantity = quantity
+        self.filled = 0.0
+        self.active_from = active_from
+        self.status = 'open'
+        self.tag = tag
+        self.oco = None
+        self.bracket = None
+
+    @property
+    def remaining(self):
+        return None if self.quantity is None else self.quantity - self.filled
+
+    @property
+    def triggers_low(self):
+        """
+        True for orders the bar's Low triggers (buy limits, sell stops).
+        """
+        return (self.kind == 'limit') == (self.side == BUY)
+
+    def __repr__(self):
+        price = '' if self.price is None else f" @ {self.price:g}"
+        size = 'all' if self.quantity is None else f"{self.quantity:g}"
+        return f"Order({self.id}, {self.side} {size} {self.kind}{price}, {self.status})"
+
+class Fill:
+    """
+    One execution, passed to strategy.on_fill.
+    """
+
+    __slots__ = ('order', 'bar', 'price', 'shares', 'value', 'commission')
+
+    def __init__(self, order, bar, price, shares, value, commission):
+        self.order = order
+        self.bar = bar
+        self.price = price
+        self.shares = shares
+        self.value = value
+        self.commission = commission
+
+class NoSlippage:
+    def adjust(self, price, side, shares):
+        return price
+
+class PercentSlippage:
+    """
+    Fills `rate` worse than the reference price (0.0005 = 5 bps).
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    def adjust(self, price, side, shares):
+        return price * (1 + self.rate) if side == BUY else price * (1 - self.rate)
+
+class FixedSlippage:
+    """
+    Fills a fixed amount per share worse than the reference price.
+    """
+
+    def __init__(self, per_share):
+        self.per_share = per_share
+
+    def adjust(self, price, side, shares):
+        return price + self.per_share if side == BUY else max(price - self.per_share, 0.0)
+
+class BarFillModel:
+    """
+    Gap-aware bar fills: a triggered limit or stop fills at its price, or
+    at the Open when the bar opens beyond it. Quantity is not limited.
+    """
+
+    def price(self, order, open_price):
+        if order.kind == 'limit':
+            return min(open_price, order.price) if order.side == BUY else max(open_price, order.price)
+        return max(open_price, order.price) if order.side == BUY else min(open_price, order.price)
+
+    def shares(self, order, shares, volume):
+        return shares
+
+class VolumeFillModel(BarFillModel):
+    """
+    BarFillModel that fills at most `max_fraction` of the bar's Volume; the
+    rest of the order stays working on later bars.
+    """
+
+    def __init__(self, max_fraction=0.1):
+        self.max_fraction = max_fraction
+
+    def shares(self, order, shares, volume):
+        return min(shares, self.max_fraction * volume)
+
+class OrderEngine:
+    """
+    Event-driven execution of market, limit, stop and bracket orders on OHLC bars.
+
+    Resting orders live in two price-keyed heaps: buy limits and sell stops
+    (triggered when Low <= price, highest price on top) and sell limits and
+    buy stops (triggered when High >= price, lowest on top). A bar can only
+    trigger orders from the heap tops, so each bar costs O(1) when nothing
+    fires, and runs of quiet bars are skipped with a vectorized search for
+    the first bar whose range reaches either top. Equity for skipped bars is
+    filled in as a block.
+
+    Within a bar, orders fill in the order the price path would reach them:
+    gaps at the Open first, then the leg towards the Low and the leg towards
+    the High (Low first on up bars, High first on down bars). Orders placed
+    while the engine runs (e.g. from on_fill, bracket exits) work from the
+    next bar.
+
+    Strategies are objects with optional on_start(engine) and
+    on_fill(engine, fill) methods; there is no per-bar callback, so orders
+    for later bars are scheduled with `at`.
+    """
+
+    def __init__(self, data, initial_capital=10000.0, commission=0.001, slippage=None, fill_model=None,
+                 market_fill='open', allow_short=False):
+        """
+        Args:
+            data (pd.DataFrame): 'Open', 'High', 'Low', 'Close' (and 'Volume' for VolumeFillModel).
+            initial_capital (float): Starting cash.
+            commission (float): Cost per trade as a fraction of traded value.
+            slippage: NoSlippage (default), PercentSlippage or FixedSlippage.
+            fill_model: BarFillModel (default) or VolumeFillModel.
+            market_fill (str): Market orders fill at the 'open' of their bar or
+                at its 'close' (same-bar fills, as Backtester does).
+            allow_short (bool): Let sells exceed the long position.
+        """
+        if market_fill not in ('open', 'close'):
+            raise ValueError(f"Unknown market_fill '{market_fill}'. Expected 'open' or 'close'.")
+        self.index = data.index
+        self.open = data['Open'].to_numpy(dtype=float)
+        self.high = data['High'].to_numpy(dtype=float)
+        self.low = data['Low'].to_numpy(dtype=float)
+        self.close = data['Close'].to_numpy(dtype=float)
+        self.volume = data['Volume'].to_numpy(dtype=float) if 'Volume' in data else np.full(len(data), np.inf)
+        self.n = len(data)
+        self.initial_capital = initial_capital
+        self.commission = commission
+        self.slippage = slippage or NoSlippage()
+        self.fill_model = fill_model or BarFillModel()
+        self.market_fill = market_fill
+        self.allow_short = allow_short
+        self.cash = initial_capital
+        self.position = 0.0
+        self.bar = -1
+        self.orders = []
+        self.trades = TradeLog()
+        self._trade_orders = []
+        self._ids = itertools.count()
+        self._seq = itertools.count()
+        self._scheduled = []
+        self._market = []
+        self._low = []
+        self._high = []
+        self._strategy = None
+
+    def market(self, side, quantity=None, at=None, tag=None):
+        """
+        Places a market order.
+
+        Args:
+            side (str): 'buy' or 'sell'.
+            quantity (float): Shares, or None for all-in.
+            at (int): First bar position the order works on (default: next bar,
+                or bar 0 before the run).
+            tag: Free-form label kept on the order.
+
+        Returns:
+            Order
+        """
+        return self._submit(Order(next(self._ids), side, 'market', None, quantity, self._start(at), tag))
+
+    def limit(self, side, price, quantity=None, at=None, tag=None):
+        """
+        Places a limit order (buy at or below / sell at or above price).
+        """
+        return self._submit(Order(next(self._ids), side, 'limit', price, quantity, self._start(at), tag))
+
+    def stop(self, side, price, quantity=None, at=None, tag=None):
+        """
+        Places a stop order (buy once High reaches / sell once Low reaches price).
+        """
+        return self._submit(Order(next(self._ids), side, 'stop', price, quantity, self._start(at), tag))
+
+    def bracket(self, side, take_profit, stop_loss, quantity=None, entry='market', entry_price=None, at=None, tag=None):
+        """
+        Places an entry order that, once filled, opens a one-cancels-other
+        pair of exits for the filled shares: a take-profit limit and a
+        stop-loss stop on the opposite side.
+
+        Args:
+            side (str): Entry side.
+            take_profit (float): Exit limit price.
+            stop_loss (float): Exit stop price.
+            quantity (float): Shares, or None for all-in.
+            entry (str): Entry order kind ('market', 'limit' or 'stop').
+            entry_price (float): Entry limit/stop price.
+
+        Returns:
+            Order: The entry order.
+        """
+        order = Order(next(self._ids), side, entry, entry_price, quantity, self._start(at), tag)
+        order.bracket = (take_profit, stop_loss)
+        return self._submit(order)
+
+    def cancel(self, order):
+        """
+        Cancels a working order (it is dropped lazily from the heaps).
+        """
+        if order.status == 'open':
+            order.status = 'cancelled'
+
+    def _start(self, at):
+        earliest = self.bar + 1 if self.bar >= 0 else 0
+        return earliest if at is None else max(int(at), earliest)
+
+    def _submit(self, order):
+        self.orders.append(order)
+        heapq.heappush(self._scheduled, (order.active_from, next(self._seq), order))
+        return order
+
+    def _activate(self, bar):
+        while self._scheduled and self._scheduled[0][0] <= bar:
+            _, seq, order = heapq.heappop(self._scheduled)
+            if order.status != 'open':
+                continue
+            if order.kind == 'market':
+                self._market.append(order)
+            elif order.triggers_low:
+                heapq.heappush(self._low, (-order.price, seq, order))
+            else:
+                heapq.heappush(self._high, (order.price, seq, order))
+
+    def _prune(self):
+        while self._low and self._low[0][2].status != 'open':
+            heapq.heappop(self._low)
+        while self._high and self._high[0][2].status != 'open':
+            heapq.heappop(self._high)
+
+    def _next_event(self, start):
+        """
+        First bar at or after start that has something to do, or n.
+        """
+        self._activate(start)
+        if self._market:
+            return start
+        limit = min(self._scheduled[0][0], self.n) if self._scheduled else self.n
+        self._prune()
+        lo = -self._low[0][0] if self._low else -math.inf
+        hi = self._high[0][0] if self._high else math.inf
+        if lo == -math.inf and hi == math.inf:
+            return limit
+        width = MIN_SCAN_BARS
+        while start < limit:
+            stop = min(start + width, limit)
+            hits = np.flatnonzero((self.low[start:stop] <= lo) | (self.high[start:stop] >= hi))
+            if hits.size:
+                return start + int(hits[0])
+            start = stop
+            width = min(2 * width, MAX_SCAN_BARS)
+        return limit
+
+    def run(self, strategy=None):
+        """
+        Runs every order (including those the strategy places) over the bars.
+
+        Returns:
+            portfolio (pd.DataFrame): 'total', 'returns', 'cash' and 'position' per bar.
+            trades (pd.DataFrame): 'Date', 'Type', 'Price', 'Shares', 'Value',
+                'Commission' (as Backtester reports them: buy Value is the cash
+                paid including commission, sell Value the gross proceeds),
+                plus 'Order' id and 'Kind'.
+        """
+        self._strategy = strategy
+        if strategy is not None and hasattr(strategy, 'on_start'):
+            strategy.on_start(self)
+
+        total = np.empty(self.n)
+        cash = np.empty(self.n)
+        position = np.empty(self.n)
+        i = 0
+        while i < self.n:
+            j = self._next_event(i)
+            if j > i:
+                cash[i:j] = self.cash
+                position[i:j] = self.position
+                total[i:j] = self.cash + self.position * self.close[i:j]
+            if j >= self.n:
+                break
+            self._process_bar(j)
+            cash[j] = self.cash
+            position[j] = self.position
+            total[j] = self.cash + self.position * self.close[j]
+            i = j + 1
+        self.bar = self.n
+
+        portfolio = pd.DataFrame({'total': total}, index=self.index)
+        portfolio['returns'] = portfolio['total'].pct_change()
+        portfolio['cash'] = cash
+        portfolio['position'] = position
+        trades = self.trades.to_frame(self.index)
+        if not trades.empty:
+            trades['Order'] = [order.id for order in self._trade_orders]
+            trades['Kind'] = [order.kind for order in self._trade_orders]
+        return portfolio, trades
+
+    def _process_bar(self, j):
+        self.bar = j
+        self._activate(j)
+        open_price = self.open[j]
+
+        if self._market:
+            working, self._market = self._market, []
+            reference = open_price if self.market_fill == 'open' else self.close[j]
+            for order in working:
+                if order.status == 'open':
+                    self._execute(order, j, reference)
+                    if order.status == 'open':
+                        self._market.append(order)
+
+        low, high = self.low[j], self.high[j]
+        triggered = []
+        while self._low and -self._low[0][0] >= low:
+            _, seq, order = heapq.heappop(self._low)
+            if order.status == 'open':
+                triggered.append((self._path_rank(order, open_price, j), seq, order))
+        while self._high and self._high[0][0] <= high:
+            _, seq, order = heapq.heappop(self._high)
+            if order.status == 'open':
+                triggered.append((self._path_rank(order, open_price, j), seq, order))
+        triggered.sort(key=lambda item: (item[0], item[1]))
+
+        for _, seq, order in triggered:
+            if order.status != 'open':
+                continue
+            self._execute(order, j, self.fill_model.price(order, open_price))
+            if order.status == 'open':
+                # Partially filled: keep working from the next bar
+                order.active_from = j + 1
+                heapq.heappush(self._scheduled, (j + 1, seq, order))
+
+    def _path_rank(self, order, open_price, j):
+        """
+        (phase, distance) along Open -> first extreme -> second extreme.
+        """
+        gapped = order.price >= open_price if order.triggers_low else order.price <= open_price
+        if gapped:
+            return (0, 0.0)
+        low_first = self.close[j] >= open_price
+        phase = 1 if order.triggers_low == low_first else 2
+        return (phase, -order.price if order.triggers_low else order.price)
+
+    def _execute(self, order, j, reference):
+        """
+        Fills as much of the order as cash, position and the fill model allow.
+        Only a volume-limited fill leaves the order working; a fill capped by
+        cash or position completes it.
+        """
+        price = self.slippage.adjust(reference, order.side, order.remaining)
+        c = self.commission
+        if order.side == BUY:
+            if order.quantity is None:
+                shares = (self.cash - self.cash * c) / price if self.cash > 0 else 0.0
+            else:
+                shares = min(order.remaining, self.cash / (price * (1 + c))) if self.cash > 0 else 0.0
+        elif order.quantity is None or not self.allow_short:
+            shares = max(self.position, 0.0) if order.quantity is None else min(order.remaining, max(self.position, 0.0))
+        else:
+            shares = order.remaining
+        fillable = self.fill_model.shares(order, shares, self.volume[j])
+        if not (shares > 0 and fillable > 0):
+            order.status = 'rejected' if order.filled == 0 else 'filled'
+            return
+        partial = fillable < shares
+
+        if order.side == BUY:
+            if order.quantity is None and not partial:
+                # All cash in, commission on the committed amount (Backtester arithmetic)
+                value = self.cash
+                commission = value * c
+            elif order.quantity is None:
+                shares = fillable
+                value = shares * price / (1 - c)
+                commission = value * c
+            else:
+                shares = fillable
+                commission = shares * price * c
+                value = shares * price + commission
+            self.cash -= value
+            self.position += shares
+            side = 0
+        else:
+            shares = fillable
+            value = shares * price
+            commission = value * c
+            self.cash += value - commission
+            self.position -= shares
+            side = 1
+
+        order.filled += shares
+        if not partial:
+            order.status = 'filled'
+        self.trades.append(j, side, price, shares, value, commission)
+        self._trade_orders.append(order)
+
+        if order.oco is not None:
+            self.cancel(order.oco)
+        if order.bracket is not None and order.status == 'filled':
+            take_profit, stop_loss = order.bracket
+            exit_side = SELL if order.side == BUY else BUY
+            tp = self.limit(exit_side, take_profit, order.filled, tag=order.tag)
+            sl = self.stop(exit_side, stop_loss, order.filled, tag=order.tag)
+            tp.oco, sl.oco = sl, tp
+
+        if self._strategy is not None and hasattr(self._strategy, 'on_fill'):
+            self._strategy.on_fill(self, Fill(order, j, price, shares, value, commission))
+
+def signal_orders(engine, signals):
+    """
+    Schedules all-in market orders at the position changes of a signals
+    frame (1=Long, 0/NaN=Cash, other values hold), like Backtester reads it.
+    With market_fill='close' and no slippage the engine reproduces
+    Backtester's equity and trades.
+
+    Returns:
+        list: The scheduled orders.
+    """
+    signal = signals['signal'].reindex(engine.index).to_numpy(dtype=float)
+    target = np.where(signal == 1, 1.0, np.where((signal == 0) | np.isnan(signal), 0.0, np.nan))
+    long = pd.Series(target).ffill().fillna(0.0).to_numpy() == 1.0
+    transitions = np.flatnonzero(np.diff(long.astype(np.int8), prepend=np.int8(0)))
+    return [engine.market(BUY if long[i] else SELL, at=int(i)) for i in transitions]
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import date, timedelta
+    from data import load_data
+    from strategies import STRATEGIES
+    from metrics import calculate_metrics
+
+    parser = argparse.ArgumentParser(description="Run a strategy's signals through the order engine.")
+    parser.add_argument("ticker")
+    parser.add_argument("--strategy", default="sma", choices=sorted(STRATEGIES))
+    parser.add_argument("--params", default='{"short_window": 20, "long_window": 50}', help="Strategy parameters as JSON.")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 2)))
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--fill", default="open", choices=["open", "close"], help="Market order fill price.")
+    parser.add_argument("--slippage", type=float, default=0.0, help="Slippage in basis points.")
+    parser.add_argument("--take-profit", type=float, default=None, help="Bracket exit above entry, in percent.")
+    parser.add_argument("--stop-loss", type=float, default=None, help="Bracket exit below entry, in percent.")
+    args = parser.parse_args()
+
+    df = load_data(args.ticker.upper(), args.start, args.end)
+    if df is None:
+        raise SystemExit(f"No data for {args.ticker}.")
+    signals = STRATEGIES[args.strategy](df, **json.loads(args.params))
+    engine = OrderEngine(df, market_fill=args.fill, slippage=PercentSlippage(args.slippage / 1e4))
+    scheduled = signal_orders(engine, signals)
+
+    class BracketExits:
+        """
+        Adds a take-profit/stop-loss pair after each signal entry; the signal exit cancels it.
+        """
+        def __init__(self):
+            self.exits = []
+
+        def on_fill(self, engine, fill):
+            if fill.order.kind == 'market' and fill.order.side == BUY and fill.order.status == 'filled':
+                if args.take_profit is not None and args.stop_loss is not None:
+                    tp = engine.limit(SELL, fill.price * (1 + args.take_profit / 100), fill.shares)
+                    sl = engine.stop(SELL, fill.price * (1 - args.stop_loss / 100), fill.shares)
+                    tp.oco, sl.oco = sl, tp
+                    self.exits = [tp, sl]
+            elif fill.order.kind == 'market' and fill.order.side == SELL:
+                for order in self.exits:
+                    engine.cancel(order)
+
+    portfolio, trades = engine.run(BracketExits())
+    for name, value in calculate_metrics(portfolio, trades).items():
+        print(f"{name}: {value}")
+    print(f"{len(trades)} fills from {len(engine.orders)} orders.")
@@ -0,0 +1,80 @@
+from contextlib import nullcontext
+
+class Pipeline:
+    """
+    Dependency-tracked, memoized pipeline of named stages.
+
+    Each stage declares the stages it depends on and the named inputs it
+    reads. Its cache key is (its input values, the generation of each
+    dependency's result), so a stage is recomputed only when one of its own
+    inputs changed or an upstream stage was recomputed; everything else is
+    reused. One result is kept per stage (the latest), which bounds memory
+    when the pipeline lives in a long-running session (e.g. st.session_state).
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.cache = {}
+        self.status = {}
+        self._generation = 0
+
+    def add(self, name, fn, deps=(), inputs=(), rows=None):
+        """
+        Registers (or redefines) a stage; cached results are kept.
+
+        Args:
+            name (str): Stage name.
+            fn (callable): Called with the dependency outputs and inputs as
+                keyword arguments (named after the stages / inputs).
+            deps (tuple): Names of upstream stages.
+            inputs (tuple): Names of the run inputs the stage reads (hashable values).
+            rows (callable): Optional rows(output) -> int for profiling.
+        """
+        self.stages[name] = (fn, tuple(deps), tuple(inputs), rows)
+
+    def invalidate(self, name=None):
+        """
+        Drops the cached result of one stage, or all of them. The next run
+        recomputes it and, through the new generation, everything downstream.
+        """
+        if name is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(name, None)
+
+    def run(self, targets, inputs, profiler=None):
+        """
+        Brings the target stages (and what they depend on) up to date.
+
+        Args:
+            targets (iterable): Stage names whose outputs are needed.
+            inputs (dict): Input name -> value for this run.
+            profiler (PipelineProfiler): Times the stages that are recomputed.
+
+        Returns:
+            dict: Stage name -> output for the targets. self.status maps
+                every stage visited in this run to 'computed' or 'reused'.
+        """
+        self.status = {}
+        return {name: self._resolve(name, inputs, profiler) for name in targets}
+
+    def _resolve(self, name, inputs, profiler):
+        if name in self.status:
+            return self.cache[name][1]
+        fn, deps, input_names, rows = self.stages[name]
+        values = {d: self._resolve(d, inputs, profiler) for d in deps}
+        key = (tuple(inputs[i] for i in input_names), tuple(self.cache[d][2] for d in deps))
+        cached = self.cache.get(name)
+        if cached is not None and cached[0] == key:
+            self.status[name] = 'reused'
+            return cached[1]
+
+        kwargs = {**values, **{i: inputs[i] for i in input_names}}
+        with profiler.stage(name) if profiler is not None else nullcontext({}) as record:
+            value = fn(**kwargs)
+            if rows is not None:
+                record['rows'] = rows(value)
+        self._generation += 1
+        self.cache[name] = (key, value, self._generation)
+        self.status[name] = 'computed'
+        return value
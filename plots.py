@@ -1,20 +1,104 @@
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
-def plot_price_chart(data, trades=None):
+# Point budget that roughly matches a chart's pixel width
+DEFAULT_MAX_POINTS = 2000
+# Traces with more points than this switch from SVG to WebGL
+WEBGL_THRESHOLD = 10000
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    
+    Args:
+        x (np.ndarray): Numeric x values (e.g. int64 timestamps).
+        y (np.ndarray): Values.
+        n_out (int): Number of points to keep.
+        
+    Returns:
+        np.ndarray: Sorted indices of the kept points (first and last always kept).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo = edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # Pick the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+def downsample_series(series, max_points):
+    """
+    LTTB-downsamples a series with a DatetimeIndex (or any numeric index).
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), max_points)]
+
+def aggregate_ohlc(data, max_bars):
+    """
+    Aggregates OHLC bars into at most max_bars equal-count buckets.
+    
+    Each bucket keeps the first Open, highest High, lowest Low and last Close,
+    so extremes stay visible; it is stamped with its first bar's date.
+    """
+    n = len(data)
+    if max_bars is None or n <= max_bars:
+        return data
+    starts = np.unique(np.linspace(0, n, max_bars + 1).astype(np.int64)[:-1])
+    ends = np.append(starts[1:], n) - 1
+    return pd.DataFrame({
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+    }, index=data.index[starts])
+
+def figure_payload_size(fig):
+    """
+    Size in bytes of the JSON a figure sends to the browser.
+    """
+    return len(fig.to_json().encode('utf-8'))
+
+def _scatter(n_points):
+    return go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+
+def plot_price_chart(data, trades=None, max_points=None):
     """
     Plots interactive candlestick chart with buy/sell markers.
+    If max_points is set, candles are bucket-aggregated down to that many;
+    trade markers always stay at their exact dates and prices.
     """
     fig = go.Figure()
+    candles = aggregate_ohlc(data, max_points)
 
     # Candlestick
     fig.add_trace(go.Candlestick(
-        x=data.index,
-        open=data['Open'],
-        high=data['High'],
-        low=data['Low'],
-        close=data['Close'],
+        x=candles.index,
+        open=candles['Open'],
+        high=candles['High'],
+        low=candles['Low'],
+        close=candles['Close'],
         name='Price'
     ))
 
@@ -24,7 +108,7 @@ def plot_price_chart(data, trades=None):
         sells = trades[trades['Type'] == 'Sell']
 
         if not buys.empty:
-            fig.add_trace(go.Scatter(
+            fig.add_trace(_scatter(len(buys))(
                 x=buys['Date'], y=buys['Price'],
                 mode='markers',
                 marker=dict(symbol='triangle-up', color='green', size=12),
@@ -32,7 +116,7 @@ def plot_price_chart(data, trades=None):
             ))
             
         if not sells.empty:
-            fig.add_trace(go.Scatter(
+            fig.add_trace(_scatter(len(sells))(
                 x=sells['Date'], y=sells['Price'],
                 mode='markers',
                 marker=dict(symbol='triangle-down', color='red', size=12),
@@ -51,24 +135,27 @@ def plot_price_chart(data, trades=None):
     )
     return fig
 
-def plot_equity_curve(portfolio, benchmark=None):
+def plot_equity_curve(portfolio, benchmark=None, max_points=None):
     """
     Plots the equity curve vs benchmark.
+    If max_points is set, each line is LTTB-downsampled to that many points.
     """
     fig = go.Figure()
     
-    fig.add_trace(go.Scatter(
-        x=portfolio.index, 
-        y=portfolio['total'],
+    equity = downsample_series(portfolio['total'], max_points)
+    fig.add_trace(_scatter(len(equity))(
+        x=equity.index, 
+        y=equity,
         mode='lines',
         name='Strategy Equity',
         line=dict(color='#00CC96')
     ))
     
     if benchmark is not None:
-         fig.add_trace(go.Scatter(
-            x=benchmark.index, 
-            y=benchmark['total'],
+         bench_equity = downsample_series(benchmark['total'], max_points)
+         fig.add_trace(_scatter(len(bench_equity))(
+            x=bench_equity.index, 
+            y=bench_equity,
             mode='lines',
             name='Buy & Hold',
             line=dict(color='#636EFA', dash='dash')
@@ -85,3 +172,62 @@ def plot_equity_curve(portfolio, benchmark=None):
         font=dict(color="white")
     )
     return fig
+
+def plot_equity_bands(portfolio, bands, benchmark=None, max_points=None):
+    """
+    Plots the equity curve over bootstrap percentile bands
+    (robustness.bootstrap_metrics), outermost percentiles shaded lightest.
+    """
+    fig = plot_equity_curve(portfolio, benchmark, max_points=max_points)
+    n_lines = len(fig.data)
+
+    columns = list(bands.columns)
+    if max_points is not None and len(bands) > max_points:
+        middle = bands[columns[len(columns) // 2]]
+        x = bands.index.asi8 if isinstance(bands.index, pd.DatetimeIndex) else np.arange(len(bands))
+        bands = bands.iloc[lttb_indices(x, middle.to_numpy(dtype=float), max_points)]
+    scatter = _scatter(len(bands))
+
+    # Outer pairs first so inner bands are drawn on top
+    for i in range(len(columns) // 2):
+        lower, upper = columns[i], columns[-1 - i]
+        fig.add_trace(scatter(x=bands.index, y=bands[lower], mode='lines', line=dict(width=0),
+                              showlegend=False, hoverinfo='skip'))
+        fig.add_trace(scatter(x=bands.index, y=bands[upper], mode='lines', line=dict(width=0),
+                              fill='tonexty', fillcolor='rgba(0, 204, 150, 0.15)',
+                              name=f"Bootstrap {lower[1:]}-{upper[1:]}%"))
+    if len(columns) % 2:
+        median = columns[len(columns) // 2]
+        fig.add_trace(scatter(x=bands.index, y=bands[median], mode='lines',
+                              line=dict(color='rgba(0, 204, 150, 0.6)', dash='dot'), name='Bootstrap Median'))
+
+    fig.data = fig.data[n_lines:] + fig.data[:n_lines]
+    fig.update_layout(title='Equity Curve with Bootstrap Confidence Bands')
+    return fig
+
+def plot_rolling_metrics(rolling, benchmark=None, max_points=None):
+    """
+    Plots rolling.rolling_metrics output as stacked panels sharing the date axis.
+    If a benchmark frame (same columns) is given, it is drawn dashed on each panel.
+    """
+    columns = list(rolling.columns)
+    fig = make_subplots(rows=len(columns), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                        subplot_titles=columns)
+    for row, column in enumerate(columns, start=1):
+        for frame, name, line in [(rolling, 'Strategy', dict(color='#00CC96')),
+                                  (benchmark, 'Buy & Hold', dict(color='#636EFA', dash='dash'))]:
+            if frame is None:
+                continue
+            series = downsample_series(frame[column].dropna(), max_points)
+            fig.add_trace(_scatter(len(series))(x=series.index, y=series, mode='lines', name=name, line=line,
+                                                legendgroup=name, showlegend=row == 1), row=row, col=1)
+
+    fig.update_layout(
+        title='Rolling Analytics',
+        template='plotly_dark',
+        height=500,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color="white")
+    )
+    return fig
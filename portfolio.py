@@ -0,0 +1,144 @@
+import pandas as pd
+import numpy as np
+
+class PortfolioBacktester:
+    """
+    Cross-sectional backtester over an aligned (bars x assets) price matrix.
+
+    Targets are portfolio weights per bar. On each rebalance bar the engine
+    sells down over-weight positions, then buys under-weight ones, paying the
+    per-asset commission rate on traded value (buys spend the gross amount,
+    as Backtester does). Between rebalances holdings are constant, so the
+    equity curve is one matrix product over all bars. The only Python loop
+    runs over rebalance events, with every event vectorized across assets.
+
+    With a single asset and 0/1 weights this reproduces Backtester exactly.
+    """
+
+    def __init__(self, prices, weights, initial_capital=10000.0, transaction_cost=0.001, rebalance='signal'):
+        """
+        Args:
+            prices (pd.DataFrame): Closing prices, one column per asset.
+            weights (pd.DataFrame): Target weights aligned with prices (NaN = 0).
+                Rows should sum to at most 1; the remainder is held in cash.
+            initial_capital (float): Starting capital.
+            transaction_cost (float, dict or pd.Series): Cost rate, global or per asset.
+            rebalance: 'signal' to rebalance whenever the target weights change,
+                an int k to rebalance every k bars, or a pandas period alias
+                ('W', 'M', 'Q', ...) to rebalance on the first bar of each period.
+        """
+        self.prices = prices
+        self.weights = weights.reindex(index=prices.index, columns=prices.columns)
+        self.initial_capital = initial_capital
+        if np.isscalar(transaction_cost):
+            self.costs = np.full(prices.shape[1], float(transaction_cost))
+        else:
+            self.costs = pd.Series(transaction_cost, dtype=float).reindex(prices.columns).fillna(0.0).to_numpy()
+        self.rebalance = rebalance
+        self.portfolio = pd.DataFrame(index=prices.index)
+        self.holdings = pd.DataFrame(index=prices.index, columns=prices.columns, dtype=float)
+        self.trades = pd.DataFrame()
+
+    def rebalance_bars(self):
+        """
+        Returns:
+            np.ndarray: Positions of the bars on which the portfolio is rebalanced.
+        """
+        weights = np.nan_to_num(self.weights.to_numpy(dtype=float))
+        n = len(weights)
+        if self.rebalance == 'signal':
+            previous = np.vstack([np.zeros((1, weights.shape[1])), weights[:-1]])
+            return np.flatnonzero(np.any(weights != previous, axis=1))
+        if isinstance(self.rebalance, (int, np.integer)):
+            return np.arange(0, n, self.rebalance)
+        periods = self.prices.index.to_period(self.rebalance)
+        return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]]) if n else np.array([], dtype=np.int64)
+
+    def run_backtest(self):
+        """
+        Executes the backtest.
+
+        Returns:
+            portfolio (pd.DataFrame): 'total', 'returns' and 'cash' per bar.
+            holdings (pd.DataFrame): Shares held per asset per bar.
+            trades (pd.DataFrame): Executions with 'Date', 'Asset', 'Type',
+                'Price', 'Shares', 'Value' and 'Commission'.
+        """
+        prices = self.prices.to_numpy(dtype=float)
+        weights = np.nan_to_num(self.weights.to_numpy(dtype=float))
+        costs = self.costs
+        events = self.rebalance_bars()
+        n_assets = prices.shape[1]
+
+        cash = self.initial_capital
+        shares = np.zeros(n_assets)
+        cash_after = np.empty(len(events) + 1)
+        shares_after = np.empty((len(events) + 1, n_assets))
+        cash_after[0] = cash
+        shares_after[0] = shares
+        fills = []
+
+        for k, t in enumerate(events):
+            price = prices[t]
+            target = weights[t]
+            value = np.where(shares != 0, shares * price, 0.0)
+            equity = cash + value.sum()
+            delta = target * equity - value
+
+            # Sells first; closing a position sells every share held
+            selling = delta < 0
+            sold = np.where(selling & (target == 0), shares, np.where(selling, -delta / price, 0.0))
+            revenue = sold * price
+            sell_commission = revenue * costs
+            cash = cash + (revenue - sell_commission).sum()
+
+            # Buys spend the gross amount (commission included), capped by available cash
+            amount = np.where(delta > 0, delta, 0.0)
+            total_amount = amount.sum()
+            if total_amount > cash:
+                amount = amount * (cash / total_amount)
+            buy_commission = amount * costs
+            bought = (amount - buy_commission) / np.where(amount > 0, price, 1.0)
+            cash = cash - amount.sum()
+
+            shares = shares - sold + bought
+            cash_after[k + 1] = cash
+            shares_after[k + 1] = shares
+            fills.append((t, sold, revenue, sell_commission, bought, amount, buy_commission))
+
+        # Holdings in effect at each bar, then equity = cash + holdings . prices
+        is_event = np.zeros(len(prices), dtype=np.int64)
+        is_event[events] = 1
+        state = np.cumsum(is_event)
+        held = shares_after[state]
+        positions_value = np.where(held != 0, held * prices, 0.0).sum(axis=1)
+
+        self.portfolio = pd.DataFrame(index=self.prices.index)
+        self.portfolio['total'] = cash_after[state] + positions_value
+        self.portfolio['returns'] = self.portfolio['total'].pct_change()
+        self.portfolio['cash'] = cash_after[state]
+        self.holdings = pd.DataFrame(held, index=self.prices.index, columns=self.prices.columns)
+        self.trades = self._trade_table(fills, prices)
+        return self.portfolio, self.holdings, self.trades
+
+    def _trade_table(self, fills, prices):
+        columns = ['Date', 'Asset', 'Type', 'Price', 'Shares', 'Value', 'Commission']
+        parts = []
+        assets = self.prices.columns
+        dates = self.prices.index
+        for t, sold, revenue, sell_commission, bought, amount, buy_commission in fills:
+            for kind, qty, value, commission in (('Sell', sold, revenue, sell_commission), ('Buy', bought, amount, buy_commission)):
+                mask = qty != 0
+                if mask.any():
+                    parts.append(pd.DataFrame({
+                        'Date': dates[t],
+                        'Asset': assets[mask],
+                        'Type': kind,
+                        'Price': prices[t][mask],
+                        'Shares': qty[mask],
+                        'Value': value[mask],
+                        'Commission': commission[mask],
+                    }))
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)[columns]
@@ -0,0 +1,105 @@
+import cProfile
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+
+logger = logging.getLogger("backtester.profile")
+
+class PipelineProfiler:
+    """
+    Records wall time, CPU time, row counts and allocated memory per pipeline stage.
+
+    Usage:
+        profiler = PipelineProfiler()
+        with profiler.stage("signals", rows=len(df)):
+            signals = simple_moving_average_strategy(df, 20, 50)
+    """
+
+    def __init__(self, trace_memory=False, emit_logs=True):
+        """
+        Args:
+            trace_memory (bool): Measure allocations with tracemalloc (slower).
+            emit_logs (bool): Emit one structured JSON log record per stage.
+        """
+        self.trace_memory = trace_memory
+        self.emit_logs = emit_logs
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Times the enclosed block.
+
+        Yields:
+            dict: The stage record; 'rows' may be filled in inside the block.
+        """
+        record = {'stage': name, 'rows': rows, 'wall_s': None, 'cpu_s': None,
+                  'alloc_peak_bytes': None, 'alloc_net_bytes': None}
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            mem_start, _ = tracemalloc.get_traced_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_peak_bytes'] = peak - mem_start
+                record['alloc_net_bytes'] = current - mem_start
+                if started_tracing:
+                    tracemalloc.stop()
+            self.records.append(record)
+            if self.emit_logs:
+                logger.info(json.dumps({'event': 'stage', **record}))
+
+    def to_frame(self):
+        """
+        Returns:
+            pd.DataFrame: One row per recorded stage.
+        """
+        return pd.DataFrame(self.records, columns=['stage', 'rows', 'wall_s', 'cpu_s', 'alloc_peak_bytes', 'alloc_net_bytes'])
+
+    def total_wall(self):
+        return sum(record['wall_s'] for record in self.records)
+
+@contextmanager
+def profile_run(path_prefix, top=25):
+    """
+    Captures a cProfile + tracemalloc profile of the enclosed block.
+
+    Writes <path_prefix>.prof (load with pstats or snakeviz) and
+    <path_prefix>.txt (top functions by cumulative time and top allocation sites).
+    """
+    profiler = cProfile.Profile()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+
+        profiler.dump_stats(f"{path_prefix}.prof")
+        with open(f"{path_prefix}.txt", "w") as f:
+            stats = pstats.Stats(profiler, stream=f)
+            stats.sort_stats("cumulative").print_stats(top)
+            f.write(f"\nPeak traced memory: {peak:,} bytes\n\nTop allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        logger.info(json.dumps({'event': 'profile', 'path': f"{path_prefix}.prof", 'peak_bytes': peak}))
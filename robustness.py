@@ -0,0 +1,207 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from metrics import calculate_metrics, calculate_metrics_batch
+
+# Paths simulated per task; fixed so results do not depend on the worker count
+DEFAULT_CHUNK_PATHS = 500
+# Paths kept for the percentile bands (the metric distributions use all paths)
+DEFAULT_BAND_PATHS = 2000
+BOOTSTRAP_METRICS = ['Total Return', 'CAGR', 'Volatility', 'Sharpe Ratio', 'Max Drawdown']
+
+def stationary_bootstrap_indices(n, n_paths, mean_block, rng):
+    """
+    Politis-Romano stationary bootstrap: blocks of geometric length (mean
+    mean_block) starting at uniform positions, wrapping around the sample.
+
+    Returns:
+        np.ndarray: (n x n_paths) positions into the original sample.
+    """
+    starts = rng.integers(0, n, size=(n, n_paths))
+    new_block = rng.random((n, n_paths)) < 1.0 / mean_block
+    new_block[0] = True
+    # Row at which the current block began, per path
+    steps = np.arange(n)[:, None]
+    block_row = np.maximum.accumulate(np.where(new_block, steps, 0), axis=0)
+    block_start = np.take_along_axis(starts, block_row, axis=0)
+    return (block_start + steps - block_row) % n
+
+def _bootstrap_chunk(returns, start_value, index, mean_block, n_paths, seed, keep_paths):
+    rng = np.random.default_rng(seed)
+    positions = stationary_bootstrap_indices(len(returns), n_paths, mean_block, rng)
+    equity = np.empty((len(returns) + 1, n_paths))
+    equity[0] = start_value
+    equity[1:] = start_value * np.cumprod(1 + returns[positions], axis=0)
+    metrics = calculate_metrics_batch(equity, index=index)[BOOTSTRAP_METRICS]
+    return metrics, equity[:, :keep_paths].astype(np.float32)
+
+def _shuffle_chunk(ratios, start_value, n_paths, seed, keep_paths):
+    rng = np.random.default_rng(seed)
+    order = np.argsort(rng.random((len(ratios), n_paths)), axis=0)
+    equity = np.empty((len(ratios) + 1, n_paths))
+    equity[0] = start_value
+    equity[1:] = start_value * np.cumprod(ratios[order], axis=0)
+    peak = np.maximum.accumulate(equity, axis=0)
+    losses = ratios[order] < 1
+    streak_total = np.cumsum(losses, axis=0)
+    streak = streak_total - np.maximum.accumulate(np.where(losses, 0, streak_total), axis=0)
+    metrics = pd.DataFrame({
+        'Max Drawdown': ((equity - peak) / peak).min(axis=0),
+        'Max Consecutive Losses': streak.max(axis=0) if len(ratios) else np.zeros(n_paths, dtype=np.int64),
+    })
+    return metrics, equity[:, :keep_paths].astype(np.float32)
+
+def _run_chunks(fn, args, n_paths, seed, chunk_paths, band_paths, max_workers):
+    """
+    Runs fn(*args, n, seed, keep) over path chunks, each with its own child SeedSequence.
+    """
+    sizes = [min(chunk_paths, n_paths - lo) for lo in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    keep = []
+    remaining = band_paths
+    for size in sizes:
+        keep.append(min(size, remaining))
+        remaining -= keep[-1]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(sizes) <= 1:
+        results = [fn(*args, size, s, k) for size, s, k in zip(sizes, seeds, keep)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(sizes))) as pool:
+            futures = [pool.submit(fn, *args, size, s, k) for size, s, k in zip(sizes, seeds, keep)]
+            results = [future.result() for future in futures]
+
+    metrics = pd.concat([m for m, _ in results], ignore_index=True)
+    paths = np.concatenate([p for _, p in results], axis=1)
+    return metrics, paths
+
+def percentile_bands(paths, index, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Returns:
+        pd.DataFrame: One column per percentile ('p5', 'p50', ...) of the path values per bar.
+    """
+    values = np.percentile(paths, percentiles, axis=1).T if paths.size else np.full((len(index), len(percentiles)), np.nan)
+    return pd.DataFrame(values, index=index, columns=[f"p{p:g}" for p in percentiles])
+
+def bootstrap_metrics(portfolio, n_paths=1000, mean_block=20, seed=0, max_workers=None,
+                      chunk_paths=DEFAULT_CHUNK_PATHS, band_paths=DEFAULT_BAND_PATHS, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Stationary block bootstrap of the portfolio's bar returns.
+
+    Every path re-chains resampled returns from the starting value and all
+    paths are scored at once with calculate_metrics_batch. Chunks of paths
+    run in a process pool; results only depend on seed and chunk_paths.
+
+    Args:
+        portfolio (pd.DataFrame): Backtester output with a 'total' column.
+        n_paths (int): Number of simulated paths.
+        mean_block (float): Mean block length in bars (keeps autocorrelation
+            and volatility clustering up to that horizon).
+        seed (int): Root seed.
+        max_workers (int): Worker processes (default: CPU count); 1 runs inline.
+        chunk_paths (int): Paths per task.
+        band_paths (int): Paths kept for the percentile bands.
+        percentiles (tuple): Band percentiles.
+
+    Returns:
+        metrics (pd.DataFrame): One row per path: Total Return, CAGR,
+            Volatility, Sharpe Ratio and Max Drawdown.
+        bands (pd.DataFrame): Equity percentiles per bar.
+    """
+    equity = portfolio['total'].to_numpy(dtype=float)
+    returns = equity[1:] / equity[:-1] - 1
+    if len(returns) == 0:
+        raise ValueError("Bootstrap needs at least two bars.")
+    metrics, paths = _run_chunks(_bootstrap_chunk, (returns, equity[0], portfolio.index, mean_block),
+                                 n_paths, seed, chunk_paths, band_paths, max_workers)
+    return metrics, percentile_bands(paths, portfolio.index, percentiles)
+
+def trade_cycle_ratios(trades):
+    """
+    Growth factor of each Buy -> Sell cycle (net proceeds / gross cost),
+    pairing the i-th Buy with the i-th Sell as calculate_metrics does.
+    """
+    if trades is None or trades.empty:
+        return np.array([])
+    buys = trades[trades['Type'] == 'Buy']
+    sells = trades[trades['Type'] == 'Sell']
+    n = min(len(buys), len(sells))
+    proceeds = sells['Value'].to_numpy()[:n] - sells['Commission'].to_numpy()[:n]
+    cost = buys['Value'].to_numpy()[:n] + buys['Commission'].to_numpy()[:n]
+    return proceeds / cost
+
+def shuffle_trades(trades, initial_capital=10000.0, n_paths=1000, seed=0, max_workers=None,
+                   chunk_paths=DEFAULT_CHUNK_PATHS, band_paths=DEFAULT_BAND_PATHS, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Trade-order shuffling: replays the closed trades in random orders.
+
+    The final return is the same for every order, so this measures path
+    risk only, at trade granularity (equity after each closed trade).
+
+    Args:
+        trades (pd.DataFrame): Backtester trade log.
+        initial_capital (float): Starting capital.
+        n_paths (int): Number of permutations.
+
+    Returns:
+        metrics (pd.DataFrame): One row per permutation: Max Drawdown and
+            Max Consecutive Losses.
+        bands (pd.DataFrame): Equity percentiles per closed-trade number.
+    """
+    ratios = trade_cycle_ratios(trades)
+    metrics, paths = _run_chunks(_shuffle_chunk, (ratios, initial_capital), n_paths, seed,
+                                 chunk_paths, band_paths, max_workers)
+    return metrics, percentile_bands(paths, pd.RangeIndex(len(ratios) + 1, name='Trade'), percentiles)
+
+def summarize(metrics, observed=None, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Distribution summary of simulated metrics.
+
+    Args:
+        metrics (pd.DataFrame): Output of bootstrap_metrics or shuffle_trades.
+        observed (dict): Point estimates (e.g. calculate_metrics) shown alongside.
+
+    Returns:
+        pd.DataFrame: One row per metric with mean, std and percentiles.
+    """
+    summary = pd.DataFrame({'mean': metrics.mean(), 'std': metrics.std()})
+    for p in percentiles:
+        summary[f"p{p:g}"] = metrics.quantile(p / 100)
+    if observed is not None:
+        summary.insert(0, 'observed', [observed.get(name, np.nan) for name in summary.index])
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date, timedelta
+    from data import load_data
+    from strategies import STRATEGIES
+    from backtest import Backtester
+    import json
+
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for a backtest.")
+    parser.add_argument("ticker")
+    parser.add_argument("--strategy", default="sma", choices=sorted(STRATEGIES))
+    parser.add_argument("--params", default='{"short_window": 20, "long_window": 50}', help="Strategy parameters as JSON.")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 5)))
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--paths", type=int, default=5000)
+    parser.add_argument("--block", type=float, default=20, help="Mean bootstrap block length in bars.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = load_data(args.ticker.upper(), args.start, args.end)
+    if df is None:
+        raise SystemExit(f"No data for {args.ticker}.")
+    signals = STRATEGIES[args.strategy](df, **json.loads(args.params))
+    portfolio, trades = Backtester(df, signals).run_backtest()
+    observed = calculate_metrics(portfolio, trades)
+
+    metrics, _ = bootstrap_metrics(portfolio, args.paths, args.block, args.seed, args.workers)
+    print("Block bootstrap of returns:")
+    print(summarize(metrics, observed).to_string())
+    shuffled, _ = shuffle_trades(trades, portfolio['total'].iloc[0], args.paths, args.seed, args.workers)
+    print("\nTrade-order shuffling:")
+    print(summarize(shuffled).to_string())
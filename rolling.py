@@ -0,0 +1,221 @@
+from collections import deque
+import math
+import numpy as np
+import pandas as pd
+
+ROLLING_METRICS = ['Rolling Volatility', 'Rolling Sharpe', 'Rolling Drawdown', 'Rolling Win Rate']
+
+def sliding_max(values, window):
+    """
+    Maximum over the trailing window (partial windows at the start) in O(n).
+
+    Van Herk/Gil-Werman: within blocks of `window` bars, prefix and suffix
+    maxima are running accumulations; every window spans at most two blocks,
+    so its maximum is max(suffix at the window start, prefix at the window end).
+
+    Args:
+        values (np.ndarray): 1-D input.
+        window (int): Window length in bars.
+
+    Returns:
+        np.ndarray: Trailing-window maxima, same length as values.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n == 0 or window <= 1:
+        return values.copy()
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, -np.inf)
+    padded[:n] = values
+    padded = padded.reshape(blocks, window)
+    prefix = np.maximum.accumulate(padded, axis=1).ravel()
+    suffix = np.maximum.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    out = np.maximum.accumulate(values)
+    ends = np.arange(window, n)
+    out[window:] = np.maximum(suffix[ends - window + 1], prefix[ends])
+    return out
+
+def trailing_sums(values, window):
+    """
+    Sums over the trailing window (partial windows at the start) from one cumulative sum.
+    """
+    csum = np.concatenate(([0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    return csum[ends] - csum[np.maximum(ends - window, 0)]
+
+def closed_trade_wins(trades, index):
+    """
+    Bar position and outcome of each closed Buy -> Sell cycle, pairing the
+    i-th Buy with the i-th Sell as calculate_metrics does.
+
+    Returns:
+        (np.ndarray, np.ndarray): Sell bar positions and win flags.
+    """
+    if trades is None or trades.empty:
+        return np.array([], dtype=np.int64), np.array([], dtype=bool)
+    buys = trades[trades['Type'] == 'Buy']
+    sells = trades[trades['Type'] == 'Sell']
+    n = min(len(buys), len(sells))
+    pnl = (sells['Value'].to_numpy()[:n] - sells['Commission'].to_numpy()[:n]) - \
+          (buys['Value'].to_numpy()[:n] + buys['Commission'].to_numpy()[:n])
+    return index.get_indexer(sells['Date'].iloc[:n]), pnl > 0
+
+def rolling_metrics(portfolio, window=63, trades=None, rf=0.02):
+    """
+    Rolling analytics over a trailing window of bars, in one linear pass.
+
+    Volatility and Sharpe use windowed sums of the bar returns (centered on
+    the overall mean to limit cancellation) and follow calculate_metrics'
+    definitions on each window. Drawdown is the distance of equity from its
+    trailing-window peak. Win rate is the share of Buy -> Sell cycles closed
+    within the window that made money.
+
+    Args:
+        portfolio (pd.DataFrame): Backtester output with 'total'.
+        window (int): Window length in bars.
+        trades (pd.DataFrame): Trade log for the win rate (optional).
+        rf (float): Annual risk-free rate for the Sharpe ratio.
+
+    Returns:
+        pd.DataFrame: ROLLING_METRICS columns indexed like portfolio. Volatility
+            and Sharpe are NaN until `window` returns exist, win rate where no
+            cycle closed in the window; drawdown uses the partial window at the start.
+    """
+    if window < 2:
+        raise ValueError("Rolling window must be at least 2 bars.")
+    equity = portfolio['total'].to_numpy(dtype=float)
+    n = len(equity)
+    volatility = np.full(n, np.nan)
+    sharpe = np.full(n, np.nan)
+
+    returns = equity[1:] / equity[:-1] - 1 if n > 1 else np.empty(0)
+    if len(returns) >= window:
+        shift = returns.mean()
+        centered = returns - shift
+        s1 = trailing_sums(centered, window)[window - 1:]
+        s2 = trailing_sums(centered * centered, window)[window - 1:]
+        var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+        # Constant windows (e.g. flat in cash) are exactly zero, not round-off
+        changes = trailing_sums(np.diff(returns) != 0, window - 1)[window - 2:]
+        std = np.where(changes > 0, np.sqrt(var), 0.0)
+        mean = s1 / window + shift
+        volatility[window:] = std * np.sqrt(252)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe[window:] = np.where(std > 0, (mean - rf / 252) / std * np.sqrt(252), 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = equity / sliding_max(equity, window) - 1
+
+    win_rate = np.full(n, np.nan)
+    bars, wins = closed_trade_wins(trades, portfolio.index)
+    keep = bars >= 0
+    if keep.any():
+        closed_in = trailing_sums(np.bincount(bars[keep], minlength=n), window)
+        won_in = trailing_sums(np.bincount(bars[keep], weights=wins[keep], minlength=n).astype(np.int64), window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(closed_in > 0, won_in / closed_in, np.nan)
+
+    return pd.DataFrame({
+        'Rolling Volatility': volatility,
+        'Rolling Sharpe': sharpe,
+        'Rolling Drawdown': drawdown,
+        'Rolling Win Rate': win_rate,
+    }, index=portfolio.index)
+
+class RollingMetrics:
+    """
+    Incremental counterpart of rolling_metrics, O(1) amortized per bar.
+
+    Window moments are added/removed Welford style, the trailing peak comes
+    from a monotonic deque of (bar, value) with decreasing values, and
+    closed trade cycles sit in a deque until they leave the window. Values
+    equal rolling_metrics up to floating-point round-off.
+    """
+
+    def __init__(self, window=63, rf=0.02):
+        """
+        Args:
+            window (int): Window length in bars.
+            rf (float): Annual risk-free rate for the Sharpe ratio.
+        """
+        if window < 2:
+            raise ValueError("Rolling window must be at least 2 bars.")
+        self.window = window
+        self.rf = rf
+        self.bar = -1
+        self.last_value = None
+        self.returns = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        # Trailing run of identical returns, so constant windows give exactly zero volatility
+        self.same_run = 0
+        self.peaks = deque()
+        self.open_buys = deque()
+        self.closed = deque()
+        self.wins = 0
+
+    def update(self, value, trade=None):
+        """
+        Adds one bar.
+
+        Args:
+            value (float): Portfolio value after the bar.
+            trade (dict): Trade executed on the bar (Backtester format), or None.
+
+        Returns:
+            dict: Current ROLLING_METRICS values.
+        """
+        self.bar += 1
+        if self.last_value is not None:
+            self._add_return(value / self.last_value - 1)
+        self.last_value = value
+
+        while self.peaks and self.peaks[-1][1] <= value:
+            self.peaks.pop()
+        self.peaks.append((self.bar, value))
+        if self.peaks[0][0] <= self.bar - self.window:
+            self.peaks.popleft()
+
+        if trade is not None:
+            if trade['Type'] == 'Buy':
+                self.open_buys.append(trade['Value'] + trade['Commission'])
+            elif self.open_buys:
+                win = (trade['Value'] - trade['Commission']) - self.open_buys.popleft() > 0
+                self.closed.append((self.bar, win))
+                self.wins += win
+        while self.closed and self.closed[0][0] <= self.bar - self.window:
+            self.wins -= self.closed.popleft()[1]
+        return self.result()
+
+    def _add_return(self, r):
+        self.same_run = self.same_run + 1 if self.returns and r == self.returns[-1] else 1
+        self.returns.append(r)
+        n = len(self.returns)
+        delta = r - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (r - self.mean)
+        if n > self.window:
+            old = self.returns.popleft()
+            n -= 1
+            delta = old - self.mean
+            self.mean -= delta / n
+            self.m2 -= delta * (old - self.mean)
+
+    def result(self):
+        """
+        Returns:
+            dict: Same keys as rolling_metrics' columns.
+        """
+        if len(self.returns) == self.window:
+            std = 0.0 if self.same_run >= self.window else math.sqrt(max(self.m2 / (self.window - 1), 0.0))
+            volatility = std * math.sqrt(252)
+            sharpe = (self.mean - self.rf / 252) / std * math.sqrt(252) if std > 0 else 0.0
+        else:
+            volatility = sharpe = math.nan
+        return {
+            'Rolling Volatility': volatility,
+            'Rolling Sharpe': sharpe,
+            'Rolling Drawdown': self.last_value / self.peaks[0][1] - 1 if self.peaks else math.nan,
+            'Rolling Win Rate': self.wins / len(self.closed) if self.closed else math.nan,
+        }
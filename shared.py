@@ -0,0 +1,225 @@
+import sys
+import threading
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+
+# Offsets of packed arrays are aligned to cache lines
+ALIGNMENT = 64
+
+class SharedHandle:
+    """
+    Picklable description of a published segment: its name and, per array,
+    (offset, dtype, shape). A few hundred bytes regardless of the data size.
+    """
+
+    __slots__ = ('name', 'layout', 'meta')
+
+    def __init__(self, name, layout, meta=None):
+        self.name = name
+        self.layout = layout
+        self.meta = meta or {}
+
+    def __getstate__(self):
+        return self.name, self.layout, self.meta
+
+    def __setstate__(self, state):
+        self.name, self.layout, self.meta = state
+
+    def __repr__(self):
+        return f"SharedHandle({self.name!r}, {sorted(self.layout)})"
+
+class SharedArrays:
+    """
+    Owner of one shared memory segment holding several NumPy arrays.
+
+    The arrays are copied in once; worker processes receive `handle` and map
+    the same pages with attach(), so the data exists once in RAM however
+    many workers read it. The owner unlinks the segment on close(), on
+    leaving a with-block, or when garbage collected / at interpreter exit,
+    whichever comes first.
+    """
+
+    def __init__(self, arrays, meta=None):
+        """
+        Args:
+            arrays (dict): Name -> array-like (copied into the segment as C-contiguous).
+            meta (dict): Small picklable extras carried by the handle.
+        """
+        arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+        layout = {}
+        size = 0
+        for key, value in arrays.items():
+            if value.dtype.hasobject:
+                raise TypeError(f"Array '{key}' has object dtype and cannot be shared.")
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[key] = (size, value.dtype.str, value.shape)
+            size += value.nbytes
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+        for key, value in arrays.items():
+            offset, dtype, shape = layout[key]
+            np.ndarray(shape, dtype, buffer=self._shm.buf, offset=offset)[...] = value
+        self.handle = SharedHandle(self._shm.name, layout, meta)
+        self.nbytes = size
+
+    def close(self):
+        """
+        Unmaps and unlinks the segment (idempotent). Workers that still have
+        it mapped keep their views until they detach.
+        """
+        self._finalizer()
+
+    @property
+    def closed(self):
+        return not self._finalizer.alive
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _release(shm):
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+# Segments mapped by this process: name -> SharedMemory
+_ATTACHED = {}
+_ATTACH_LOCK = threading.Lock()
+
+def _open(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching also registers the segment with the resource
+    # tracker, which would unlink it (and warn) when this process exits.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def attach(handle):
+    """
+    Maps a published segment into this process.
+
+    The mapping is reused by later calls with the same handle, so tasks
+    running in one worker pay the attach cost once.
+
+    Args:
+        handle (SharedHandle): SharedArrays.handle from the owner.
+
+    Returns:
+        dict: Name -> read-only NumPy view into the shared pages (no copy).
+    """
+    with _ATTACH_LOCK:
+        shm = _ATTACHED.get(handle.name)
+        if shm is None:
+            shm = _ATTACHED[handle.name] = _open(handle.name)
+    views = {}
+    for key, (offset, dtype, shape) in handle.layout.items():
+        view = np.ndarray(shape, dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        views[key] = view
+    return views
+
+def detach(handle=None):
+    """
+    Unmaps one segment (or all attached ones) in this process.
+
+    Segments whose views are still referenced stay mapped; call again once
+    they are released.
+
+    Returns:
+        int: Number of segments unmapped.
+    """
+    with _ATTACH_LOCK:
+        names = [handle.name] if handle is not None else list(_ATTACHED)
+        closed = 0
+        for name in names:
+            shm = _ATTACHED.get(name)
+            if shm is None:
+                continue
+            try:
+                shm.close()
+            except BufferError:
+                continue
+            del _ATTACHED[name]
+            closed += 1
+        return closed
+
+def publish_frame(df, columns=None, extra=None):
+    """
+    Publishes numeric DataFrame columns and the index to shared memory.
+
+    Args:
+        df (pd.DataFrame): Source frame (e.g. from data.fetch_data).
+        columns (list): Columns to share (default: all numeric columns).
+        extra (dict): Additional arrays to place in the same segment
+            (e.g. indicator matrices), returned by attach_frame.
+
+    Returns:
+        SharedArrays: Owner of the segment; pass `.handle` to workers.
+    """
+    if columns is None:
+        columns = [name for name in df.columns if pd.api.types.is_numeric_dtype(df[name])]
+    arrays = {f"column:{name}": df[name].to_numpy() for name in columns}
+    meta = {'columns': list(columns), 'index_name': df.index.name}
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        meta['index'] = ('range', index.start, index.stop, index.step)
+    elif isinstance(index, pd.DatetimeIndex):
+        arrays['index'] = index.asi8
+        meta['index'] = ('datetime', index.unit, None if index.tz is None else str(index.tz))
+    elif pd.api.types.is_numeric_dtype(index.dtype):
+        arrays['index'] = index.to_numpy()
+        meta['index'] = ('values',)
+    else:
+        # Labels that cannot live in a flat buffer travel with the handle
+        meta['index'] = ('labels', index.tolist())
+
+    for key, value in (extra or {}).items():
+        arrays[f"extra:{key}"] = value
+    return SharedArrays(arrays, meta)
+
+def attach_frame(handle):
+    """
+    Rebuilds a published frame as views into shared memory.
+
+    Columns and naive DatetimeIndex/numeric indexes are zero-copy and
+    read-only; a timezone-aware index is converted from its UTC values (one
+    index-sized copy per worker).
+
+    Args:
+        handle (SharedHandle): publish_frame(...).handle.
+
+    Returns:
+        df (pd.DataFrame): Frame over the shared columns.
+        extra (dict): The extra arrays passed to publish_frame.
+    """
+    views = attach(handle)
+    meta = handle.meta
+    kind = meta['index'][0]
+    if kind == 'range':
+        index = pd.RangeIndex(*meta['index'][1:])
+    elif kind == 'datetime':
+        _, unit, tz = meta['index']
+        index = pd.DatetimeIndex(views['index'].view(f"M8[{unit}]"), copy=False)
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+    elif kind == 'values':
+        index = pd.Index(views['index'], copy=False)
+    else:
+        index = pd.Index(meta['index'][1])
+    index.name = meta['index_name']
+
+    df = pd.DataFrame({name: views[f"column:{name}"] for name in meta['columns']}, index=index, copy=False)
+    extra = {key[len('extra:'):]: value for key, value in views.items() if key.startswith('extra:')}
+    return df, extra
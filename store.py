@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+import pandas as pd
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+class NoData(Exception):
+    """
+    Raised by a provider to confirm that a range has no bars (e.g. before a
+    listing date). The range is then recorded as covered; a None or empty
+    result is not, since yfinance also answers that way on network errors,
+    rate limits and other transient failures.
+    """
+
+class DataStore:
+    """
+    On-disk OHLCV store, one directory of memory-mappable .npy columns per ticker.
+
+    The store remembers which date ranges the provider already answered,
+    so extending a range only downloads the missing pieces. Slices
+    are served from memory-mapped arrays, so only the requested rows are read.
+
+    Layout:
+        <root>/<TICKER>/meta.json          columns, coverage, active version
+        <root>/<TICKER>/<version>/*.npy    index (int64 ns) + one file per column
+        <root>/<TICKER>/.lock              held by writers across read-merge-write
+
+    Writers of one ticker are serialized with a file lock, so several
+    processes can fill the same store. Readers never lock: a write publishes
+    a new version by swapping meta.json, and the version it replaced is only
+    removed by the following write, so a reader that just read meta.json
+    can still open its files.
+    """
+
+    def __init__(self, root, provider=None, offline=False):
+        """
+        Args:
+            root (str): Directory holding the store.
+            provider (callable): provider(ticker, start_date, end_date) -> pd.DataFrame
+                with a DatetimeIndex; end_date is exclusive (as in yf.download).
+                It raises NoData to confirm an empty range; None or an empty
+                frame leaves the range missing, so it is requested again later.
+            offline (bool): Never call the provider, only serve stored data.
+        """
+        self.root = root
+        self.provider = provider
+        self.offline = offline
+
+    def load(self, ticker, start_date, end_date):
+        """
+        Returns stored bars in [start_date, end_date), fetching missing ranges first.
+
+        Returns:
+            pd.DataFrame: OHLCV data, or None if nothing is available.
+        """
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        if not self.offline:
+            self.fill(ticker, start_date, end_date)
+        return self.read(ticker, start_date, end_date)
+
+    def fill(self, ticker, start_date, end_date):
+        """
+        Downloads and merges the parts of [start_date, end_date) not yet covered.
+
+        Only ranges the provider answered (with bars, or with NoData) are
+        recorded as covered. If the provider raises, the ranges answered
+        before are still stored and the exception propagates.
+        """
+        if self.provider is None:
+            raise ValueError("DataStore has no provider; use offline=True to serve stored data only.")
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        # Held during the download too: a concurrent fill of the same ticker
+        # waits, then finds the range covered instead of fetching it again
+        with self._lock(ticker):
+            meta = self._read_meta(ticker)
+            missing = self.missing_ranges(ticker, start_date, end_date)
+            if not missing:
+                return
+
+            frames = []
+            answered = []
+            try:
+                for lo, hi in missing:
+                    try:
+                        data = self.provider(ticker, lo, hi)
+                    except NoData:
+                        answered.append((lo, hi))
+                        continue
+                    if data is not None and not data.empty:
+                        frames.append(data)
+                        answered.append((lo, hi))
+            finally:
+                if answered:
+                    self._merge(ticker, meta, frames, answered, end_date)
+
+    def _merge(self, ticker, meta, frames, answered, end_date):
+        # Today's bar may still change, so coverage stops before it
+        covered_until = min(end_date, date.today())
+        coverage = [(lo, min(hi, covered_until)) for lo, hi in answered if lo < covered_until]
+        coverage = _merge_ranges([(_to_date(a), _to_date(b)) for a, b in meta['coverage']] + coverage)
+
+        existing = self.read(ticker)
+        merged = pd.concat(([existing] if existing is not None else []) + frames) if frames else existing
+        if merged is not None:
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        self._write(ticker, merged, coverage)
+
+    def missing_ranges(self, ticker, start_date, end_date):
+        """
+        Sub-ranges of [start_date, end_date) not yet fetched for ticker.
+        """
+        start_date, end_date = _to_date(start_date), _to_date(end_date)
+        missing = []
+        cursor = start_date
+        for lo, hi in self._read_meta(ticker)['coverage']:
+            lo, hi = _to_date(lo), _to_date(hi)
+            if hi <= cursor:
+                continue
+            if lo >= end_date:
+                break
+            if lo > cursor:
+                missing.append((cursor, lo))
+            cursor = max(cursor, hi)
+        if cursor < end_date:
+            missing.append((cursor, end_date))
+        return missing
+
+    def read(self, ticker, start_date=None, end_date=None):
+        """
+        Serves stored bars in [start_date, end_date) from memory-mapped columns.
+
+        Returns:
+            pd.DataFrame: Stored data, or None if the slice is empty.
+        """
+        for attempt in range(3):
+            meta = self._read_meta(ticker)
+            if meta['version'] is None:
+                return None
+            try:
+                return self._read_version(meta, self._ticker_dir(ticker), start_date, end_date)
+            except FileNotFoundError:
+                # Two writes landed since meta.json was read; read the new version
+                if attempt == 2:
+                    raise
+
+    def _read_version(self, meta, ticker_dir, start_date, end_date):
+        folder = os.path.join(ticker_dir, meta['version'])
+        stamps = np.load(os.path.join(folder, 'index.npy'), mmap_mode='r')
+
+        lo = 0 if start_date is None else np.searchsorted(stamps, pd.Timestamp(start_date).value, side='left')
+        hi = len(stamps) if end_date is None else np.searchsorted(stamps, pd.Timestamp(end_date).value, side='left')
+        if hi <= lo:
+            return None
+
+        index = pd.DatetimeIndex(np.asarray(stamps[lo:hi]).astype('datetime64[ns]'), name=meta['index_name'])
+        index = index.as_unit(meta.get('unit', 'ns'))
+        if meta['tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        columns = {}
+        for column in meta['columns']:
+            values = np.load(os.path.join(folder, f"{column}.npy"), mmap_mode='r')
+            columns[column] = np.array(values[lo:hi])
+        return pd.DataFrame(columns, index=index)
+
+    def _ticker_dir(self, ticker):
+        return os.path.join(self.root, ticker.upper())
+
+    @contextmanager
+    def _lock(self, ticker):
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        with open(os.path.join(ticker_dir, '.lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self, ticker):
+        path = os.path.join(self._ticker_dir(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return {'version': None, 'columns': [], 'coverage': [], 'tz': None, 'unit': 'ns', 'index_name': None}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write(self, ticker, data, coverage):
+        ticker_dir = self._ticker_dir(ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        old = self._read_meta(ticker)
+
+        meta = {
+            'version': None,
+            'columns': [],
+            'coverage': [[lo.isoformat(), hi.isoformat()] for lo, hi in coverage],
+            'tz': None,
+            'unit': 'ns',
+            'index_name': None,
+        }
+        if data is not None and not data.empty:
+            # New arrays go to a fresh version directory; swapping meta.json publishes them atomically
+            version = uuid.uuid4().hex
+            folder = os.path.join(ticker_dir, version)
+            os.makedirs(folder)
+            index = data.index
+            if index.tz is not None:
+                meta['tz'] = str(index.tz)
+                index = index.tz_convert('UTC').tz_localize(None)
+            np.save(os.path.join(folder, 'index.npy'), index.as_unit('ns').asi8)
+            for column in data.columns:
+                np.save(os.path.join(folder, f"{column}.npy"), data[column].to_numpy())
+            meta.update(version=version, columns=[str(c) for c in data.columns], unit=data.index.unit, index_name=data.index.name)
+        elif old['version'] is not None:
+            meta.update(version=old['version'], columns=old['columns'], tz=old['tz'], unit=old['unit'], index_name=old['index_name'])
+
+        fd, tmp_path = tempfile.mkstemp(dir=ticker_dir, prefix='meta.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(ticker_dir, 'meta.json'))
+
+        # Readers may still be opening the version just replaced; only older ones go
+        keep = {meta['version'], old['version']}
+        for entry in os.listdir(ticker_dir):
+            path = os.path.join(ticker_dir, entry)
+            if entry not in keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+def _to_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.date()
+    return value
+
+def _merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(r for r in ranges if r[0] < r[1]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
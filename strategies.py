@@ -1,56 +1,126 @@
 import pandas as pd
 import numpy as np
+import graph
+from indicators import RollingMean, RSI
 
-def simple_moving_average_strategy(df, short_window, long_window):
+def sma_crossover(short_window, long_window):
     """
-    Generates signals based on SMA crossover.
-    Buy (1) when Short SMA > Long SMA.
-    Sell (0) when Short SMA < Long SMA.
-    """
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = 0.0
+    Declared SMA crossover: long (1) while SMA(short) > SMA(long), else cash (0).
 
-    # Calculate SMAs
-    signals['short_mavg'] = df['Close'].rolling(window=short_window, min_periods=1).mean()
-    signals['long_mavg'] = df['Close'].rolling(window=long_window, min_periods=1).mean()
+    Returns:
+        dict: Output column -> graph.Node.
+    """
+    close = graph.Column('Close')
+    short_mavg = graph.SMA(close, short_window, min_periods=1)
+    long_mavg = graph.SMA(close, long_window, min_periods=1)
+    return {
+        'signal': graph.Where(short_mavg > long_mavg, 1.0, 0.0),
+        'short_mavg': short_mavg,
+        'long_mavg': long_mavg,
+    }
 
-    # Create signals
-    # We want to be Long (1) when short > long.
-    signals['signal'] = np.where(signals['short_mavg'] > signals['long_mavg'], 1.0, 0.0)   
+def rsi_reversion(period=14, buy_threshold=30, sell_threshold=70, method='simple'):
+    """
+    Declared RSI strategy: enter when RSI < buy_threshold, exit when
+    RSI > sell_threshold, hold in between.
 
-    # Generate trading orders (changes in position)
-    signals['positions'] = signals['signal'].diff()
+    Returns:
+        dict: Output column -> graph.Node.
+    """
+    rsi = graph.RSI(graph.Column('Close'), period, method)
+    return {
+        'signal': graph.Hold(rsi < buy_threshold, rsi > sell_threshold),
+        'rsi': rsi,
+    }
 
-    return signals
+def simple_moving_average_strategy(df, short_window, long_window, dtype=None):
+    """
+    Generates signals based on SMA crossover.
+    Buy (1) when Short SMA > Long SMA.
+    Sell (0) when Short SMA < Long SMA.
+    dtype=np.float32 stores the output columns in single precision; the
+    comparison runs in float64 first, so the signals are unchanged.
+    """
+    return graph.run_strategies(df, {'sma': sma_crossover(short_window, long_window)}, dtype)['sma']
 
-def rsi_strategy(df, period=14, buy_threshold=30, sell_threshold=70):
+def rsi_strategy(df, period=14, buy_threshold=30, sell_threshold=70, method='simple', dtype=None):
     """
     Generates signals based on RSI.
     Buy (1) when RSI < buy_threshold.
     Close (0) when RSI > sell_threshold.
     Holds position in between.
+    method='simple' averages gains/losses with a rolling mean,
+    method='wilder' uses Wilder smoothing (exponential, alpha = 1/period).
+    dtype=np.float32 stores the output columns in single precision after the
+    thresholds are applied in float64.
+    """
+    return graph.run_strategies(df, {'rsi': rsi_reversion(period, buy_threshold, sell_threshold, method)}, dtype)['rsi']
+
+def run_declared(df, configs, dtype=None):
     """
-    signals = pd.DataFrame(index=df.index)
-    signals['signal'] = np.nan # Initialize with NaN to support ffill
-    
-    # Calculate RSI
-    delta = df['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-
-    rs = gain / loss
-    signals['rsi'] = 100 - (100 / (1 + rs))
-    
-    # Logic:
-    # Buy when RSI < Buy Threshold (Oversold -> Rebound expected)
-    signals.loc[signals['rsi'] < buy_threshold, 'signal'] = 1.0
-    
-    # Sell when RSI > Sell Threshold (Overbought -> Correction expected)
-    signals.loc[signals['rsi'] > sell_threshold, 'signal'] = 0.0
-    
-    # Forward fill to maintain position
-    signals['signal'] = signals['signal'].ffill().fillna(0.0)
-    
-    signals['positions'] = signals['signal'].diff()
-    
-    return signals
+    Runs several strategies in one shared evaluation graph.
+
+    Args:
+        df (pd.DataFrame): Price data.
+        configs (dict): Label -> (strategy name, parameters), e.g.
+            {'fast': ('sma', {'short_window': 10, 'long_window': 50})}.
+        dtype: Optional dtype of the returned columns.
+
+    Returns:
+        dict: Label -> signals DataFrame, identical to calling the
+            corresponding STRATEGIES function on its own.
+    """
+    return graph.run_strategies(df, {label: DECLARED_STRATEGIES[name](**params)
+                                     for label, (name, params) in configs.items()}, dtype)
+
+class SMACrossoverStream:
+    """
+    Streaming counterpart of simple_moving_average_strategy.
+    Each update takes one close and returns the signal for that bar in O(1).
+    """
+    def __init__(self, short_window, long_window):
+        self.short_mavg = RollingMean(short_window, min_periods=1)
+        self.long_mavg = RollingMean(long_window, min_periods=1)
+
+    def update(self, close):
+        short = self.short_mavg.update(close)
+        long = self.long_mavg.update(close)
+        return 1.0 if short > long else 0.0
+
+class RSIStream:
+    """
+    Streaming counterpart of rsi_strategy.
+    Each update takes one close and returns the signal for that bar in O(1).
+    """
+    def __init__(self, period=14, buy_threshold=30, sell_threshold=70, method='simple'):
+        self.rsi = RSI(period, method)
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.signal = 0.0
+
+    def update(self, close):
+        rsi = self.rsi.update(close)
+        # Sell takes precedence, as in the batch version
+        if rsi > self.sell_threshold:
+            self.signal = 0.0
+        elif rsi < self.buy_threshold:
+            self.signal = 1.0
+        return self.signal
+
+# Registry used by headless runners: name -> signal function
+STRATEGIES = {
+    'sma': simple_moving_average_strategy,
+    'rsi': rsi_strategy,
+}
+
+# Graph declarations, called with the same keyword arguments
+DECLARED_STRATEGIES = {
+    'sma': sma_crossover,
+    'rsi': rsi_reversion,
+}
+
+# Streaming counterparts, constructed with the same keyword arguments
+STREAM_STRATEGIES = {
+    'sma': SMACrossoverStream,
+    'rsi': RSIStream,
+}
@@ -0,0 +1,270 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import pandas as pd
+import numpy as np
+from metrics import calculate_metrics_batch, METRIC_NAMES
+from shared import publish_frame, attach_frame
+
+# Upper bound on the number of float64 cells held per (bars x configs) matrix.
+MAX_BATCH_CELLS = 8_000_000
+
+def rolling_means(values, windows, min_periods=None):
+    """
+    Rolling means for several windows from one shared cumulative sum.
+
+    Args:
+        values (np.ndarray): 1-D input series.
+        windows (iterable): Window lengths.
+        min_periods (int): Minimum observations per window. None means the
+            full window (pandas default); 1 matches rolling(min_periods=1).
+
+    Returns:
+        np.ndarray: (bars x windows) matrix of means, NaN where undefined.
+    """
+    values = np.asarray(values, dtype=float)
+    windows = np.asarray(list(windows), dtype=np.int64)
+    n = len(values)
+
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    # Count of non-zero entries, so all-zero windows come out exactly 0 like pandas
+    nonzero = np.concatenate(([0], np.cumsum(values != 0)))
+
+    t = np.arange(n)[:, None]
+    lo = np.maximum(t + 1 - windows[None, :], 0)
+    count = (t + 1 - lo).astype(float)
+    means = (csum[t + 1] - csum[lo]) / count
+    means[(nonzero[t + 1] - nonzero[lo]) == 0] = 0.0
+
+    required = windows[None, :] if min_periods is None else np.minimum(min_periods, windows)[None, :]
+    means[count < required] = np.nan
+    return means
+
+def _forward_fill(matrix, fill_value=0.0):
+    """
+    Forward fills NaNs down each column, leading NaNs become fill_value.
+    """
+    n = matrix.shape[0]
+    last_set = np.where(np.isnan(matrix), -1, np.arange(n)[:, None])
+    np.maximum.accumulate(last_set, axis=0, out=last_set)
+    filled = np.take_along_axis(matrix, np.maximum(last_set, 0), axis=0)
+    filled[last_set < 0] = fill_value
+    return filled
+
+def _simulate(prices, long, initial_capital, transaction_cost):
+    """
+    All-in/all-out simulation for many position columns at once.
+
+    Equity compounds by the bar return while long and pays the commission
+    rate on every position change, which is the Backtester cash/holdings
+    arithmetic rearranged into a cumulative product.
+
+    Returns:
+        equity (np.ndarray): (bars x configs) portfolio value.
+        n_trades (np.ndarray): Executions per config.
+        wins (np.ndarray): Profitable Buy -> Sell cycles per config.
+        n_closed (np.ndarray): Completed Buy -> Sell cycles per config.
+    """
+    n, k = long.shape
+    prev_long = np.vstack([np.zeros((1, k), dtype=bool), long[:-1]])
+    changed = long != prev_long
+
+    bar_return = np.ones(n)
+    bar_return[1:] = prices[1:] / prices[:-1]
+    growth = np.where(prev_long, bar_return[:, None], 1.0)
+    growth[changed] *= 1.0 - transaction_cost
+    equity = initial_capital * np.cumprod(growth, axis=0)
+
+    # Cash committed at each Buy, carried forward to the matching Sell
+    equity_before = np.vstack([np.full((1, k), float(initial_capital)), equity[:-1]])
+    buys = changed & long
+    sells = changed & ~long
+    entry_cash = _forward_fill(np.where(buys, equity_before, np.nan), np.nan)
+    # Sell net proceeds vs Buy value plus commission
+    wins = np.sum(sells & (equity > entry_cash * (1.0 + transaction_cost)), axis=0)
+
+    return equity, changed.sum(axis=0), wins, sells.sum(axis=0)
+
+def evaluate_grid(df, grid, signal_fn, initial_capital=10000.0, transaction_cost=0.001, batch_size=None):
+    """
+    Simulates and scores every grid row in memory-sized batches.
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        grid (pd.DataFrame): One row per configuration.
+        signal_fn (callable): signal_fn(batch) -> (bars x len(batch)) bool matrix of long positions.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        batch_size (int): Configurations per batch (default sized to memory).
+
+    Returns:
+        pd.DataFrame: grid joined with the metric columns.
+    """
+    prices = df['Close'].to_numpy(dtype=float)
+    if not (np.all(np.isfinite(prices)) and np.all(prices > 0)):
+        raise ValueError("Sweeps require finite, positive 'Close' prices.")
+
+    if batch_size is None:
+        batch_size = max(1, MAX_BATCH_CELLS // max(len(prices), 1))
+
+    frames = []
+    for start in range(0, len(grid), batch_size):
+        batch = grid.iloc[start:start + batch_size]
+        long = signal_fn(batch)
+        equity, n_trades, wins, n_closed = _simulate(prices, long, initial_capital, transaction_cost)
+        metrics = calculate_metrics_batch(equity, df.index)
+        metrics['Number of Trades'] = n_trades
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics['Win Rate'] = np.where(n_closed > 0, wins / np.maximum(n_closed, 1), 0.0)
+        metrics.index = batch.index
+        frames.append(metrics)
+
+    if not frames:
+        return grid.reindex(columns=list(grid.columns) + METRIC_NAMES)
+    return grid.join(pd.concat(frames))
+
+def sma_indicators(df, short_windows, long_windows):
+    """
+    Grid and shared rolling-mean matrix for an SMA crossover sweep.
+
+    Returns:
+        grid (pd.DataFrame): 'short_window', 'long_window' per configuration.
+        indicators (tuple): (windows, means) for sma_signals; means is (bars x windows).
+    """
+    grid = pd.DataFrame(list(itertools.product(short_windows, long_windows)), columns=['short_window', 'long_window'])
+    windows = np.unique(grid[['short_window', 'long_window']].to_numpy())
+    return grid, (windows, rolling_means(df['Close'].to_numpy(dtype=float), windows, min_periods=1))
+
+def sma_signals(windows, means, batch):
+    """
+    Long positions (short SMA above long SMA) for a batch of SMA configurations.
+    """
+    short = means[:, np.searchsorted(windows, batch['short_window'].to_numpy())]
+    long = means[:, np.searchsorted(windows, batch['long_window'].to_numpy())]
+    return short > long
+
+def rsi_indicators(df, periods, buy_thresholds, sell_thresholds):
+    """
+    Grid and shared RSI matrix for an RSI sweep.
+
+    Returns:
+        grid (pd.DataFrame): 'period', 'buy_threshold', 'sell_threshold' per configuration.
+        indicators (tuple): (periods, rsi) for rsi_signals; rsi is (bars x periods).
+    """
+    grid = pd.DataFrame(list(itertools.product(periods, buy_thresholds, sell_thresholds)),
+                        columns=['period', 'buy_threshold', 'sell_threshold'])
+    period_values = np.unique(grid['period'].to_numpy())
+
+    delta = np.diff(df['Close'].to_numpy(dtype=float), prepend=np.nan)
+    gain = rolling_means(np.where(delta > 0, delta, 0.0), period_values)
+    loss = rolling_means(np.where(delta < 0, -delta, 0.0), period_values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + gain / loss))
+    return grid, (period_values, rsi)
+
+def rsi_signals(period_values, rsi, batch):
+    """
+    Long positions for a batch of RSI configurations (threshold crossings, held in between).
+    """
+    values = rsi[:, np.searchsorted(period_values, batch['period'].to_numpy())]
+    buy = batch['buy_threshold'].to_numpy(dtype=float)[None, :]
+    sell = batch['sell_threshold'].to_numpy(dtype=float)[None, :]
+    raw = np.where(values > sell, 0.0, np.where(values < buy, 1.0, np.nan))
+    return _forward_fill(raw) == 1.0
+
+# Strategy name -> (indicator builder, signal function); grid columns match the strategy keyword arguments
+SWEEPS = {
+    'sma': (sma_indicators, sma_signals),
+    'rsi': (rsi_indicators, rsi_signals),
+}
+
+def _evaluate_shared(handle, strategy, batch, initial_capital, transaction_cost, batch_size):
+    df, extra = attach_frame(handle)
+    indicators = [extra[str(i)] for i in range(len(extra))]
+    return evaluate_grid(df, batch, partial(SWEEPS[strategy][1], *indicators), initial_capital, transaction_cost, batch_size)
+
+def sweep_parallel(df, strategy, grid, initial_capital=10000.0, transaction_cost=0.001, batch_size=None,
+                   max_workers=None, tasks_per_worker=4, mp_context=None):
+    """
+    Evaluates a sweep grid across worker processes over shared memory.
+
+    The close prices, index and indicator matrices are published once with
+    shared.publish_frame; each task carries only the segment handle and its
+    slice of the grid, and workers read the arrays as zero-copy views. The
+    segment is unlinked when the sweep returns or fails. Results equal
+    evaluate_grid on the full grid.
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        strategy (str): Key of SWEEPS ('sma', 'rsi').
+        grid (dict): Keyword arguments of the indicator builder, e.g.
+            {'short_windows': [10, 20], 'long_windows': [50, 100]}.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        batch_size (int): Configurations per batch within a task (default sized to memory).
+        max_workers (int): Worker processes (default: CPU count).
+        tasks_per_worker (int): Grid chunks per worker, for load balancing.
+        mp_context: multiprocessing context for the pool (default: platform default).
+
+    Returns:
+        pd.DataFrame: One row per configuration with parameter and metric columns.
+    """
+    if strategy not in SWEEPS:
+        raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {sorted(SWEEPS)}.")
+    configs, indicators = SWEEPS[strategy][0](df, **grid)
+    max_workers = max_workers or os.cpu_count() or 1
+    n_tasks = max(1, min(len(configs), max_workers * tasks_per_worker))
+    bounds = np.linspace(0, len(configs), n_tasks + 1).astype(int)
+
+    with publish_frame(df, ['Close'], {str(i): value for i, value in enumerate(indicators)}) as shared:
+        del indicators
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as pool:
+            futures = [pool.submit(_evaluate_shared, shared.handle, strategy, configs.iloc[lo:hi],
+                                   initial_capital, transaction_cost, batch_size)
+                       for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+            frames = [future.result() for future in futures]
+    return pd.concat(frames) if frames else evaluate_grid(df, configs, None, initial_capital, transaction_cost, batch_size)
+
+def sweep_sma(df, short_windows, long_windows, initial_capital=10000.0, transaction_cost=0.001, batch_size=None):
+    """
+    Evaluates simple_moving_average_strategy over every (short, long) pair.
+
+    Rolling means for all distinct windows come from one cumulative sum, and
+    signals, equity and metrics are computed as (bars x configs) matrices.
+    Results match per-configuration backtests up to floating-point round-off
+    (near-exact SMA ties may resolve differently than pandas' rolling mean).
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        short_windows (iterable): Short SMA windows.
+        long_windows (iterable): Long SMA windows.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        batch_size (int): Configurations per batch (default sized to memory).
+
+    Returns:
+        pd.DataFrame: One row per pair with 'short_window', 'long_window' and metric columns.
+    """
+    grid, indicators = sma_indicators(df, short_windows, long_windows)
+    return evaluate_grid(df, grid, partial(sma_signals, *indicators), initial_capital, transaction_cost, batch_size)
+
+def sweep_rsi(df, periods, buy_thresholds, sell_thresholds, initial_capital=10000.0, transaction_cost=0.001, batch_size=None):
+    """
+    Evaluates rsi_strategy over every (period, buy, sell) combination.
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        periods (iterable): RSI lookback periods.
+        buy_thresholds (iterable): Go long when RSI is below this value.
+        sell_thresholds (iterable): Go to cash when RSI is above this value.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        batch_size (int): Configurations per batch (default sized to memory).
+
+    Returns:
+        pd.DataFrame: One row per combination with 'period', 'buy_threshold',
+            'sell_threshold' and metric columns.
+    """
+    grid, indicators = rsi_indicators(df, periods, buy_thresholds, sell_thresholds)
+    return evaluate_grid(df, grid, partial(rsi_signals, *indicators), initial_capital, transaction_cost, batch_size)
@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import pandas as pd
+from data import load_data, parse_tickers
+from strategies import STRATEGIES
+from backtest import Backtester
+from metrics import calculate_metrics
+
+def backtest_ticker(ticker, strategy, params, start_date, end_date, initial_capital=10000.0,
+                    transaction_cost=0.001, loader=load_data):
+    """
+    Runs fetch -> signals -> Backtester -> calculate_metrics for one ticker.
+
+    Failures are captured in the 'Error' field instead of raised, so one bad
+    symbol never aborts a universe run.
+
+    Returns:
+        dict: 'Ticker', 'Bars', 'Error' and the calculate_metrics keys.
+    """
+    row = {'Ticker': ticker, 'Bars': 0, 'Error': None}
+    try:
+        df = loader(ticker, start_date, end_date)
+        if df is None or df.empty:
+            row['Error'] = 'No data'
+            return row
+        signals = STRATEGIES[strategy](df, **params)
+        portfolio, trades = Backtester(df, signals, initial_capital, transaction_cost).run_backtest()
+        row['Bars'] = len(df)
+        row.update(calculate_metrics(portfolio, trades))
+    except Exception as e:
+        row['Error'] = f"{type(e).__name__}: {e}"
+    return row
+
+def run_universe(tickers, strategy, params, start_date, end_date, initial_capital=10000.0,
+                 transaction_cost=0.001, max_workers=None, chunksize=1, loader=load_data):
+    """
+    Backtests one strategy configuration over many tickers in a process pool.
+
+    Args:
+        tickers (list): Ticker symbols.
+        strategy (str): Key of strategies.STRATEGIES (e.g. 'sma', 'rsi').
+        params (dict): Keyword arguments for the strategy function.
+        start_date (date): Start date.
+        end_date (date): End date.
+        initial_capital (float): Starting capital per ticker.
+        transaction_cost (float): Cost per trade.
+        max_workers (int): Worker processes (default: CPU count); 1 runs inline.
+        chunksize (int): Tickers handed to a worker per task.
+        loader (callable): loader(ticker, start, end) -> DataFrame; must be picklable.
+
+    Returns:
+        pd.DataFrame: One row per ticker (in input order) with metrics, bar count and error.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {sorted(STRATEGIES)}.")
+    task = partial(backtest_ticker, strategy=strategy, params=params, start_date=start_date,
+                   end_date=end_date, initial_capital=initial_capital,
+                   transaction_cost=transaction_cost, loader=loader)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tickers) <= 1:
+        rows = [task(ticker) for ticker in tickers]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+            rows = list(pool.map(task, tickers, chunksize=chunksize))
+
+    return pd.DataFrame(rows).set_index('Ticker')
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import date, timedelta
+
+    parser = argparse.ArgumentParser(description="Backtest one strategy over many tickers in parallel.")
+    parser.add_argument("tickers", nargs="+", help="Ticker symbols, or @file with one symbol per line.")
+    parser.add_argument("--strategy", default="sma", choices=sorted(STRATEGIES))
+    parser.add_argument("--params", default='{"short_window": 20, "long_window": 50}', help="Strategy parameters as JSON.")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 2)))
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--capital", type=float, default=10000.0)
+    parser.add_argument("--cost", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=1)
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Download missing data concurrently (rate limited, batched) before backtesting.")
+    parser.add_argument("--output", help="Write the metrics table to this CSV file.")
+    args = parser.parse_args()
+
+    tickers = parse_tickers(args.tickers)
+
+    if args.prefetch:
+        from data import get_store
+        from fetcher import Fetcher, download_batch
+        errors = Fetcher(batch_provider=download_batch).fill_store(
+            get_store(offline=False), tickers, date.fromisoformat(args.start), date.fromisoformat(args.end))
+        for ticker, error in errors.items():
+            print(f"{ticker}: {error['type']}: {error['message']} ({error['attempts']} attempts)")
+
+    results = run_universe(tickers, args.strategy, json.loads(args.params), args.start, args.end,
+                           args.capital, args.cost, args.workers, args.chunksize)
+    if args.output:
+        results.to_csv(args.output)
+    print(results.to_string())
@@ -1,45 +1,519 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from datetime import date, timedelta
-from data import fetch_data
-from strategies import simple_moving_average_strategy
+from data import fetch_data, generate_synthetic_data, DataUnavailable
+import graph
+from strategies import simple_moving_average_strategy, run_declared, STRATEGIES, SMACrossoverStream, RSIStream
+from indicators import RollingMean, ExponentialMean, RSI
 from backtest import Backtester
-from metrics import calculate_metrics
+from benchmark import buy_and_hold
+from portfolio import PortfolioBacktester
+from store import DataStore, NoData
+from archive import load_bars
+from metrics import calculate_metrics, calculate_metrics_batch, compact_trades, RunningMetrics, METRIC_NAMES
+from checkpoint import IncrementalBacktest
+from batch import run_batch, ResultStore
+from fetcher import Fetcher
+from profiling import PipelineProfiler, profile_run
 
-def verify():
+def check_engine_parity(cases=30, seed=0):
+    """
+    Checks that the vectorized and loop engines agree bit for bit.
+
+    Runs random signal paths (1, 0, -1 and NaN, so holds and gaps are
+    covered) over synthetic prices with random capital, costs and dtypes.
+
+    Raises:
+        AssertionError: The engines disagree on some case.
+    """
+    rng = np.random.default_rng(seed)
+    for case in range(cases):
+        n = int(rng.integers(1, 2000))
+        df = generate_synthetic_data(n, seed=case, freq='B', bars_per_year=252)
+        signal = rng.choice([1.0, 0.0, -1.0, np.nan], size=n, p=rng.dirichlet(np.ones(4)))
+        signals = pd.DataFrame({'signal': signal}, index=df.index)
+        capital = float(rng.uniform(100, 1e6))
+        cost = float(rng.choice([0.0, rng.uniform(0, 0.01)]))
+        dtype = [np.float64, np.float32][case % 2]
+
+        runs = [Backtester(df, signals, capital, cost, engine=engine, dtype=dtype).run_backtest()
+                for engine in ('vectorized', 'loop')]
+        try:
+            pd.testing.assert_frame_equal(runs[0][0], runs[1][0], check_exact=True)
+            pd.testing.assert_frame_equal(runs[0][1], runs[1][1], check_exact=True)
+        except AssertionError as e:
+            raise AssertionError(f"Engine parity case {case} (bars={n}, capital={capital}, cost={cost}, "
+                                 f"dtype={dtype.__name__}): {e}") from e
+    print(f"Engine parity: {cases} cases identical.")
+
+def check_store():
+    """
+    Checks DataStore range bookkeeping against a fake provider: incremental
+    fill, overlapping requests, offline mode, and that empty answers are
+    retried while NoData answers are not.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    bars = generate_synthetic_data(600, seed=1, start="2020-01-01", freq='D', bars_per_year=252)
+    calls = []
+    answers = {}
+
+    def provider(ticker, start_date, end_date):
+        calls.append((ticker, start_date, end_date))
+        answer = answers.get(ticker)
+        if answer is not None:
+            return answer()
+        return bars[(bars.index >= str(start_date)) & (bars.index < str(end_date))]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = DataStore(root, provider=provider)
+        d = lambda text: date.fromisoformat(text)
+
+        first = store.load('TEST', d('2020-03-01'), d('2020-06-01'))
+        assert calls == [('TEST', d('2020-03-01'), d('2020-06-01'))], calls
+        assert first.equals(bars.loc['2020-03-01':'2020-05-31']), "first slice differs from the provider data"
+
+        calls.clear()
+        overlap = store.load('TEST', d('2020-01-15'), d('2020-07-01'))
+        assert calls == [('TEST', d('2020-01-15'), d('2020-03-01')), ('TEST', d('2020-06-01'), d('2020-07-01'))], calls
+        assert overlap.equals(bars.loc['2020-01-15':'2020-06-30']), "merged slice differs from the provider data"
+
+        calls.clear()
+        store.load('TEST', d('2020-02-01'), d('2020-06-15'))
+        assert calls == [], f"covered range was fetched again: {calls}"
+
+        offline = DataStore(root, offline=True)
+        assert offline.load('TEST', d('2020-01-01'), d('2020-12-31')).equals(overlap), "offline mode served other bars"
+        assert offline.load('OTHER', d('2020-01-01'), d('2020-12-31')) is None
+
+        # Empty answers may be transient failures: nothing is covered and the next load asks again
+        answers['FLAKY'] = lambda: pd.DataFrame()
+        calls.clear()
+        assert store.load('FLAKY', d('2020-01-01'), d('2020-02-01')) is None
+        assert store.missing_ranges('FLAKY', d('2020-01-01'), d('2020-02-01')) == [(d('2020-01-01'), d('2020-02-01'))]
+        answers.pop('FLAKY')
+        assert store.load('FLAKY', d('2020-01-01'), d('2020-02-01')).equals(bars.loc['2020-01-01':'2020-01-31'])
+        assert len(calls) == 2, calls
+
+        # A confirmed empty range is covered and not requested again
+        def no_data():
+            raise NoData("not listed yet")
+        answers['NEW'] = no_data
+        calls.clear()
+        assert store.load('NEW', d('2019-01-01'), d('2019-06-01')) is None
+        assert store.load('NEW', d('2019-01-01'), d('2019-06-01')) is None
+        assert len(calls) == 1, calls
+    print("Data store: incremental fill, overlap, offline mode and failed ranges OK.")
+
+def _slow_provider(ticker, start_date, end_date):
+    bars = generate_synthetic_data(600, seed=1, start="2020-01-01", freq='D', bars_per_year=252)
+    time.sleep(0.01)
+    return bars[(bars.index >= str(start_date)) & (bars.index < str(end_date))]
+
+def _load_ranges(root, seed, loads):
+    store = DataStore(root, provider=_slow_provider)
+    bars = _slow_provider('TEST', date(2020, 1, 1), date(2021, 12, 31))
+    rng = np.random.default_rng(seed)
+    for _ in range(loads):
+        lo, hi = sorted(rng.choice(600, size=2, replace=False))
+        start, end = bars.index[lo].date(), bars.index[hi].date()
+        assert store.load('TEST', start, end).equals(bars.loc[str(start):str(end - timedelta(days=1))]), (start, end)
+
+def check_store_concurrency(processes=4, loads=15):
+    """
+    Checks that several processes filling and reading one ticker of the same
+    store all get the provider's bars and leave a consistent store behind.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    with tempfile.TemporaryDirectory() as root:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for future in [pool.submit(_load_ranges, root, seed, loads) for seed in range(processes)]:
+                future.result()
+        store = DataStore(root, offline=True)
+        bars = _slow_provider('TEST', date(2020, 1, 1), date(2021, 12, 31))
+        stored = store.read('TEST')
+        assert stored.equals(bars.loc[stored.index[0]:stored.index[-1]]), "concurrent fills stored other bars"
+        versions = [e for e in os.listdir(os.path.join(root, 'TEST')) if os.path.isdir(os.path.join(root, 'TEST', e))]
+        assert len(versions) <= 2, f"old versions were not removed: {versions}"
+    print(f"Data store: {processes} concurrent writers x {loads} loads consistent.")
+
+def check_archive_resample(freqs=('2D', '3h', 'W'), chunk_rows=1777):
+    """
+    Checks that chunked archive resampling equals resampling the whole file,
+    on 5-minute bars restricted to weekday sessions (so buckets have gaps).
+
+    Raises:
+        AssertionError: Some frequency differs.
+    """
+    bars = generate_synthetic_data(120 * 288, seed=2, start="2021-03-03 00:00", freq='5min')
+    minutes = bars.index.hour * 60 + bars.index.minute
+    bars = bars[(bars.index.dayofweek < 5) & (minutes >= 570) & (minutes < 960)]
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'bars.csv')
+        bars.to_csv(path)
+        for freq in freqs:
+            chunked = load_bars(path, resample=freq, chunk_rows=chunk_rows)
+            whole = load_bars(path, resample=freq, chunk_rows=len(bars) + 1)
+            expected = bars.resample(freq).agg(
+                {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}).dropna(subset=['Close'])
+            pd.testing.assert_frame_equal(chunked, whole, check_freq=False, obj=f"chunked vs whole file ({freq})")
+            pd.testing.assert_frame_equal(whole, expected, check_freq=False, check_index_type=False,
+                                          obj=f"whole file vs DataFrame.resample ({freq})")
+    print(f"Archive resampling: chunked equals whole-file for {', '.join(freqs)}.")
+
+# Offline consistency checks, run first by verify() and alone by `python verify.py --offline`
+def _check_prices(n, seed):
+    df = generate_synthetic_data(n, seed=seed, freq='B', bars_per_year=252)
+    # A flat stretch exercises the constant-run and sign guards of the rolling sums
+    df.iloc[n // 3:n // 3 + 30, df.columns.get_loc('Close')] = df['Close'].iloc[n // 3]
+    return df
+
+def check_streaming_indicators(n=1500, seed=2):
+    """
+    Checks that the streaming indicators and strategies equal their batch
+    counterparts bit for bit: RollingMean vs rolling().mean(), ExponentialMean
+    vs ewm(adjust=False).mean(), RSI vs the graph RSI, and the stream
+    strategies vs the batch signals.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    df = _check_prices(n, seed)
+    close = df['Close']
+    stream = lambda indicator: np.array([indicator.update(x) for x in close])
+
+    for window, min_periods in [(1, None), (5, None), (20, None), (50, 1), (200, 10)]:
+        expected = close.rolling(window, min_periods=min_periods).mean().to_numpy()
+        np.testing.assert_array_equal(stream(RollingMean(window, min_periods)), expected,
+                                      err_msg=f"RollingMean({window}, {min_periods})")
+    for alpha, min_periods in [(1.0, 0), (0.5, 0), (1 / 14, 14), (0.01, 5)]:
+        expected = close.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+        np.testing.assert_array_equal(stream(ExponentialMean(alpha, min_periods)), expected,
+                                      err_msg=f"ExponentialMean({alpha}, {min_periods})")
+    for period in (2, 14, 30):
+        for method in RSI.METHODS:
+            expected = graph.Plan({'rsi': graph.RSI(graph.Column('Close'), period, method)}).run(df, cache=None)['rsi']
+            np.testing.assert_array_equal(stream(RSI(period, method)), expected, err_msg=f"RSI({period}, {method})")
+
+    for strategy, params in [(SMACrossoverStream, {'short_window': 10, 'long_window': 50}),
+                             (RSIStream, {'period': 14, 'buy_threshold': 30, 'sell_threshold': 70}),
+                             (RSIStream, {'period': 7, 'method': 'wilder'})]:
+        name = 'sma' if strategy is SMACrossoverStream else 'rsi'
+        expected = STRATEGIES[name](df, **params)['signal'].to_numpy()
+        np.testing.assert_array_equal(stream(strategy(**params)), expected, err_msg=f"{strategy.__name__}({params})")
+    print("Streaming indicators: rolling, exponential, RSI and stream strategies identical to batch.")
+
+def check_running_metrics(cases=10, seed=3):
+    """
+    Checks RunningMetrics against calculate_metrics on streamed backtests:
+    identical except for round-off in the volatility and Sharpe moments
+    (relative tolerance 1e-9).
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    rng = np.random.default_rng(seed)
+    for case in range(cases):
+        df = generate_synthetic_data(int(rng.integers(50, 2000)), seed=case, freq='B', bars_per_year=252)
+        short = int(rng.integers(2, 20))
+        params = {'short_window': short, 'long_window': short + int(rng.integers(1, 60))}
+        portfolio, trades = Backtester(df, simple_moving_average_strategy(df, **params)).run_backtest()
+        expected = calculate_metrics(portfolio, trades)
+
+        running = RunningMetrics()
+        for date, value, trade in Backtester().stream(df['Close'].items(), SMACrossoverStream(**params)):
+            running.update(date, value, trade)
+        actual = running.result()
+
+        for name in METRIC_NAMES:
+            if name in ('Volatility', 'Sharpe Ratio'):
+                np.testing.assert_allclose(actual[name], expected[name], rtol=1e-9, err_msg=f"case {case}: {name}")
+            else:
+                np.testing.assert_array_equal(actual[name], expected[name], err_msg=f"case {case}: {name}")
+    print(f"Running metrics: {cases} streamed backtests match calculate_metrics.")
+
+def check_batch_metrics(strategies=12, seed=4):
+    """
+    Checks that calculate_metrics_batch is identical to calculate_metrics
+    on each portfolio, including strategies that never trade.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    rng = np.random.default_rng(seed)
+    df = generate_synthetic_data(1500, seed=seed, freq='B', bars_per_year=252)
+    runs = []
+    for k in range(strategies):
+        signal = pd.Series(rng.choice([1.0, 0.0], size=len(df), p=[0.5, 0.5]), index=df.index)
+        # Long stretches of one state, so trades are sparse; the last strategy stays in cash
+        signal = signal.rolling(int(rng.integers(1, 80)), min_periods=1).max() if k < strategies - 1 else signal * 0
+        runs.append(Backtester(df, pd.DataFrame({'signal': signal}), transaction_cost=float(rng.uniform(0, 0.01))).run_backtest())
+
+    equity = pd.DataFrame({k: portfolio['total'] for k, (portfolio, _) in enumerate(runs)})
+    batch = calculate_metrics_batch(equity, trades=compact_trades([trades for _, trades in runs]))
+    for k, (portfolio, trades) in enumerate(runs):
+        expected = calculate_metrics(portfolio, trades)
+        for name in METRIC_NAMES:
+            np.testing.assert_array_equal(batch.loc[k, name], expected[name], err_msg=f"strategy {k}: {name}")
+    print(f"Batch metrics: {strategies} portfolios identical to calculate_metrics.")
+
+def check_buy_and_hold(seed=5):
+    """
+    Checks that the closed-form buy_and_hold benchmark is identical to
+    Backtester with an always-long signal.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    rng = np.random.default_rng(seed)
+    for case, cost in enumerate([0.0, 0.001, float(rng.uniform(0, 0.05))]):
+        df = generate_synthetic_data(int(rng.integers(1, 2000)), seed=case, freq='B', bars_per_year=252)
+        capital = float(rng.uniform(100, 1e6))
+        expected = Backtester(df, pd.DataFrame({'signal': 1.0}, index=df.index), capital, cost).run_backtest()
+        actual = buy_and_hold(df, capital, cost)
+        pd.testing.assert_frame_equal(actual[0], expected[0], check_exact=True)
+        pd.testing.assert_frame_equal(actual[1], expected[1], check_exact=True)
+    print("Buy & hold: closed form identical to Backtester.")
+
+def check_portfolio_single_asset(cases=10, seed=6):
+    """
+    Checks that PortfolioBacktester with one asset and 0/1 weights is
+    identical to Backtester (equity curve and trades).
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    rng = np.random.default_rng(seed)
+    for case in range(cases):
+        df = generate_synthetic_data(int(rng.integers(2, 2000)), seed=case, freq='B', bars_per_year=252)
+        signal = pd.Series(rng.choice([1.0, 0.0], size=len(df)), index=df.index)
+        signal = signal.rolling(int(rng.integers(1, 30)), min_periods=1).max()
+        capital = float(rng.uniform(100, 1e6))
+        cost = float(rng.choice([0.0, rng.uniform(0, 0.01)]))
+
+        portfolio, trades = Backtester(df, pd.DataFrame({'signal': signal}), capital, cost).run_backtest()
+        prices = df[['Close']].rename(columns={'Close': 'X'})
+        multi, _, multi_trades = PortfolioBacktester(prices, signal.to_frame('X'), capital, cost).run_backtest()
+
+        pd.testing.assert_series_equal(multi['total'], portfolio['total'], check_exact=True)
+        pd.testing.assert_series_equal(multi['returns'], portfolio['returns'], check_exact=True)
+        columns = ['Type', 'Price', 'Shares', 'Value', 'Commission']
+        pd.testing.assert_frame_equal(multi_trades[columns].reset_index(drop=True),
+                                      trades[columns].reset_index(drop=True), check_exact=True, check_dtype=False)
+    print(f"Portfolio backtester: {cases} single-asset runs identical to Backtester.")
+
+def check_graph_strategies(seed=7):
+    """
+    Checks that strategies evaluated together in one shared graph are
+    identical to calling each strategy function on its own.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    df = _check_prices(1500, seed)
+    configs = {
+        'fast': ('sma', {'short_window': 5, 'long_window': 20}),
+        'slow': ('sma', {'short_window': 20, 'long_window': 100}),
+        'rsi14': ('rsi', {'period': 14}),
+        'rsi14w': ('rsi', {'period': 14, 'method': 'wilder'}),
+        'rsi7': ('rsi', {'period': 7, 'buy_threshold': 20, 'sell_threshold': 80}),
+    }
+    for dtype in (None, np.float32):
+        shared = run_declared(df, configs, dtype)
+        for label, (name, params) in configs.items():
+            graph.INDICATOR_CACHE.clear()
+            pd.testing.assert_frame_equal(shared[label], STRATEGIES[name](df, **params, dtype=dtype), check_exact=True,
+                                          obj=f"{label} (dtype={dtype})")
+    print(f"Strategy graph: {len(configs)} shared strategies identical to separate calls.")
+
+def check_checkpoint_revision(seed=8):
+    """
+    Checks IncrementalBacktest against a full rerun when fed appended bars,
+    when the history it already processed is revised (rebuilt from the new
+    data), and that a revised tail-only update is rejected.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    df = generate_synthetic_data(800, seed=seed, freq='B', bars_per_year=252)
+    params = {'short_window': 10, 'long_window': 40}
+
+    def same_run(run, data):
+        full = IncrementalBacktest('sma', params)
+        full.update(data)
+        pd.testing.assert_frame_equal(run.portfolio, full.portfolio, check_exact=True, check_freq=False)
+        pd.testing.assert_frame_equal(run.trades, full.trades, check_exact=True)
+        assert run.result() == full.result(), (run.result(), full.result())
+
+    run = IncrementalBacktest('sma', params)
+    run.update(df.iloc[:500])
+    run.update(df.iloc[450:])
+    same_run(run, df)
+
+    # A dividend adjustment rescales every close, including the last processed one
+    revised = df.copy()
+    revised['Close'] = revised['Close'] * 0.97
+    run = IncrementalBacktest('sma', params)
+    run.update(df.iloc[:500])
+    run.update(revised)
+    same_run(run, revised)
+
+    run = IncrementalBacktest('sma', params)
+    run.update(df.iloc[:500])
+    try:
+        run.update(revised.iloc[450:])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a revised tail-only update was applied")
+    print("Checkpoint: appended bars match a full rerun; revised history is rebuilt or rejected.")
+
+def _logged_store_load(root, ticker, start_date, end_date):
+    with open(os.path.join(root, 'loads.log'), 'a') as f:
+        f.write(f"{ticker} {start_date} {end_date}\n")
+    return DataStore(os.path.join(root, 'store'), provider=_slow_provider).load(ticker, start_date, end_date)
+
+def check_batch_concurrency(max_workers=2, chunk_size=3):
+    """
+    Checks run_batch with more chunks than workers against a real data store:
+    every (ticker, range) is loaded once, results equal an inline run, and a
+    rerun skips every job.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    spec = {
+        'tickers': ['AAA', 'BBB'],
+        'date_ranges': [['2020-01-01', '2021-06-01'], ['2020-06-01', '2021-01-01']],
+        'strategies': {'sma': {'short_window': [5, 10, 20], 'long_window': [50, 100]}, 'rsi': {'period': [7, 14]}},
+    }
+    quiet = lambda message: None
+    with tempfile.TemporaryDirectory() as root:
+        loader = partial(_logged_store_load, root)
+        summary = run_batch(spec, os.path.join(root, 'parallel.sqlite'), max_workers, loader, quiet, chunk_size)
+        assert summary == {'jobs': 32, 'ran': 32, 'skipped': 0, 'failed': 0}, summary
+        with open(os.path.join(root, 'loads.log')) as f:
+            loads = f.read().splitlines()
+        assert sorted(loads) == sorted(set(loads)) and len(loads) == 4, f"ranges loaded more than once: {loads}"
+
+        assert run_batch(spec, os.path.join(root, 'inline.sqlite'), 1, loader, quiet, chunk_size)['ran'] == 32
+        results = [ResultStore(os.path.join(root, name)) for name in ('parallel.sqlite', 'inline.sqlite')]
+        frames = [store.to_frame().drop(columns='finished_at') for store in results]
+        for store in results:
+            store.close()
+        pd.testing.assert_frame_equal(frames[0], frames[1], check_exact=True)
+
+        rerun = run_batch(spec, os.path.join(root, 'parallel.sqlite'), max_workers, loader, quiet, chunk_size)
+        assert rerun == {'jobs': 32, 'ran': 0, 'skipped': 32, 'failed': 0}, rerun
+    print(f"Batch: {max_workers} workers x chunks of {chunk_size} load each range once and match an inline run.")
+
+def check_fetcher_retries(retries=2):
+    """
+    Checks Fetcher retries against a fake provider: empty answers and errors
+    are retried and report the real attempt count, NoData is not retried,
+    and an answer after an empty one is used.
+
+    Raises:
+        AssertionError: A check failed.
+    """
+    bars = generate_synthetic_data(100, seed=1, start="2020-01-01", freq='D', bars_per_year=252)
+    calls = {}
+
+    def provider(ticker, start_date, end_date):
+        calls[ticker] = calls.get(ticker, 0) + 1
+        if ticker == 'EMPTY' or (ticker == 'FLAKY' and calls[ticker] == 1):
+            return pd.DataFrame()
+        if ticker == 'GONE':
+            raise NoData("delisted")
+        if ticker == 'BAD':
+            raise RuntimeError("connection reset")
+        return bars
+
+    fetcher = Fetcher(provider=provider, retries=retries, backoff=0, sleep=lambda seconds: None)
+    data, errors = fetcher.fetch(['GOOD', 'FLAKY', 'EMPTY', 'GONE', 'BAD'], date(2020, 1, 1), date(2020, 6, 1))
+    assert sorted(data) == ['FLAKY', 'GONE', 'GOOD'] and data['GONE'].empty, sorted(data)
+    assert {ticker: (error['type'], error['attempts']) for ticker, error in errors.items()} == \
+        {'EMPTY': ('NoData', retries + 1), 'BAD': ('RuntimeError', retries + 1)}, errors
+    assert calls == {'GOOD': 1, 'FLAKY': 2, 'EMPTY': retries + 1, 'GONE': 1, 'BAD': retries + 1}, calls
+    print("Fetcher: empty answers and errors retried with real attempt counts, NoData not retried.")
+
+CHECKS = [check_engine_parity, check_store, check_store_concurrency, check_archive_resample,
+          check_streaming_indicators, check_running_metrics, check_batch_metrics, check_buy_and_hold,
+          check_portfolio_single_asset, check_graph_strategies, check_checkpoint_revision,
+          check_batch_concurrency, check_fetcher_retries]
+
+def run_checks():
+    for check in CHECKS:
+        check()
+
+def verify(trace_memory=False):
     print("Verifying Quant Trading Backtester...")
-    
+    run_checks()
+    profiler = PipelineProfiler(trace_memory=trace_memory)
+
     # 1. Fetch Data
     print("\nFetching Data for AAPL...")
     end = date.today()
     start = end - timedelta(days=365)
-    df = fetch_data("AAPL", start, end)
-    
-    if df is None or df.empty:
+    try:
+        with profiler.stage("fetch") as record:
+            df = fetch_data("AAPL", start, end)
+            record['rows'] = len(df)
+    except DataUnavailable:
         print("Error: No data fetched.")
         return
-        
+
     print(f"Data fetched: {len(df)} rows.")
-    
+
     # 2. Strategy
     print("\nRunning SMA Strategy (20, 50)...")
-    signals = simple_moving_average_strategy(df, 20, 50)
+    with profiler.stage("signals", rows=len(df)):
+        signals = simple_moving_average_strategy(df, 20, 50)
     print("Signals generated.")
     print(signals.tail())
-    
+
     # 3. Backtest
     print("\nRunning Backtest...")
-    bt = Backtester(df, signals, initial_capital=10000.0)
-    portfolio, trades = bt.run_backtest()
+    with profiler.stage("backtest", rows=len(df)):
+        bt = Backtester(df, signals, initial_capital=10000.0)
+        portfolio, trades = bt.run_backtest()
     print("Backtest complete.")
     print(f"Final Portfolio Value: {portfolio['total'].iloc[-1]:.2f}")
-    
+
     # 4. Metrics
     print("\nCalculating Metrics...")
-    metrics = calculate_metrics(portfolio, trades)
+    with profiler.stage("metrics", rows=len(portfolio)):
+        metrics = calculate_metrics(portfolio, trades)
     for k, v in metrics.items():
         print(f"{k}: {v}")
-        
+
+    print("\nStage timings:")
+    print(profiler.to_frame().to_string(index=False))
     print("\nVerification Passed!")
 
 if __name__ == "__main__":
-    verify()
+    parser = argparse.ArgumentParser(description="End-to-end check of the backtesting pipeline.")
+    parser.add_argument("--trace-memory", action="store_true", help="Record per-stage allocations with tracemalloc.")
+    parser.add_argument("--profile", metavar="PREFIX", help="Dump a cProfile/tracemalloc capture to PREFIX.prof/.txt.")
+    parser.add_argument("--offline", action="store_true", help="Run only the offline consistency checks.")
+    parser.add_argument("--log-level", default="INFO", help="Level for the structured stage logs.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(message)s")
+    if args.offline:
+        run_checks()
+        print("\nChecks Passed!")
+    else:
+        with profile_run(args.profile) if args.profile else nullcontext():
+            verify(trace_memory=args.trace_memory)
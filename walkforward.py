@@ -0,0 +1,176 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import pandas as pd
+import numpy as np
+from strategies import STRATEGIES
+from backtest import Backtester
+from metrics import calculate_metrics
+from sweep import SWEEPS, evaluate_grid
+
+def walk_forward_folds(n_bars, train_bars, test_bars, anchored=False):
+    """
+    Consecutive (train, test) windows; test windows tile the history after
+    the first train window without overlap.
+
+    Args:
+        n_bars (int): Length of the history.
+        train_bars (int): Bars per train window (the first one when anchored).
+        test_bars (int): Bars per out-of-sample window (the last may be shorter).
+        anchored (bool): Grow every train window from bar 0 instead of rolling it.
+
+    Returns:
+        list: (train_start, train_end, test_start, test_end) positions, ends exclusive.
+    """
+    folds = []
+    for test_start in range(train_bars, n_bars, test_bars):
+        train_start = 0 if anchored else test_start - train_bars
+        folds.append((train_start, test_start, test_start, min(test_start + test_bars, n_bars)))
+    return folds
+
+def _fit_fold(prices, grid, signal_fn, indicators, objective, initial_capital, transaction_cost):
+    """
+    Scores the grid on one train window.
+
+    Returns:
+        (int, float): Grid position of the best configuration and its objective value.
+    """
+    results = evaluate_grid(prices, grid, partial(signal_fn, *indicators), initial_capital, transaction_cost)
+    position = int(np.argmax(results[objective].fillna(-np.inf).to_numpy()))
+    return position, results[objective].iat[position]
+
+def _test_fold(data, signals, initial_capital, transaction_cost):
+    # Go flat on the last bar, so an open position is sold (with commission) inside its own fold
+    signals = signals.copy()
+    signals.iloc[-1, signals.columns.get_loc('signal')] = 0
+    return Backtester(data, signals, initial_capital, transaction_cost).run_backtest()
+
+def walk_forward(df, strategy, grid, train_bars, test_bars, anchored=False, objective='Sharpe Ratio',
+                 initial_capital=10000.0, transaction_cost=0.001, max_workers=None):
+    """
+    Walk-forward optimization: fit the grid on each train window, trade the
+    best parameters on the following out-of-sample window.
+
+    Indicators for the whole grid are computed once over the full history
+    (so train windows start warmed up) and only sliced per fold. Each fold's
+    grid is scored with the batched sweep engine; each out-of-sample window
+    runs through Backtester on the chosen strategy's full-history signals.
+    Folds run in a process pool. Out-of-sample curves are chained by
+    compounding: every fold starts from the capital the previous one ended
+    with. Each fold starts flat and sells any open position at its last
+    close, so a position held across a boundary is closed and reopened,
+    paying commission twice, and every Buy in the stitched trade log is
+    followed by its Sell within the same fold.
+
+    Args:
+        df (pd.DataFrame): Price data with a 'Close' column.
+        strategy (str): Key of sweep.SWEEPS ('sma', 'rsi').
+        grid (dict): Keyword arguments of the indicator builder, e.g.
+            {'short_windows': [10, 20], 'long_windows': [50, 100]} for 'sma' or
+            {'periods': [...], 'buy_thresholds': [...], 'sell_thresholds': [...]} for 'rsi'.
+        train_bars (int): Bars per train window.
+        test_bars (int): Bars per out-of-sample window.
+        anchored (bool): Expanding instead of rolling train windows.
+        objective (str): Metric column maximized in each train window.
+        initial_capital (float): Starting capital.
+        transaction_cost (float): Cost per trade.
+        max_workers (int): Worker processes (default: CPU count); 1 runs inline.
+
+    Returns:
+        portfolio (pd.DataFrame): Stitched out-of-sample 'total' and 'returns'.
+        trades (pd.DataFrame): Out-of-sample trades with a 'Fold' column.
+        folds (pd.DataFrame): Per fold: window dates, chosen parameters,
+            in-sample objective and out-of-sample metrics.
+    """
+    if strategy not in SWEEPS:
+        raise ValueError(f"Unknown strategy '{strategy}'. Expected one of {sorted(SWEEPS)}.")
+    build, signal_fn = SWEEPS[strategy]
+    configs, indicators = build(df, **grid)
+    keys, matrix = indicators
+    folds = walk_forward_folds(len(df), train_bars, test_bars, anchored)
+    if not folds:
+        raise ValueError("History is shorter than one train window.")
+
+    prices = df[['Close']]
+    fit_tasks = [(prices.iloc[lo:hi], configs, signal_fn, (keys, matrix[lo:hi]), objective,
+                  initial_capital, transaction_cost) for lo, hi, _, _ in folds]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=min(max_workers, len(folds))) if max_workers > 1 and len(folds) > 1 else None
+    try:
+        run = (lambda fn, tasks: list(pool.map(fn, *zip(*tasks)))) if pool else (lambda fn, tasks: [fn(*t) for t in tasks])
+        best = run(_fit_fold, fit_tasks)
+
+        # Strategy signals over the full history, once per distinct chosen parameter set
+        params = [{name: _native(configs[name].iat[position]) for name in configs.columns} for position, _ in best]
+        signals = {}
+        for p in params:
+            key = tuple(sorted(p.items()))
+            if key not in signals:
+                signals[key] = STRATEGIES[strategy](df, **p)
+        test_tasks = [(df.iloc[lo:hi], signals[tuple(sorted(p.items()))].iloc[lo:hi], initial_capital, transaction_cost)
+                      for (_, _, lo, hi), p in zip(folds, params)]
+        outcomes = run(_test_fold, test_tasks)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Equity is linear in the starting capital, so each fold is rescaled by the growth before it
+    scale = 1.0
+    curves, trade_frames, rows = [], [], []
+    for k, ((train_lo, train_hi, lo, hi), p, (_, score), (portfolio, trades)) in enumerate(zip(folds, params, best, outcomes)):
+        total = portfolio['total'] * scale
+        curves.append(total)
+        if not trades.empty:
+            trades = trades.copy()
+            trades[['Shares', 'Value', 'Commission']] *= scale
+            trades['Fold'] = k
+            trade_frames.append(trades)
+        oos = calculate_metrics(portfolio, trades)
+        rows.append({
+            'Fold': k,
+            'Train Start': df.index[train_lo], 'Train End': df.index[train_hi - 1],
+            'Test Start': df.index[lo], 'Test End': df.index[hi - 1],
+            **p,
+            f"Train {objective}": score,
+            **{f"Test {name}": value for name, value in oos.items()},
+        })
+        scale *= portfolio['total'].iloc[-1] / initial_capital
+
+    stitched = pd.DataFrame({'total': pd.concat(curves)})
+    stitched['returns'] = stitched['total'].pct_change()
+    trades = pd.concat(trade_frames, ignore_index=True) if trade_frames else pd.DataFrame()
+    return stitched, trades, pd.DataFrame(rows)
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from datetime import date, timedelta
+    from data import load_data
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of a strategy grid.")
+    parser.add_argument("ticker")
+    parser.add_argument("--strategy", default="sma", choices=sorted(SWEEPS))
+    parser.add_argument("--grid", default='{"short_windows": [5, 10, 20, 30], "long_windows": [50, 100, 150, 200]}',
+                        help="Indicator grid as JSON (keyword arguments of the sweep builder).")
+    parser.add_argument("--start", default=str(date.today() - timedelta(days=365 * 10)))
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--train", type=int, default=504, help="Bars per train window.")
+    parser.add_argument("--test", type=int, default=126, help="Bars per out-of-sample window.")
+    parser.add_argument("--anchored", action="store_true")
+    parser.add_argument("--objective", default="Sharpe Ratio")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    df = load_data(args.ticker.upper(), args.start, args.end)
+    if df is None:
+        raise SystemExit(f"No data for {args.ticker}.")
+    portfolio, trades, folds = walk_forward(df, args.strategy, json.loads(args.grid), args.train, args.test,
+                                            args.anchored, args.objective, max_workers=args.workers)
+    print(folds.to_string(index=False))
+    print("\nStitched out-of-sample metrics:")
+    for name, value in calculate_metrics(portfolio, trades).items():
+        print(f"{name}: {value}")